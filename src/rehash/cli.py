@@ -8,41 +8,294 @@ cli.py
 
 import os
 import sys
+import json
 import zipfile
 import argparse
+from datetime import datetime
+from itertools import chain
 from pathlib import Path
-from rehash.emit_structured_json import emit_conversations
-from rehash.filter_fitness_logs import filter_fitness_conversations
-from rehash.extract_export import extract_export as default_extract_fn
+from typing import Iterator, Optional, Union
+from rehash.emit_structured_json import iter_emit_conversations
+from rehash.emit_jsonl import iter_emit_jsonl
+from rehash.emit_incremental import EmitStats, iter_emit_incremental
+from rehash.emit_zip import ZIP_COMPRESSION, iter_emit_zip
+from rehash.emit_sqlite import iter_emit_sqlite
+from rehash.compression import CODECS
+from rehash.conversation_filter import FILTER_FIELDS, ConversationFilter, iter_filtered
+from rehash.filter_fitness_logs import iter_fitness_conversations
+from rehash.fitness_rules import ENGINES, load_rules
+from rehash.extract_export import ExtractStats, iter_conversations as default_extract_fn
+from rehash.export_index import build_index, open_index, read_conversation
+from rehash.merge_exports import iter_merged, plan_merge
+from rehash.pipeline import Counter, staged
+from rehash.search_index import SearchIndex, build_search_index, default_search_path
+from rehash.utils import to_epoch
 
 # Global hookable extractor for tests
 extract_fn = default_extract_fn
 
+OUTPUT_FORMATS = ("json", "jsonl", "jsonl.gz", "sqlite")
+
+
+def _emit(conversations, args, stats=None) -> Iterator[Optional[Union[Path, str]]]:
+    """
+    Route a conversation stream to the writer chosen by ``--format``.
+
+    Yields what the writer yields per conversation: the output file, the
+    member name for ``--out *.zip``, or the conversation id (``None`` when
+    missing) for ``--format sqlite``.
+    """
+    out = Path(args.out)
+    compression = args.compress or ("gzip" if args.format == "jsonl.gz" else None)
+    if args.format == "sqlite":
+        if compression or args.incremental:
+            raise ValueError("--format sqlite does not support --compress or --incremental")
+        return iter_emit_sqlite(conversations, out, defer_indexes=args.defer_indexes)
+    if out.suffix == ".zip":
+        if args.format != "json" or compression or args.incremental:
+            raise ValueError("--out *.zip only supports --format json (use --zip-compression, not --compress/--incremental)")
+        return iter_emit_zip(conversations, out, compression=args.zip_compression, level=args.compress_level)
+    if args.incremental:
+        if args.format != "json":
+            raise ValueError("--incremental only applies to --format json")
+        return iter_emit_incremental(
+            conversations, out, stats, writers=max(args.writers, args.compress_threads),
+            compression=compression, level=args.compress_level,
+        )
+    if args.format == "json":
+        return iter_emit_conversations(
+            conversations, out, writers=max(args.writers, args.compress_threads),
+            compression=compression, level=args.compress_level,
+        )
+    return iter_emit_jsonl(
+        conversations, out, compression=compression, max_bytes=args.max_file_size,
+        level=args.compress_level, threads=args.compress_threads,
+    )
+
+
+def _primed(conversations: Iterator) -> Iterator:
+    """Pull the first conversation now, so a missing or broken export fails before any output exists."""
+    for first in conversations:
+        return chain([first], conversations)
+    return iter(())
+
 
 def parse_export_handler(args):
     zip_path = Path(args.zip)
 
     # 🧪 Testing hook
     extract = (
-        (lambda _: {"not": "a list"})
+        (lambda *_args, **_kwargs: {"not": "a list"})
         if os.environ.get("REHASH_BROKEN_EXTRACT") == "1"
         else extract_fn
     )
 
+    # 🔍 Compiled once, up front, so a bad expression fails before the export is read.
+    expression = ConversationFilter(args.filter) if args.filter else None
+    rules = None
+    if args.fitness_only:
+        rules = load_rules(
+            args.fitness_keywords, engine=args.fitness_engine, full_text=args.fitness_full_text,
+            roles=args.fitness_roles, max_chars=args.fitness_max_chars,
+        )
+    # 🔽 In-process filtering is pushed into the parser, so non-matching
+    # conversations are never decoded; --filter-jobs filters in a pool instead.
+    pushdown = rules is not None and args.filter_jobs == 1
+
     print(f"📦 Loading export: {zip_path}")
-    conversations = extract(zip_path)
+    scan = ExtractStats()
+    conversations = extract(
+        zip_path, jobs=args.jobs, cache=not args.no_cache, rules=rules if pushdown else None, stats=scan
+    )
 
-    if not isinstance(conversations, list):
+    if not isinstance(conversations, (list, Iterator)):
         raise TypeError(f"Expected list of conversations, got {type(conversations).__name__}")
-    
-    print(f"🧠 Total conversations: {len(conversations)}")
 
-    if args.fitness_only:
-        conversations = filter_fitness_conversations(conversations)
-        print(f"🏋️ Filtered fitness conversations: {len(conversations)}")
+    # 🔗 extract ➤ filter ➤ emit, one conversation at a time over bounded queues
+    stream = staged(_primed(iter(conversations)))
+
+    kept = None
+    if rules is not None and not pushdown:
+        kept = Counter(iter_fitness_conversations(stream, rules, jobs=args.filter_jobs))
+        stream = staged(kept)
+
+    selected = None
+    if expression is not None:
+        selected = Counter(iter_filtered(stream, expression))
+        stream = staged(selected)
+
+    stats = EmitStats()
+    written = _drain(_emit(stream, args, stats), args)
+
+    print(f"🧠 Total conversations: {scan.total}")
+    if rules is not None:
+        print(f"🏋️ Filtered fitness conversations: {kept.count if kept is not None else scan.kept}")
+    if selected is not None:
+        print(f"🔍 Matched --filter: {selected.count}")
+    _print_summary(args, written, stats)
+
+
+def merge_handler(args):
+    """Merge several exports, keeping the newest copy of each conversation id."""
+    print(f"📦 Scanning {len(args.zips)} exports")
+    plan = plan_merge(args.zips, jobs=args.jobs)
+
+    stats = EmitStats()
+    written = _drain(_emit(staged(iter_merged(plan, jobs=args.jobs, cache=not args.no_cache)), args, stats), args)
+
+    print(f"🧠 Total conversations: {plan.total}")
+    print(f"🔁 Unique conversation ids: {len(plan.winners)}")
+    _print_summary(args, written, stats)
+
+
+def _format_date(value) -> str:
+    try:
+        return datetime.fromtimestamp(to_epoch(value)).strftime("%Y-%m-%d")
+    except (ValueError, OverflowError, OSError):
+        return "----------"
+
+
+def list_handler(args):
+    """List conversation metadata using the shallow (mapping-free) scan."""
+    rules = load_rules(args.fitness_keywords, engine=args.fitness_engine) if args.fitness_only else None
+    records = extract_fn(Path(args.zip), jobs=args.jobs, shallow=True)
+    total = listed = 0
+    for record in records:
+        total += 1
+        if rules is not None and not rules.matches_title(record["title"] or ""):
+            continue
+        listed += 1
+        print(f"{record['id'] or '-'}  {_format_date(record['create_time'])}  {record['title'] or '[no title]'}")
+
+    print(f"🧠 Listed {listed} of {total} conversations")
+
+
+def _search_path(args) -> Path:
+    return Path(args.search_index) if args.search_index else default_search_path()
+
+
+def index_build_handler(args):
+    print(f"📦 Indexing export: {args.zip}")
+    out = build_index(args.zip, Path(args.out) if args.out else None)
+    print(f"🗂️ Index written ➤ {out}")
+    if not args.no_search:
+        directory = _search_path(args)
+        stats = build_search_index(args.zip, directory, jobs=args.jobs, cache=not args.no_cache)
+        print(f"🔎 Search index updated ➤ {directory} ({stats})")
+
+
+def search_handler(args):
+    with SearchIndex(_search_path(args)) as index:
+        if args.rank:
+            hits = index.rank(args.query, limit=args.limit)
+            for hit in hits:
+                print(f"{hit.score:8.3f}  {hit.id}  {_format_date(hit.update_time)}  {hit.title or '[no title]'}")
+                for text in hit.snippets:
+                    print(f"          💬 {text}")
+            print(f"🔎 Top {len(hits)} conversations by BM25")
+            return
+        hits = index.search(args.query)
+    for hit in hits[:args.limit]:
+        print(f"{hit.id}  {_format_date(hit.update_time)}  {hit.title or '[no title]'}")
+        print(f"    💬 {', '.join(hit.messages)}")
+    shown = f"{args.limit} of " if len(hits) > args.limit else ""
+    print(f"🔎 Showing {shown}{len(hits)} matching conversations")
+
+
+def show_handler(args):
+    index = open_index(args.zip, Path(args.index) if args.index else None)
+    entry = index.lookup(args.id)
+    convo = read_conversation(args.zip, index, entry)
+    print(json.dumps(convo, ensure_ascii=False, indent=2))
+
+
+def _unit(args) -> str:
+    return "files" if args.format == "json" else "conversations"
+
+
+def _drain(emitted: Iterator, args) -> int:
+    """Run the emit stage to the end; return how many files or conversations it produced."""
+    if _unit(args) == "files":
+        return len(set(emitted))  # repeats of an id land in the same file
+    return sum(1 for _ in emitted)
+
+
+def _print_summary(args, written: int, stats: EmitStats) -> None:
+    if args.incremental:
+        print(f"♻️ Synced: {stats}")
+    print(f"✅ Exported: {written} {_unit(args)} ➤ {args.out}")
+
 
-    out_paths = emit_conversations(conversations, Path(args.out))
-    print(f"✅ Exported: {len(out_paths)} files ➤ {args.out}")
+_SIZE_SUFFIXES = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def _size(value: str) -> int:
+    """Parse a byte count such as ``1048576``, ``512M`` or ``2G``."""
+    scale = _SIZE_SUFFIXES.get(value[-1:].upper(), 1)
+    digits = value[:-1] if scale != 1 else value
+    try:
+        number = int(digits)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {value}")
+    return number * scale
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {value}")
+    return number
+
+
+def _add_output_args(cmd: argparse.ArgumentParser) -> None:
+    """Attach the decode, cache and output options shared by ``parse-export`` and ``merge``."""
+    cmd.add_argument(
+        "--jobs", type=_positive_int, default=1, metavar="N",
+        help="Decode conversations.json across N worker processes (default: 1, streaming)",
+    )
+    cmd.add_argument(
+        "--no-cache", action="store_true",
+        help="Bypass the parsed-export cache (~/.cache/rehash or $REHASH_CACHE_DIR)",
+    )
+    cmd.add_argument(
+        "--writers", type=_positive_int, default=1, metavar="N",
+        help="Write output files from N threads; order stays deterministic (default: 1)",
+    )
+    cmd.add_argument(
+        "--format", choices=OUTPUT_FORMATS, default="json",
+        help="json: one pretty file per conversation; jsonl: one bundle plus an offset index "
+        "(jsonl.gz = jsonl --compress gzip); sqlite: tables + FTS5 in the --out database",
+    )
+    cmd.add_argument(
+        "--max-file-size", type=_size, metavar="SIZE",
+        help="Roll jsonl bundles over into numbered parts at SIZE bytes (K/M/G suffixes)",
+    )
+    cmd.add_argument(
+        "--compress", choices=list(CODECS),
+        help="Compress output: per-file .json.<ext>, or the jsonl bundle blocks",
+    )
+    cmd.add_argument(
+        "--compress-level", type=int, metavar="N",
+        help="Compression level (gzip/xz 0-9, bz2 1-9; default: codec default)",
+    )
+    cmd.add_argument(
+        "--compress-threads", type=_positive_int, default=1, metavar="N",
+        help="Compress on N threads (bundle blocks, or files alongside --writers)",
+    )
+    cmd.add_argument(
+        "--incremental", action="store_true",
+        help="Only write new or changed conversations, tracked by a manifest in --out",
+    )
+    cmd.add_argument(
+        "--zip-compression", choices=list(ZIP_COMPRESSION), default="deflated",
+        help="Member compression when --out ends in .zip (default: deflated)",
+    )
+    cmd.add_argument(
+        "--defer-indexes", action="store_true",
+        help="With --format sqlite, build indexes after the bulk load",
+    )
 
 
 def _add_subparsers(parser: argparse.ArgumentParser) -> None:
@@ -51,10 +304,108 @@ def _add_subparsers(parser: argparse.ArgumentParser) -> None:
 
     export_cmd = subparsers.add_parser("parse-export", help="Parse a ChatGPT export ZIP")
     export_cmd.add_argument("zip", type=str, help="Path to ChatGPT ZIP export")
-    export_cmd.add_argument("--out", required=True, help="Where to write structured JSON")
+    export_cmd.add_argument("--out", required=True, help="Where to write structured JSON (a directory, or a .zip)")
     export_cmd.add_argument("--fitness-only", action="store_true", help="Filter to fitness logs only")
+    export_cmd.add_argument(
+        "--fitness-keywords", metavar="WORDS",
+        help="Comma-separated extra fitness keywords (else $REHASH_FITNESS_KEYWORDS or ~/.rehash/config.yaml)",
+    )
+    export_cmd.add_argument(
+        "--fitness-engine", choices=ENGINES,
+        help="Keyword matcher: regex alternation or Aho-Corasick automaton (default: config, else auto)",
+    )
+    export_cmd.add_argument(
+        "--fitness-full-text", action="store_true",
+        help="Match message rules against every text part, not just the first part of assistant messages",
+    )
+    export_cmd.add_argument(
+        "--fitness-roles", metavar="ROLES",
+        help="Comma-separated author roles to scan, or '*' for all (implies --fitness-full-text; default: assistant)",
+    )
+    export_cmd.add_argument(
+        "--fitness-max-chars", type=_positive_int, metavar="N",
+        help="Scan at most N characters of message text per conversation (implies --fitness-full-text)",
+    )
+    export_cmd.add_argument(
+        "--filter", metavar="EXPR",
+        help="Keep conversations matching a JMESPath expression over "
+        f"{', '.join(FILTER_FIELDS)} (e.g. \"model=='gpt-4o'\" or \"items[?total_messages > `5`]\")",
+    )
+    _add_output_args(export_cmd)
+    export_cmd.add_argument(
+        "--filter-jobs", type=_positive_int, default=1, metavar="N",
+        help="Match --fitness-only rules across N worker processes (default: 1, in-process)",
+    )
     export_cmd.set_defaults(func=parse_export_handler)
 
+    merge_cmd = subparsers.add_parser("merge", help="Merge exports, keeping the newest copy of each conversation")
+    merge_cmd.add_argument("zips", nargs="+", help="Export ZIPs (or folders), oldest first")
+    merge_cmd.add_argument("--out", required=True, help="Where to write structured JSON (a directory, or a .zip)")
+    _add_output_args(merge_cmd)
+    merge_cmd.set_defaults(func=merge_handler)
+
+    list_cmd = subparsers.add_parser("list", help="List conversation ids, dates and titles")
+    list_cmd.add_argument("zip", type=str, help="Path to ChatGPT ZIP export")
+    list_cmd.add_argument("--fitness-only", action="store_true", help="Only fitness titles (title rules only)")
+    list_cmd.add_argument(
+        "--fitness-keywords", metavar="WORDS",
+        help="Comma-separated extra fitness keywords (else $REHASH_FITNESS_KEYWORDS or ~/.rehash/config.yaml)",
+    )
+    list_cmd.add_argument(
+        "--fitness-engine", choices=ENGINES,
+        help="Keyword matcher: regex alternation or Aho-Corasick automaton (default: config, else auto)",
+    )
+    list_cmd.add_argument(
+        "--jobs", type=_positive_int, default=1, metavar="N",
+        help="Scan conversations.json across N worker processes (default: 1, streaming)",
+    )
+    list_cmd.set_defaults(func=list_handler)
+
+    index_cmd = subparsers.add_parser("index", help="Build sidecar and search indexes for an export ZIP")
+    index_sub = index_cmd.add_subparsers(dest="index_command", required=True)
+    build_cmd = index_sub.add_parser("build", help="Index conversation ids ➤ byte offsets")
+    build_cmd.add_argument("zip", type=str, help="Path to ChatGPT ZIP export")
+    build_cmd.add_argument("--out", help="Index path (default: <zip>.rehash-index.json)")
+    build_cmd.add_argument(
+        "--search-index", metavar="DIR",
+        help="Search index to add the export's messages to (default: $REHASH_SEARCH_INDEX or ~/.rehash/search)",
+    )
+    build_cmd.add_argument("--no-search", action="store_true", help="Only build the id ➤ byte offset index")
+    build_cmd.add_argument(
+        "--jobs", type=_positive_int, default=1, metavar="N",
+        help="Decode conversations.json across N worker processes for the search index (default: 1)",
+    )
+    build_cmd.add_argument(
+        "--no-cache", action="store_true",
+        help="Bypass the parsed-export cache (~/.cache/rehash or $REHASH_CACHE_DIR)",
+    )
+    build_cmd.set_defaults(func=index_build_handler)
+
+    search_cmd = subparsers.add_parser("search", help="Find conversations by message text")
+    search_cmd.add_argument(
+        "query", type=str,
+        help='Words are AND-ed; use OR between alternatives and "quotes" for phrases',
+    )
+    search_cmd.add_argument(
+        "--search-index", metavar="DIR",
+        help="Search index to query (default: $REHASH_SEARCH_INDEX or ~/.rehash/search)",
+    )
+    search_cmd.add_argument(
+        "--rank", action="store_true",
+        help="Order by BM25 relevance and show highlighted snippets instead of listing newest first",
+    )
+    search_cmd.add_argument(
+        "--limit", type=_positive_int, default=20, metavar="N",
+        help="Show at most N conversations (default: 20)",
+    )
+    search_cmd.set_defaults(func=search_handler)
+
+    show_cmd = subparsers.add_parser("show", help="Print one conversation by id or unique id prefix")
+    show_cmd.add_argument("zip", type=str, help="Path to ChatGPT ZIP export")
+    show_cmd.add_argument("id", type=str, help="Conversation id or unique prefix")
+    show_cmd.add_argument("--index", help="Index path (default: <zip>.rehash-index.json)")
+    show_cmd.set_defaults(func=show_handler)
+
 
 def get_parser() -> argparse.ArgumentParser:
     """Create CLI parser for entrypoint and tests."""
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+compression.py
+
+🗜️ Stdlib compression codecs for emitted output (gzip, bz2, xz).
+
+Each codec can stream a whole file (:meth:`Codec.open`) or compress one
+self-contained block (:meth:`Codec.compress`). All three formats decode
+concatenated blocks as a single stream, which is what lets bundles be
+compressed block by block across threads and still read back with ``zcat`` /
+``bzcat`` / ``xzcat``.
+"""
+
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+from typing import IO, Callable, Dict, NamedTuple, Optional, cast
+
+
+class Codec(NamedTuple):
+    name: str
+    suffix: str
+    default_level: int
+    min_level: int
+    max_level: int
+    opener: Callable[[Path, int], IO[bytes]]
+    compressor: Callable[[bytes, int], bytes]
+    reader: Callable[[IO[bytes]], IO[bytes]]
+
+    def check_level(self, level: Optional[int]) -> int:
+        """Return ``level`` (or the codec default) after range-checking it."""
+        if level is None:
+            return self.default_level
+        if not self.min_level <= level <= self.max_level:
+            raise ValueError(
+                f"{self.name} compression level must be {self.min_level}-{self.max_level}, got {level}"
+            )
+        return level
+
+    def open(self, path: Path, level: Optional[int] = None) -> IO[bytes]:
+        """Open ``path`` for streaming binary writes through the compressor."""
+        return self.opener(path, self.check_level(level))
+
+    def compress(self, data: bytes, level: Optional[int] = None) -> bytes:
+        """Compress one independent block (releases the GIL while it works)."""
+        return self.compressor(data, self.check_level(level))
+
+
+CODECS: Dict[str, Codec] = {
+    "gzip": Codec(
+        "gzip", ".gz", 6, 0, 9,
+        # GzipFile is typed as a BufferedIOBase only, but is a full binary file.
+        lambda path, level: cast(IO[bytes], gzip.GzipFile(path, "wb", compresslevel=level, mtime=0)),
+        lambda data, level: gzip.compress(data, compresslevel=level, mtime=0),
+        lambda raw: cast(IO[bytes], gzip.GzipFile(fileobj=raw, mode="rb")),
+    ),
+    "bz2": Codec(
+        "bz2", ".bz2", 9, 1, 9,
+        lambda path, level: bz2.BZ2File(path, "wb", compresslevel=level),
+        lambda data, level: bz2.compress(data, compresslevel=level),
+        lambda raw: bz2.BZ2File(raw, "rb"),
+    ),
+    "xz": Codec(
+        "xz", ".xz", 6, 0, 9,
+        lambda path, level: lzma.LZMAFile(path, "wb", preset=level),
+        lambda data, level: lzma.compress(data, preset=level),
+        lambda raw: lzma.LZMAFile(raw, "rb"),
+    ),
+}
+
+
+def get_codec(name: str) -> Codec:
+    """Look up a codec by name (``gzip``, ``bz2`` or ``xz``)."""
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown compression '{name}'; choose from {', '.join(CODECS)}")
+
+
+def codec_for_path(path: str) -> Optional[Codec]:
+    """Codec implied by a file name's suffix, or ``None`` for plain files."""
+    for codec in CODECS.values():
+        if path.endswith(codec.suffix):
+            return codec
+    return None
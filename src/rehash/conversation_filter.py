@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+conversation_filter.py
+
+🔍 JMESPath filtering over a lightweight metadata projection of each conversation.
+
+The expression is compiled once and evaluated per conversation as the export
+streams past. It sees a small record rather than the raw ``mapping`` tree::
+
+    {"id": "6811d2f3-…", "title": "Leg day", "model": "gpt-4o",
+     "create_time": 1717452300.0, "update_time": 1717455900.0,
+     "created_at": "2024-06-03 22:05:00", "custom": "No",
+     "total_messages": 12, "messages_by_role": {"user": 6, "assistant": 6},
+     "attachments": "No"}
+
+The same record is also available as ``items[0]``, so the v0.1.6 list form
+(``items[?model=='gpt-4']``) works unchanged next to plain expressions
+(``model=='gpt-4'``). A conversation is kept when the result is truthy in
+JMESPath terms: anything except ``null``, ``false``, and empty strings,
+lists or objects. A type error on one conversation, e.g. ``starts_with`` on
+a missing ``created_at``, counts as no match rather than ending the run.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import jmespath  # type: ignore[import-untyped]
+from jmespath.exceptions import JMESPathError, JMESPathTypeError  # type: ignore[import-untyped]
+
+from rehash.export_index import conversation_id
+from rehash.messages import iter_messages, message_role
+from rehash.utils import to_epoch
+
+FILTER_FIELDS = (
+    "id", "title", "model", "create_time", "update_time", "created_at",
+    "custom", "total_messages", "messages_by_role", "attachments",
+)
+
+
+def _epoch(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return to_epoch(value)
+    except ValueError:
+        return None
+
+
+def _has_attachments(message: Dict[str, Any]) -> bool:
+    metadata = message.get("metadata")
+    if isinstance(metadata, dict) and metadata.get("attachments"):
+        return True
+    content = message.get("content")
+    parts = content.get("parts") if isinstance(content, dict) else None
+    # 🖼️ Images, files and audio arrive as dict parts without text.
+    return isinstance(parts, list) and any(isinstance(p, dict) and "text" not in p for p in parts)
+
+
+def project(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """The metadata record a filter expression is evaluated against."""
+    by_role: Dict[str, int] = {}
+    attachments = False
+    for _, message in iter_messages(conversation):
+        role = message_role(message) or "unknown"
+        by_role[role] = by_role.get(role, 0) + 1
+        attachments = attachments or _has_attachments(message)
+
+    create_time = _epoch(conversation.get("create_time"))
+    created_at = None
+    if create_time is not None:
+        created_at = datetime.fromtimestamp(create_time, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    return {
+        "id": conversation_id(conversation),
+        "title": conversation.get("title"),
+        "model": conversation.get("default_model_slug") or conversation.get("model_slug"),
+        "create_time": create_time,
+        "update_time": _epoch(conversation.get("update_time")),
+        "created_at": created_at,
+        "custom": "Yes" if conversation.get("gizmo_id") or conversation.get("custom_gpt_id") else "No",
+        "total_messages": sum(by_role.values()),
+        "messages_by_role": by_role,
+        "attachments": "Yes" if attachments else "No",
+    }
+
+
+def _truthy(value: Any) -> bool:
+    # JMESPath truthiness: 0 is true, empty containers are not.
+    if value is None or value is False:
+        return False
+    if isinstance(value, (str, list, dict)):
+        return bool(value)
+    return True
+
+
+class ConversationFilter:
+    """
+    A compiled ``--filter`` expression.
+
+    Raises:
+        ValueError: The expression does not parse.
+    """
+
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        try:
+            self._compiled = jmespath.compile(expression)
+        except JMESPathError as e:
+            raise ValueError(f"Invalid --filter expression {expression!r}: {e}") from e
+
+    def matches(self, conversation: Dict[str, Any]) -> bool:
+        """
+        Raises:
+            ValueError: Evaluating the expression failed (e.g. an unknown function).
+        """
+        record = project(conversation)
+        try:
+            result = self._compiled.search({**record, "items": [record]})
+        except JMESPathTypeError:
+            return False
+        except JMESPathError as e:
+            raise ValueError(f"--filter {self.expression!r} failed on {record['id'] or 'a conversation'}: {e}") from e
+        return _truthy(result)
+
+    def __repr__(self) -> str:
+        return f"ConversationFilter({self.expression!r})"
+
+
+def iter_filtered(conversations: Iterable[Dict[str, Any]], expression: ConversationFilter) -> Iterator[Dict[str, Any]]:
+    """Yield the conversations ``expression`` keeps, in order."""
+    return (convo for convo in conversations if expression.matches(convo))
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+emit_incremental.py
+
+♻️ Incremental, idempotent emit driven by a manifest in the output directory.
+
+The manifest maps each conversation id to the file it was written to, its
+``update_time`` and a SHA-256 of the written JSON. On the next run:
+
+- same ``update_time`` and the file is still there ➤ skipped without
+  serializing the conversation;
+- otherwise the conversation is serialized and hashed, and only written when
+  the hash differs from the manifest's;
+- ids missing from the run have their files removed.
+
+An id that appears more than once keeps its newest copy by ``update_time``
+(ties keep the first), like :mod:`rehash.merge_exports`: older repeats are
+skipped, and a copy older than the one the manifest recorded is never
+written back, so re-running the same export changes nothing.
+"""
+
+import hashlib
+import json
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from rehash.compression import Codec
+from rehash.emit_structured_json import iter_writes, output_suffix, render, write_bytes
+from rehash.export_index import conversation_id
+from rehash.merge_exports import freshness
+
+MANIFEST_NAME = ".rehash-manifest.json"
+MANIFEST_FORMAT = 1
+
+ADDED = "added"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+
+
+class ManifestEntry(NamedTuple):
+    filename: str
+    update_time: Any
+    hash: str
+
+
+class EmitStats:
+    """Per-run counts of added / updated / unchanged / removed conversations."""
+
+    def __init__(self) -> None:
+        self.added = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.added} added, {self.updated} updated, "
+            f"{self.unchanged} unchanged, {self.removed} removed"
+        )
+
+
+class Manifest:
+    """id ➤ :class:`ManifestEntry` for everything a previous run wrote."""
+
+    def __init__(self, entries: Optional[Dict[str, ManifestEntry]] = None) -> None:
+        self.entries: Dict[str, ManifestEntry] = entries or {}
+
+    @classmethod
+    def load(cls, output_dir: Path) -> "Manifest":
+        """Read the manifest in ``output_dir`` (empty if there is none yet)."""
+        path = Path(output_dir) / MANIFEST_NAME
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        if payload.get("format") != MANIFEST_FORMAT:
+            raise ValueError(f"Unsupported manifest format in {path}; delete it to rebuild the output")
+        return cls({cid: ManifestEntry(*e) for cid, e in payload["entries"].items()})
+
+    def save(self, output_dir: Path) -> None:
+        path = Path(output_dir) / MANIFEST_NAME
+        payload = {"format": MANIFEST_FORMAT, "entries": {cid: list(e) for cid, e in self.entries.items()}}
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        tmp.replace(path)
+
+
+def _sync_one(
+    manifest: Manifest, codec: Optional[Codec], level: Optional[int], convo: Dict, file_path: Path
+) -> Tuple[Path, Optional[str], str, Optional[ManifestEntry]]:
+    """Writer task: write ``convo`` only if it differs from the manifest."""
+    cid = conversation_id(convo)
+    old = manifest.entries.get(cid) if cid is not None else None
+    update_time = convo.get("update_time")
+    # The manifest entry, if it still describes the file on disk.
+    same_file = old if old is not None and old.filename == file_path.name and file_path.exists() else None
+
+    if same_file is not None and update_time is not None and same_file.update_time == update_time:
+        return file_path, cid, UNCHANGED, same_file  # 🏃 not even serialized
+    if same_file is not None and freshness(convo) < freshness({"update_time": same_file.update_time}):
+        return file_path, cid, UNCHANGED, same_file  # 🕰️ an older repeat of what is on disk
+
+    data = render(convo)
+    digest = hashlib.sha256(data).hexdigest()
+    entry = ManifestEntry(file_path.name, update_time, digest)
+    if same_file is not None and same_file.hash == digest:
+        return file_path, cid, UNCHANGED, entry
+
+    write_bytes(data, file_path, codec, level)
+    return file_path, cid, (UPDATED if old is not None else ADDED), entry
+
+
+def _newest_repeats(conversations: Iterable[Dict]) -> Iterator[Dict]:
+    """Drop repeats of an id that are not newer than the copy already passed on."""
+    newest: Dict[str, float] = {}
+    for convo in conversations:
+        cid = conversation_id(convo)
+        if cid is not None:
+            stamp = freshness(convo)
+            if cid in newest and stamp <= newest[cid]:
+                continue
+            newest[cid] = stamp
+        yield convo
+
+
+def _count(stats: EmitStats, status: str) -> None:
+    if status == UNCHANGED:
+        stats.unchanged += 1
+    elif status == UPDATED:
+        stats.updated += 1
+    else:
+        stats.added += 1
+
+
+def iter_emit_incremental(
+    conversations: Iterable[Dict],
+    output_dir: Path,
+    stats: Optional[EmitStats] = None,
+    writers: int = 1,
+    compression: Optional[str] = None,
+    level: Optional[int] = None,
+) -> Iterator[Path]:
+    """
+    Like :func:`~rehash.emit_structured_json.iter_emit_conversations`, but
+    only new or changed conversations are written.
+
+    Once the stream is exhausted, files of conversations that are no longer
+    present are deleted and the manifest is saved. Conversations without an
+    id cannot be tracked and are always written. Repeats of an id that are
+    no newer than an earlier copy are skipped.
+
+    Args:
+        stats: Filled with the added / updated / unchanged / removed counts.
+
+    Yields:
+        Path: Output file path of each conversation written or checked, in
+        input order.
+    """
+    stats = stats if stats is not None else EmitStats()
+    suffix, codec, level = output_suffix(compression, level)
+    output_dir = Path(output_dir)
+    previous = Manifest.load(output_dir)
+    current = Manifest()
+
+    written = set()
+    statuses: Dict[str, str] = {}  # one per id, however often it repeats
+    write = partial(_sync_one, previous, codec, level)
+    preferred = {cid: e.filename for cid, e in previous.entries.items()}
+    results = iter_writes(_newest_repeats(conversations), output_dir, suffix, write, writers, preferred)
+    for file_path, cid, status, entry in results:
+        written.add(file_path.name)
+        if cid is None:
+            _count(stats, status)
+        else:
+            statuses[cid] = status
+            if entry is not None:
+                current.entries[cid] = entry
+        yield file_path
+    for status in statuses.values():
+        _count(stats, status)
+
+    # 🧹 Drop files nothing in this run maps to (removed ids, renamed titles).
+    for cid, old in previous.entries.items():
+        if cid not in current.entries:
+            stats.removed += 1
+        if old.filename not in written:
+            (output_dir / old.filename).unlink(missing_ok=True)
+
+    current.save(output_dir)
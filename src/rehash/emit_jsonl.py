@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+emit_jsonl.py
+
+📚 Emit conversations as one compact JSON line each into a single bundle file.
+
+A bundle is ``conversations.jsonl`` (optionally ``.gz`` / ``.bz2`` / ``.xz``),
+optionally rolled over into numbered parts at a size threshold, plus
+``conversations.index.json`` mapping every conversation id to where its line
+lives.
+
+Compressed bundles are written as a series of independently compressed
+blocks of about ``BLOCK_BYTES`` of text each. Blocks can be compressed on
+several threads, and a lookup decompresses one block rather than the whole
+file. An index entry is ``(id, file, block, offset, length)``: ``block`` is
+the byte offset of the block in the file and ``offset`` the position of the
+line within the decompressed block (plain lines are their own block, so
+``offset`` is ``0``).
+"""
+
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from rehash.compression import Codec, codec_for_path, get_codec
+from rehash.export_index import conversation_id
+from rehash.pipeline import ordered_map
+
+BUNDLE_STEM = "conversations"
+INDEX_NAME = f"{BUNDLE_STEM}.index.json"
+BUNDLE_INDEX_FORMAT = 1
+
+# Uncompressed text per compressed block.
+BLOCK_BYTES = 1 << 20
+
+Block = List[Tuple[Optional[str], bytes]]
+
+# Any bundle part this module may have written, whatever the codec.
+_PART_NAME = re.compile(rf"{BUNDLE_STEM}(-\d+)?\.jsonl(\.\w+)?")
+
+
+class BundleEntry(NamedTuple):
+    id: str
+    file: str
+    block: int
+    offset: int
+    length: int
+
+
+class _BundleWriter:
+    """Appends blocks to the current part, rolling over at ``max_bytes``."""
+
+    def __init__(self, output_dir: Path, suffix: str, max_bytes: Optional[int]) -> None:
+        self.output_dir = output_dir
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.part = 0
+        self.raw: Optional[IO[bytes]] = None
+        self.path = output_dir
+        self.written: List[Path] = []
+
+    def _part_path(self) -> Path:
+        if self.max_bytes is None:
+            return self.output_dir / f"{BUNDLE_STEM}{self.suffix}"
+        return self.output_dir / f"{BUNDLE_STEM}-{self.part:05d}{self.suffix}"
+
+    def _open_part(self) -> None:
+        self.close()
+        self.path = self._part_path()
+        self.part += 1
+        self.raw = open(self.path, "wb")
+        self.written.append(self.path)
+
+    def write(self, payload: bytes) -> Tuple[Path, int]:
+        """Append one block; return the part it landed in and its offset there."""
+        if self.raw is None:
+            self._open_part()
+        elif self.max_bytes is not None and self.raw.tell() and self.raw.tell() + len(payload) > self.max_bytes:
+            self._open_part()
+        assert self.raw is not None
+        start = self.raw.tell()
+        self.raw.write(payload)
+        return self.path, start
+
+    def close(self) -> None:
+        if self.raw is not None:
+            self.raw.close()
+            self.raw = None
+
+    def remove_stale(self) -> None:
+        """Delete bundle parts left in ``output_dir`` by an earlier, larger run."""
+        keep = {p.name for p in self.written}
+        for path in self.output_dir.iterdir():
+            if path.name not in keep and _PART_NAME.fullmatch(path.name):
+                path.unlink()
+
+
+def _iter_blocks(conversations: Iterable[Dict[str, Any]], block_bytes: int) -> Iterator[Block]:
+    block: Block = []
+    size = 0
+    for convo in conversations:
+        line = json.dumps(convo, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        block.append((conversation_id(convo), line))
+        size += len(line)
+        if size >= block_bytes:
+            yield block
+            block, size = [], 0
+    if block:
+        yield block
+
+
+def _pack(codec: Optional[Codec], level: Optional[int], block: Block) -> Tuple[Block, bytes]:
+    data = b"".join(line for _, line in block)
+    return block, (codec.compress(data, level) if codec is not None else data)
+
+
+def iter_emit_jsonl(
+    conversations: Iterable[Dict[str, Any]],
+    output_dir: Path,
+    compression: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    level: Optional[int] = None,
+    threads: int = 1,
+) -> Iterator[Path]:
+    """
+    Stream conversations into a JSONL bundle and yield the file each landed in.
+
+    Args:
+        conversations: Parsed conversation objects.
+        output_dir: Directory for the bundle parts and the offset index.
+        compression: ``gzip``, ``bz2`` or ``xz`` (see :mod:`rehash.compression`).
+        max_bytes: Start a new part once the current one would exceed this
+            size on disk (a single oversized block still gets its own part).
+        level: Compression level (codec default when ``None``).
+        threads: Compress this many blocks concurrently; block order, and
+            therefore the output, stays the same.
+
+    Yields:
+        Path: Bundle file holding each conversation, in input order. The
+        offset index is written once the stream is exhausted; parts from an
+        earlier run that this one did not rewrite are deleted then too.
+    """
+    codec = get_codec(compression) if compression else None
+    if codec is not None:
+        codec.check_level(level)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    writer = _BundleWriter(output_dir, ".jsonl" + (codec.suffix if codec else ""), max_bytes)
+    entries: List[BundleEntry] = []
+    blocks = _iter_blocks(conversations, BLOCK_BYTES if codec is not None else 0)
+    pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="rehash-compress") if threads > 1 else None
+
+    def pack(block: Block) -> Tuple[Block, bytes]:
+        return _pack(codec, level, block)
+
+    try:
+        packed = ordered_map(pool, pack, blocks, window=threads * 2) if pool is not None else map(pack, blocks)
+        for block, payload in packed:
+            path, start = writer.write(payload)
+            offset = 0
+            for cid, line in block:
+                if cid is not None:
+                    entries.append(BundleEntry(cid, path.name, start, offset, len(line)))
+                offset += len(line)
+                yield path
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    writer.remove_stale()
+    _save_index(output_dir / INDEX_NAME, entries)
+
+
+def _save_index(path: Path, entries: List[BundleEntry]) -> None:
+    payload = {"format": BUNDLE_INDEX_FORMAT, "entries": [list(e) for e in entries]}
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    tmp.replace(path)
+
+
+def load_bundle_index(output_dir: Path) -> Dict[str, BundleEntry]:
+    """Load a bundle's offset index as ``id ➤ entry``."""
+    path = Path(output_dir) / INDEX_NAME
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    if payload.get("format") != BUNDLE_INDEX_FORMAT:
+        raise ValueError(f"Unsupported bundle index format in {path}")
+    return {e[0]: BundleEntry(*e) for e in payload["entries"]}
+
+
+def read_bundle_conversation(output_dir: Path, entry: BundleEntry) -> Dict[str, Any]:
+    """Seek to one conversation in a bundle and decode only its line."""
+    codec = codec_for_path(entry.file)
+    with open(Path(output_dir) / entry.file, "rb") as raw:
+        raw.seek(entry.block)
+        if codec is None:
+            raw.seek(entry.offset, 1)
+            return json.loads(raw.read(entry.length))
+        with codec.reader(raw) as f:
+            f.seek(entry.offset)
+            return json.loads(f.read(entry.length))
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+emit_sqlite.py
+
+🗄️ Load conversations and their flattened messages into a SQLite database.
+
+Rows are inserted with batched ``executemany`` inside large transactions,
+and message text is indexed with FTS5 once the bulk load is done::
+
+    SELECT c.title, m.role, snippet(messages_fts, 0, '[', ']', '…', 12)
+    FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid
+    JOIN conversations c ON c.pk = m.conversation_pk
+    WHERE messages_fts MATCH 'deadlift' ORDER BY rank LIMIT 20;
+"""
+
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rehash.export_index import conversation_id
+from rehash.merge_exports import freshness
+from rehash.messages import iter_messages, message_role, message_text
+from rehash.utils import to_epoch
+
+# Conversations per executemany batch, and batches per transaction.
+BATCH_SIZE = 500
+BATCHES_PER_COMMIT = 20
+
+SCHEMA = """
+CREATE TABLE conversations (
+    pk INTEGER PRIMARY KEY,
+    id TEXT UNIQUE,
+    title TEXT,
+    create_time REAL,
+    update_time REAL,
+    model_slug TEXT,
+    json TEXT NOT NULL
+);
+CREATE TABLE messages (
+    conversation_pk INTEGER NOT NULL REFERENCES conversations (pk),
+    node_id TEXT NOT NULL,
+    role TEXT,
+    create_time REAL,
+    text TEXT NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX idx_messages_conversation ON messages (conversation_pk);
+CREATE INDEX idx_messages_role ON messages (role);
+CREATE INDEX idx_conversations_update_time ON conversations (update_time);
+"""
+
+# External-content FTS table: the text lives once, in ``messages``.
+FTS = """
+CREATE VIRTUAL TABLE messages_fts USING fts5(text, content='messages', content_rowid='rowid');
+INSERT INTO messages_fts (messages_fts) VALUES ('rebuild');
+"""
+
+ConversationRow = Tuple[int, Optional[str], Any, Optional[float], Optional[float], Any, str]
+MessageRow = Tuple[int, str, Any, Optional[float], str]
+
+
+def _epoch_or_none(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return to_epoch(value)
+    except ValueError:
+        return None
+
+
+def _message_rows(pk: int, convo: Dict[str, Any]) -> Iterator[MessageRow]:
+    """One row per message node that has text parts."""
+    for node_id, message in iter_messages(convo):
+        text = message_text(message)
+        if text:
+            yield pk, node_id, message_role(message), _epoch_or_none(message.get("create_time")), text
+
+
+def _conversation_row(pk: int, cid: Optional[str], convo: Dict[str, Any]) -> ConversationRow:
+    return (
+        pk,
+        cid,
+        convo.get("title"),
+        _epoch_or_none(convo.get("create_time")),
+        _epoch_or_none(convo.get("update_time")),
+        convo.get("default_model_slug"),
+        json.dumps(convo, ensure_ascii=False, separators=(",", ":")),
+    )
+
+
+def _flush(db: sqlite3.Connection, conversations: List[ConversationRow], messages: List[MessageRow]) -> None:
+    db.executemany("INSERT INTO conversations VALUES (?, ?, ?, ?, ?, ?, ?)", conversations)
+    db.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?)", messages)
+    conversations.clear()
+    messages.clear()
+
+
+def _drop(db: sqlite3.Connection, pk: int) -> None:
+    """Delete a conversation and its messages so a newer copy can take its ``pk``."""
+    db.execute("DELETE FROM messages WHERE conversation_pk = ?", (pk,))
+    db.execute("DELETE FROM conversations WHERE pk = ?", (pk,))
+
+def iter_emit_sqlite(
+    conversations: Iterable[Dict[str, Any]],
+    db_path: Path,
+    defer_indexes: bool = False,
+) -> Iterator[Optional[str]]:
+    """
+    Load conversations into a fresh SQLite database and yield each id as it is queued.
+
+    An id that appears more than once keeps its newest copy by ``update_time``
+    (ties keep the first), like :mod:`rehash.merge_exports`; only its first
+    appearance is yielded.
+
+    Args:
+        conversations: Parsed conversation objects.
+        db_path: Database to create. It is built under a temporary name and
+            only replaces ``db_path`` once the load, indexes and FTS are done.
+        defer_indexes: Create the B-tree indexes after the bulk load instead
+            of maintaining them row by row (faster for large exports).
+
+    Raises:
+        ValueError: The SQLite library was built without FTS5.
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = db_path.with_name(f"{db_path.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+
+    db = sqlite3.connect(tmp, isolation_level=None)
+    complete = False
+    try:
+        # 🏎️ The file is private until renamed, so durability can wait.
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+        db.executescript(SCHEMA)
+        if not defer_indexes:
+            db.executescript(INDEXES)
+
+        convo_rows: List[ConversationRow] = []
+        message_rows: List[MessageRow] = []
+        seen: Dict[str, Tuple[int, float]] = {}  # id ➤ (pk, freshness) of the copy loaded
+        pk = batches = 0
+        db.execute("BEGIN")
+        for convo in conversations:
+            cid = conversation_id(convo)
+            if cid is not None and cid in seen:
+                # 🔁 An export repeating an id: a newer copy replaces the loaded one.
+                old_pk, stamp = seen[cid]
+                if freshness(convo) <= stamp:
+                    continue
+                _flush(db, convo_rows, message_rows)
+                _drop(db, old_pk)
+                seen[cid] = (old_pk, freshness(convo))
+                convo_rows.append(_conversation_row(old_pk, cid, convo))
+                message_rows.extend(_message_rows(old_pk, convo))
+                continue
+            pk += 1  # assigned here so message rows need no lookup
+            if cid is not None:
+                seen[cid] = (pk, freshness(convo))
+            convo_rows.append(_conversation_row(pk, cid, convo))
+            message_rows.extend(_message_rows(pk, convo))
+            if len(convo_rows) >= BATCH_SIZE:
+                _flush(db, convo_rows, message_rows)
+                batches += 1
+                if batches % BATCHES_PER_COMMIT == 0:
+                    db.execute("COMMIT")
+                    db.execute("BEGIN")
+            yield cid
+        _flush(db, convo_rows, message_rows)
+        db.execute("COMMIT")
+
+        if defer_indexes:
+            db.executescript(INDEXES)
+        try:
+            db.executescript(FTS)
+        except sqlite3.OperationalError as e:
+            if "fts5" in str(e):
+                raise ValueError(f"This SQLite build ({sqlite3.sqlite_version}) lacks FTS5") from e
+            raise
+        db.execute("PRAGMA journal_mode = DELETE")
+        db.close()
+        os.replace(tmp, db_path)
+        complete = True
+    finally:
+        if not complete:
+            db.close()
+            tmp.unlink(missing_ok=True)
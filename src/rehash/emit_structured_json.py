@@ -6,12 +6,22 @@ emit_structured_json.py
 📤 Emit individual JSON files from a structured conversation export list.
 """
 
+import hashlib
+import io
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 import re
 
+from rehash.compression import Codec, get_codec
+from rehash.export_index import conversation_id
+from rehash.pipeline import ordered_map
+from rehash.utils import to_epoch
+
 
 def slugify(text: str, max_length: int = 48) -> str:
     """Sanitize a string to be filename-safe."""
@@ -21,45 +31,216 @@ def slugify(text: str, max_length: int = 48) -> str:
     return text[:max_length].strip("_")
 
 
-def emit_conversations(conversations: List[Dict], output_dir: Path) -> List[Path]:
+def _stem(convo: Dict) -> str:
+    ts = convo.get("create_time") or convo.get("timestamp") or "0"
+    try:
+        # ➕ Support ISO8601 parsing
+        ts = to_epoch(ts)
+    except Exception:
+        raise ValueError(f"Invalid timestamp: {ts} in conversation: {convo.get('title', '[no title]')}")
+
+    dt = datetime.fromtimestamp(ts)
+    date_str = dt.strftime("%Y-%m-%d")
+
+    title = convo.get("title", "untitled")
+    slug = slugify(title)
+
+    return f"{date_str}__{slug}"
+
+
+def id_suffix(cid: str) -> str:
+    """Short, stable tag derived from a conversation id."""
+    return hashlib.sha1(cid.encode("utf-8")).hexdigest()[:8]
+
+
+class FilenameAllocator:
     """
-    Emit structured JSON conversations to disk with safe, timestamped filenames.
+    Hands out ``{date}__{slug}`` filenames, never the same one to two conversations.
+
+    The first conversation to claim a name gets it bare; later ones with a
+    different id get ``{date}__{slug}__{id_suffix}``, which does not depend
+    on input order. ``preferred`` (id ➤ filename, e.g. from an incremental
+    manifest) reserves every name handed out last run for its old owner up
+    front, so a new conversation listed earlier cannot take it. Without
+    ``preferred`` the bare name goes to whichever conversation comes first,
+    so names are only stable across runs for the same input order.
+    Repeats of the same id map to the same file.
+    """
+
+    def __init__(self, suffix: str = ".json", preferred: Optional[Dict[str, str]] = None) -> None:
+        self.suffix = suffix
+        self._preferred = preferred or {}
+        self._owners: Dict[str, object] = {name: cid for cid, name in self._preferred.items()}
+
+    def allocate(self, convo: Dict) -> str:
+        stem = _stem(convo)
+        cid = conversation_id(convo)
+        owner: object = cid if cid is not None else object()
+
+        candidates = [f"{stem}{self.suffix}"]
+        if cid is not None:
+            candidates.append(f"{stem}__{id_suffix(cid)}{self.suffix}")
+            if self._preferred.get(cid) in candidates:
+                candidates.insert(0, self._preferred[cid])
+
+        n = 2
+        while True:
+            for name in candidates:
+                if self._owners.setdefault(name, owner) == owner:
+                    return name
+            # Anonymous or (vanishingly unlikely) tag clashes: count upwards.
+            candidates = [f"{stem}__{n}{self.suffix}"]
+            n += 1
+
+
+def _write(convo: Dict, file_path: Path, codec: Optional[Codec] = None, level: Optional[int] = None) -> Path:
+    if codec is None:
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(convo, f, ensure_ascii=False, indent=2)
+        return file_path
+
+    # 🗜️ json.dump writes in chunks, so the file streams through the compressor.
+    with io.TextIOWrapper(codec.open(file_path, level), encoding="utf-8") as f:
+        json.dump(convo, f, ensure_ascii=False, indent=2)
+    return file_path
+
+
+def render(convo: Dict) -> bytes:
+    """Serialize a conversation exactly as :func:`_write` lays it out on disk."""
+    return json.dumps(convo, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def write_bytes(data: bytes, file_path: Path, codec: Optional[Codec] = None, level: Optional[int] = None) -> Path:
+    """Write pre-rendered conversation bytes, compressing them if asked."""
+    with (codec.open(file_path, level) if codec is not None else open(file_path, "wb")) as f:
+        f.write(data)
+    return file_path
+
+
+# (conversation, target path or the error naming it, earlier write to the same path, done flag)
+WriteTask = Tuple[Dict, Union[Path, ValueError], Optional[threading.Event], threading.Event]
+WriteFn = Callable[[Dict, Path], Any]
+
+
+def _write_after(task: WriteTask, write: WriteFn) -> Any:
+    """Pool task: wait for an earlier write to the same path, then write."""
+    convo, file_path, previous, done = task
+    try:
+        if isinstance(file_path, ValueError):
+            raise file_path
+        if previous is not None:
+            previous.wait()
+        return write(convo, file_path)
+    finally:
+        done.set()
+
+
+def _iter_write_tasks(
+    conversations: Iterable[Dict], output_dir: Path, names: FilenameAllocator
+) -> Iterator[WriteTask]:
+    last: Dict[Path, threading.Event] = {}
+    for convo in conversations:
+        try:
+            file_path = output_dir / names.allocate(convo)
+        except ValueError as e:
+            # Raised from the pool so earlier files are still yielded first.
+            yield convo, e, None, threading.Event()
+            return
+        done = threading.Event()
+        yield convo, file_path, last.get(file_path), done
+        last[file_path] = done
+
+
+def iter_writes(
+    conversations: Iterable[Dict],
+    output_dir: Path,
+    suffix: str,
+    write: WriteFn,
+    writers: int = 1,
+    preferred: Optional[Dict[str, str]] = None,
+) -> Iterator[Any]:
+    """
+    Run ``write(convo, path)`` for every conversation, on ``writers`` threads.
+
+    Paths come from a :class:`FilenameAllocator` seeded with ``preferred``.
+    Results come back in input order; see :func:`iter_emit_conversations`
+    for the ordering and error guarantees.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    names = FilenameAllocator(suffix, preferred)
+
+    if writers <= 1:
+        for convo in conversations:
+            yield write(convo, output_dir / names.allocate(convo))
+        return
+
+    tasks = _iter_write_tasks(conversations, output_dir, names)
+    with ThreadPoolExecutor(max_workers=writers, thread_name_prefix="rehash-writer") as pool:
+        yield from ordered_map(pool, partial(_write_after, write=write), tasks, window=writers * 4)
+
+
+def output_suffix(compression: Optional[str], level: Optional[int]) -> Tuple[str, Optional[Codec], Optional[int]]:
+    """Resolve ``compression`` into the file suffix, codec and checked level."""
+    codec = get_codec(compression) if compression else None
+    if codec is None:
+        return ".json", None, level
+    return ".json" + codec.suffix, codec, codec.check_level(level)
+
+
+def iter_emit_conversations(
+    conversations: Iterable[Dict],
+    output_dir: Path,
+    writers: int = 1,
+    compression: Optional[str] = None,
+    level: Optional[int] = None,
+) -> Iterator[Path]:
+    """
+    Write each conversation as soon as it arrives and yield its output path.
+
+    Same-day conversations with the same title get distinct filenames (see
+    :class:`FilenameAllocator`).
 
     Args:
-        conversations (List[Dict]): Parsed conversation objects.
+        conversations (Iterable[Dict]): Parsed conversation objects, e.g. a
+            list or the stream from ``iter_conversations``.
         output_dir (Path): Where to write JSON files.
+        writers (int): Threads serializing and writing files concurrently.
+            Paths are still yielded in input order, repeats of the same
+            conversation id keep their input order, and the first failure is
+            raised once every earlier file has been yielded.
+        compression (Optional[str]): Write ``.json.gz`` / ``.json.bz2`` /
+            ``.json.xz`` files through a streaming compressor instead.
+        level (Optional[int]): Compression level (codec default when ``None``).
 
-    Returns:
-        List[Path]: List of output file paths.
+    Yields:
+        Path: Output file path of each conversation, in input order.
     """
-    output_dir.mkdir(parents=True, exist_ok=True)
-    output_paths = []
+    suffix, codec, level = output_suffix(compression, level)
+    write = partial(_write, codec=codec, level=level)
+    yield from iter_writes(conversations, output_dir, suffix, write, writers)
 
-    for convo in conversations:
-        ts = convo.get("create_time") or convo.get("timestamp") or "0"
-        try:
-            # ➕ Support ISO8601 parsing
-            if isinstance(ts, str) and "T" in ts:
-                ts = datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
-            else:
-                ts = float(ts)
-        except Exception:
-            raise ValueError(f"Invalid timestamp: {ts} in conversation: {convo.get('title', '[no title]')}")
-        
-        dt = datetime.fromtimestamp(ts)
-        
-        
-        date_str = dt.strftime("%Y-%m-%d")
-
-        title = convo.get("title", "untitled")
-        slug = slugify(title)
-
-        filename = f"{date_str}__{slug}.json"
-        file_path = output_dir / filename
 
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(convo, f, ensure_ascii=False, indent=2)
+def emit_conversations(
+    conversations: Iterable[Dict],
+    output_dir: Path,
+    writers: int = 1,
+    compression: Optional[str] = None,
+    level: Optional[int] = None,
+) -> List[Path]:
+    """
+    Emit structured JSON conversations to disk with safe, timestamped filenames.
 
-        output_paths.append(file_path)
+    Args:
+        conversations (Iterable[Dict]): Parsed conversation objects, e.g. a
+            list or the stream from ``iter_conversations``.
+        output_dir (Path): Where to write JSON files.
+        writers (int): Writer threads (see :func:`iter_emit_conversations`).
+        compression (Optional[str]): ``gzip``, ``bz2`` or ``xz``.
+        level (Optional[int]): Compression level.
 
-    return output_paths
+    Returns:
+        List[Path]: List of output file paths.
+    """
+    return list(iter_emit_conversations(
+        conversations, output_dir, writers=writers, compression=compression, level=level
+    ))
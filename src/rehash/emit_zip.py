@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+emit_zip.py
+
+🗃️ Stream emitted conversations straight into a ZIP archive.
+
+Each conversation is serialized directly into its archive member, so there is
+no intermediate output directory and no second pass to zip it up. Member
+names match what :func:`~rehash.emit_structured_json.iter_emit_conversations`
+would write to disk. A member cannot be rewritten once the archive has moved
+past it, so a repeated conversation id keeps its first copy; run exports
+through ``rehash merge`` to keep the newest instead.
+"""
+
+import io
+import json
+import os
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+from rehash.emit_structured_json import FilenameAllocator
+
+ZIP_COMPRESSION = {
+    "stored": zipfile.ZIP_STORED,
+    "deflated": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+# ``compresslevel`` range of the methods that take one.
+ZIP_LEVELS = {"deflated": (0, 9), "bzip2": (1, 9)}
+
+
+def iter_emit_zip(
+    conversations: Iterable[Dict],
+    zip_path: Path,
+    compression: str = "deflated",
+    level: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Write each conversation into ``zip_path`` as it arrives and yield its member name.
+
+    Args:
+        conversations (Iterable[Dict]): Parsed conversation objects.
+        zip_path (Path): Archive to create. It only appears once the stream
+            is exhausted; an interrupted run leaves nothing behind.
+        compression (str): ``stored``, ``deflated``, ``bzip2`` or ``lzma``.
+        level (Optional[int]): ``compresslevel`` for deflated/bzip2.
+
+    Yields:
+        str: Archive member name of each conversation written, in input
+        order. Repeats of an id already written are skipped.
+    """
+    try:
+        method = ZIP_COMPRESSION[compression]
+    except KeyError:
+        raise ValueError(f"Unknown ZIP compression '{compression}'; choose from {', '.join(ZIP_COMPRESSION)}")
+    if level is not None:
+        if compression not in ZIP_LEVELS:
+            raise ValueError(f"ZIP compression '{compression}' does not take a compression level")
+        low, high = ZIP_LEVELS[compression]
+        if not low <= level <= high:
+            raise ValueError(f"ZIP {compression} compression level must be {low}-{high}, got {level}")
+
+    zip_path = Path(zip_path)
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = zip_path.with_name(f"{zip_path.name}.{os.getpid()}.tmp")
+    names = FilenameAllocator()
+    written = set()
+    complete = False
+    try:
+        # 📦 allowZip64 covers archives past 4 GiB or 65,535 members.
+        with zipfile.ZipFile(tmp, "w", compression=method, compresslevel=level, allowZip64=True) as zf:
+            for convo in conversations:
+                name = names.allocate(convo)
+                if name in written:
+                    continue  # 🔁 same id again; the archive already holds it
+                written.add(name)
+                with io.TextIOWrapper(zf.open(name, "w"), encoding="utf-8") as f:
+                    json.dump(convo, f, ensure_ascii=False, indent=2)
+                yield name
+        os.replace(tmp, zip_path)
+        complete = True
+    finally:
+        if not complete:
+            tmp.unlink(missing_ok=True)
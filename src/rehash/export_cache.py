@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+export_cache.py
+
+🗄️ On-disk cache of parsed conversations, keyed by export ZIP fingerprint.
+
+Each entry is a stream of pickled conversations written while the export is
+parsed, so warm runs skip inflate + JSON decode and still load one
+conversation at a time.
+
+The cache holds at most ``$REHASH_CACHE_MAX_SIZE`` bytes (default 2 GiB; K/M/G
+suffixes allowed, ``0`` turns caching off). Exports whose conversations.json
+is larger than that are not cached at all.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+from zipfile import ZipInfo
+
+DEFAULT_MAX_BYTES = 2 << 30  # 2 GiB
+CACHE_FORMAT = 1
+
+MAX_SIZE_ENV = "REHASH_CACHE_MAX_SIZE"
+_SIZE_SUFFIXES = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+_SUFFIX = ".pickle"
+_END = ("rehash-cache-end",)
+
+
+class CorruptEntry(pickle.UnpicklingError):
+    """A cache entry is truncated or damaged and cannot be read back."""
+
+
+def default_cache_dir() -> Path:
+    """Resolve ``$REHASH_CACHE_DIR``, then ``$XDG_CACHE_HOME/rehash``, then ``~/.cache/rehash``."""
+    explicit = os.environ.get("REHASH_CACHE_DIR")
+    if explicit:
+        return Path(explicit)
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg) if xdg else Path.home() / ".cache"
+    return base / "rehash"
+
+
+def default_max_bytes() -> int:
+    """
+    Resolve ``$REHASH_CACHE_MAX_SIZE`` (e.g. ``8G``), else :data:`DEFAULT_MAX_BYTES`.
+
+    Raises:
+        ValueError: The variable is not a byte count.
+    """
+    value = os.environ.get(MAX_SIZE_ENV, "").strip()
+    if not value:
+        return DEFAULT_MAX_BYTES
+    scale = _SIZE_SUFFIXES.get(value[-1:].upper(), 1)
+    digits = value[:-1] if scale != 1 else value
+    if not digits.isdigit():
+        raise ValueError(f"${MAX_SIZE_ENV} must be a byte count such as 512M or 8G, got {value!r}")
+    return int(digits) * scale
+
+
+def fingerprint(source: Path, member: Optional[ZipInfo] = None) -> str:
+    """
+    Cache key from the source file's path, size and mtime.
+
+    For a ZIP, ``member`` is the conversations.json entry and its CRC is
+    part of the key too.
+    """
+    stat = source.stat()
+    parts = [CACHE_FORMAT, str(source.resolve()), stat.st_size, stat.st_mtime_ns]
+    if member is not None:
+        parts += [member.filename, member.CRC]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+class ExportCache:
+    """Size-bounded, least-recently-used store of parsed exports."""
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: Optional[int] = None) -> None:
+        self.directory = Path(directory) if directory is not None else default_cache_dir()
+        self.max_bytes = max_bytes if max_bytes is not None else default_max_bytes()
+
+    def fits(self, size: int) -> bool:
+        """Whether an export of ``size`` bytes is worth caching (it would not be evicted at once)."""
+        return size <= self.max_bytes
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}{_SUFFIX}"
+
+    def load(self, key: str) -> Optional[Iterator[Any]]:
+        """Return a lazy iterator over a cached entry, or ``None`` on a miss."""
+        path = self.path_for(key)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # 🕒 mark as recently used
+        return self._iter_entry(f)
+
+    def drop(self, key: str) -> None:
+        """Delete an entry, e.g. one that turned out to be corrupt."""
+        self.path_for(key).unlink(missing_ok=True)
+
+    @staticmethod
+    def _iter_entry(f: Any) -> Iterator[Any]:
+        with f:
+            unpickler = pickle.Unpickler(f)
+            while True:
+                try:
+                    item = unpickler.load()
+                except Exception as e:  # 🧨 garbage can fail in many ways, not just UnpicklingError
+                    raise CorruptEntry(f"{type(e).__name__}: {e}") from e
+                if item == _END:
+                    return
+                yield item
+
+    def store(self, key: str, conversations: Iterable[Any]) -> Iterator[Any]:
+        """
+        Pass ``conversations`` through while writing them to the cache.
+
+        The entry only becomes visible once the stream has been fully
+        consumed; an interrupted run leaves nothing behind.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        complete = False
+        try:
+            with open(tmp, "wb") as f:
+                pickler = pickle.Pickler(f, protocol=pickle.HIGHEST_PROTOCOL)
+                for item in conversations:
+                    pickler.dump(item)
+                    pickler.clear_memo()
+                    yield item
+                pickler.dump(_END)
+            os.replace(tmp, path)
+            complete = True
+        finally:
+            if not complete:
+                tmp.unlink(missing_ok=True)
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop least-recently-used entries until the cache fits ``max_bytes``."""
+        entries = []
+        for path in self.directory.glob(f"*{_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+export_handle.py
+
+📂 Open handle on a ChatGPT export: a .zip archive or an extracted folder.
+
+The archive (or folder) is listed once when the handle is opened; the
+resulting :class:`MemberIndex` records where conversations.json, user.json,
+the HTML viewer and the asset files live, wherever the export nests them.
+
+When the bytes of conversations.json are stored uncompressed (a ZIP_STORED
+member, or a plain file in an extracted folder) they can be memory-mapped
+instead of read into a Python bytes object.
+"""
+
+import mmap
+import os
+import posixpath
+import struct
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from zipfile import BadZipFile, ZipFile, ZipInfo
+
+from rehash.export_cache import fingerprint
+
+CONVERSATIONS = "conversations.json"
+USER = "user.json"
+
+# ZIP local file header (APPNOTE 4.3.7) and the fields holding the name and
+# extra-field lengths.
+_FILE_HEADER = struct.Struct("<4s2B4HL2L2H")
+_FH_FILENAME_LENGTH = 10
+_FH_EXTRA_FIELD_LENGTH = 11
+
+
+class MemberIndex:
+    """
+    Where the interesting members of an export live.
+
+    Names are ``/``-separated paths relative to the archive (or folder) root.
+    ``root`` is the directory holding conversations.json (``""`` when it sits
+    at the top level); the shallowest conversations.json wins.
+    """
+
+    def __init__(self, names: Iterable[str]) -> None:
+        files = sorted(n for n in names if not n.endswith("/"))
+        candidates = [n for n in files if posixpath.basename(n) == CONVERSATIONS]
+        if not candidates:
+            raise FileNotFoundError(f"{CONVERSATIONS} not found")
+
+        self.conversations: str = min(candidates, key=lambda n: (n.count("/"), n))
+        self.root: str = posixpath.dirname(self.conversations)
+        prefix = f"{self.root}/" if self.root else ""
+
+        user = prefix + USER
+        self.names = frozenset(files)
+        self.user: Optional[str] = user if user in self.names else None
+        self.html: List[str] = []
+        self.assets: List[str] = []
+        for name in files:
+            if not name.startswith(prefix):
+                continue
+            ext = posixpath.splitext(name)[1].lower()
+            if ext in (".html", ".htm"):
+                self.html.append(name)
+            elif ext != ".json":
+                self.assets.append(name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.names
+
+
+def _list_folder(folder: Path) -> Iterator[str]:
+    for dirpath, _, filenames in os.walk(folder):
+        rel = Path(dirpath).relative_to(folder).as_posix()
+        for filename in filenames:
+            yield filename if rel == "." else f"{rel}/{filename}"
+
+
+class ExportHandle:
+    """Validated, open export; use as a context manager or call :meth:`close`."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.is_folder = self.path.is_dir()
+        self._zip: Optional[ZipFile] = None
+        self._infos: Dict[str, ZipInfo] = {}
+
+        if self.is_folder:
+            try:
+                self.members = MemberIndex(_list_folder(self.path))
+            except FileNotFoundError:
+                raise FileNotFoundError("conversations.json not found in export folder.")
+            return
+
+        if not self.path.exists() or not self.path.is_file():
+            raise FileNotFoundError(f"Zip path does not exist: {self.path}")
+        if not self.path.name.endswith(".zip"):
+            raise BadZipFile(f"Not a .zip file: {self.path}")
+
+        # 📇 One pass over the central directory; later opens are dict lookups.
+        self._zip = ZipFile(self.path, "r")
+        self._infos = {info.filename: info for info in self._zip.infolist()}
+        try:
+            self.members = MemberIndex(self._infos)
+        except FileNotFoundError:
+            self._zip.close()
+            raise FileNotFoundError("conversations.json not found in ZIP.")
+
+    def __enter__(self) -> "ExportHandle":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    @property
+    def conversations_path(self) -> Path:
+        """The extracted conversations.json file (folder exports only)."""
+        return self.path / self.members.conversations
+
+    @property
+    def conversations_info(self) -> Optional[ZipInfo]:
+        """ZIP directory entry of conversations.json (``None`` for folders)."""
+        return self._infos.get(self.members.conversations)
+
+    @property
+    def conversations_size(self) -> int:
+        """Uncompressed size of conversations.json in bytes."""
+        info = self.conversations_info
+        return info.file_size if info is not None else self.conversations_path.stat().st_size
+
+    def open_member(self, name: str) -> IO[bytes]:
+        """
+        Open any export member by its :class:`MemberIndex` name.
+
+        Raises:
+            FileNotFoundError: ``name`` is not part of the export.
+        """
+        if name not in self.members:
+            raise FileNotFoundError(f"{name} not found in export: {self.path}")
+        if self._zip is None:
+            return open(self.path / name, "rb")
+        return self._zip.open(self._infos[name])
+
+    def fingerprint(self) -> str:
+        """Cache key for the parsed contents of conversations.json."""
+        if self.is_folder:
+            return fingerprint(self.conversations_path)
+        return fingerprint(self.path, self.conversations_info)
+
+    def open_conversations(self) -> IO[bytes]:
+        """Open conversations.json as a binary stream (inflating if needed)."""
+        return self.open_member(self.members.conversations)
+
+    def mapped_location(self) -> Optional[Tuple[Path, int, int]]:
+        """
+        Where the raw bytes of conversations.json sit on disk, if they can be mapped.
+
+        Returns:
+            ``(file, offset, length)``, or ``None`` for compressed or
+            encrypted ZIP members.
+        """
+        if self.is_folder:
+            return self.conversations_path, 0, self.conversations_path.stat().st_size
+
+        info = self.conversations_info
+        assert info is not None
+        if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(info.header_offset)
+            header = _FILE_HEADER.unpack(f.read(_FILE_HEADER.size))
+        offset = (
+            info.header_offset
+            + _FILE_HEADER.size
+            + header[_FH_FILENAME_LENGTH]
+            + header[_FH_EXTRA_FIELD_LENGTH]
+        )
+        return self.path, offset, info.file_size
+
+    @contextmanager
+    def map_conversations(self) -> Iterator[Optional[memoryview]]:
+        """
+        Memory-map conversations.json and yield a zero-copy view of its bytes.
+
+        Yields ``None`` when the bytes are compressed (or empty) and have to
+        be streamed through :meth:`open_conversations` instead.
+        """
+        location = self.mapped_location()
+        if location is None or location[2] == 0:
+            yield None
+            return
+
+        file, offset, length = location
+        with open(file, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mm)[offset:offset + length]
+            try:
+                yield view
+            finally:
+                view.release()
+                try:
+                    mm.close()
+                except BufferError:
+                    pass  # a stray slice still references the map; GC unmaps it
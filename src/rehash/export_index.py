@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+export_index.py
+
+🗂️ Sidecar index mapping conversation ids to byte ranges in conversations.json.
+
+The index is a small JSON file next to the export ZIP (or inside an
+extracted export folder). Entries are sorted by id, so a lookup is a binary
+search followed by a seek + decode of just that one conversation. (For a
+deflated member the seek itself re-inflates everything before the offset.)
+"""
+
+import json
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from rehash.export_handle import ExportHandle
+from rehash.json_stream import iter_array_scan, iter_buffer_scan, scan_object
+
+INDEX_FORMAT = 1
+INDEX_SUFFIX = ".rehash-index.json"
+ENTRY_FIELDS = ("id", "conversation_id", "title", "create_time", "update_time")
+
+
+class IndexEntry(NamedTuple):
+    id: str
+    offset: int
+    length: int
+    title: Optional[str]
+    create_time: Any
+    update_time: Any
+
+
+class AmbiguousIdError(ValueError):
+    """Raised when an id prefix matches more than one conversation."""
+
+    def __init__(self, prefix: str, matches: List[IndexEntry]) -> None:
+        self.matches = matches
+        lines = [f"  {m.id}  {m.title or '[no title]'}" for m in matches]
+        super().__init__(
+            f"Id prefix '{prefix}' matches {len(matches)} conversations; "
+            "retry with a longer id:\n" + "\n".join(lines)
+        )
+
+
+def conversation_id(convo: Dict[str, Any]) -> Optional[str]:
+    """Return the export's conversation id (``id`` or ``conversation_id``)."""
+    value = convo.get("id") or convo.get("conversation_id")
+    return str(value) if value is not None else None
+
+
+def _scan_entry(buf: Any, pos: int) -> Tuple[Dict[str, Any], int]:
+    return scan_object(buf, ENTRY_FIELDS, pos)
+
+
+def default_index_path(zip_path: Union[str, Path]) -> Path:
+    zip_path = Path(zip_path)
+    if zip_path.is_dir():
+        return zip_path / INDEX_SUFFIX.lstrip(".")
+    return zip_path.with_name(zip_path.name + INDEX_SUFFIX)
+
+
+class ExportIndex:
+    """In-memory view of a sidecar index, searchable by id or unique prefix."""
+
+    def __init__(
+        self,
+        entries: List[IndexEntry],
+        member: str,
+        crc: Optional[int],
+        size: int,
+        mtime_ns: Optional[int] = None,
+    ) -> None:
+        self.entries = sorted(entries, key=lambda e: e.id)
+        self.ids = [e.id for e in self.entries]
+        self.member = member
+        self.crc = crc
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, prefix: str) -> IndexEntry:
+        """
+        Find a conversation by full id, or by a prefix that is unique.
+
+        Raises:
+            AmbiguousIdError: The prefix matches several conversations.
+            ValueError: Nothing matches.
+        """
+        i = bisect_left(self.ids, prefix)
+        if i < len(self.ids) and self.ids[i] == prefix:
+            return self.entries[i]
+
+        matches = []
+        while i < len(self.ids) and self.ids[i].startswith(prefix):
+            matches.append(self.entries[i])
+            i += 1
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            raise AmbiguousIdError(prefix, matches)
+        raise ValueError(f"No conversation matches id '{prefix}'")
+
+    def save(self, path: Path) -> None:
+        payload = {
+            "format": INDEX_FORMAT,
+            "member": self.member,
+            "crc": self.crc,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "entries": [list(e) for e in self.entries],
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ExportIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("format") != INDEX_FORMAT:
+            raise ValueError(f"Unsupported index format in {path}; rebuild with `rehash index build`")
+        entries = [IndexEntry(*e) for e in payload["entries"]]
+        return cls(entries, payload["member"], payload["crc"], payload["size"], payload.get("mtime_ns"))
+
+
+def _member_stamp(handle: ExportHandle) -> Tuple[str, Optional[int], int, Optional[int]]:
+    """``(member, crc, size, mtime_ns)`` used to detect a stale index."""
+    info = handle.conversations_info
+    if info is not None:
+        return info.filename, info.CRC, info.file_size, None
+    stat = handle.conversations_path.stat()
+    return handle.members.conversations, None, stat.st_size, stat.st_mtime_ns
+
+
+def _iter_entries(handle: ExportHandle) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    with handle.map_conversations() as view:
+        if view is not None:
+            yield from iter_buffer_scan(view, _scan_entry)
+            return
+    with handle.open_conversations() as f:
+        yield from iter_array_scan(f, _scan_entry)
+
+
+def build_index(zip_path: Union[str, Path], out: Optional[Path] = None) -> Path:
+    """
+    Scan an export once and write its sidecar index.
+
+    Args:
+        zip_path: Export ZIP or extracted export folder to index.
+        out: Index path (default: ``<zip>.rehash-index.json``).
+
+    Returns:
+        Path: Where the index was written.
+    """
+    entries = []
+    with ExportHandle(zip_path) as handle:
+        out = Path(out) if out is not None else default_index_path(handle.path)
+        # 🪶 Only the metadata fields are decoded; ``mapping`` is skipped.
+        for offset, length, convo in _iter_entries(handle):
+            cid = conversation_id(convo)
+            if cid is None:
+                continue
+            entries.append(IndexEntry(
+                cid, offset, length,
+                convo.get("title"), convo.get("create_time"), convo.get("update_time"),
+            ))
+        stamp = _member_stamp(handle)
+
+    ExportIndex(entries, *stamp).save(out)
+    return out
+
+
+def open_index(zip_path: Union[str, Path], path: Optional[Path] = None) -> ExportIndex:
+    """Load the sidecar index of ``zip_path`` and check it still matches the export."""
+    with ExportHandle(zip_path) as handle:
+        path = Path(path) if path is not None else default_index_path(handle.path)
+        if not path.exists():
+            raise FileNotFoundError(f"No index for {zip_path}; run `rehash index build {zip_path}`")
+
+        index = ExportIndex.load(path)
+        stamp = _member_stamp(handle)
+    if stamp != (index.member, index.crc, index.size, index.mtime_ns):
+        raise ValueError(f"Index {path} is stale; rebuild with `rehash index build {zip_path}`")
+    return index
+
+
+def read_conversation(zip_path: Union[str, Path], index: ExportIndex, entry: IndexEntry) -> Dict[str, Any]:
+    """
+    Seek to one indexed conversation and decode only its bytes.
+
+    Memory-mapped sources (an extracted folder, or a ZIP_STORED member) seek
+    in constant time. A deflated member cannot be entered mid-stream, so
+    ``ZipExtFile.seek`` inflates and discards everything before
+    ``entry.offset``: the cost is O(offset) decompression, though only the
+    one conversation is JSON-decoded.
+    """
+    with ExportHandle(zip_path) as handle:
+        with handle.map_conversations() as view:
+            if view is not None:
+                return json.loads(bytes(view[entry.offset:entry.offset + entry.length]))
+        with handle.open_conversations() as f:
+            f.seek(entry.offset)
+            raw = f.read(entry.length)
+    return json.loads(raw)
@@ -1,27 +1,271 @@
 import json
-from zipfile import ZipFile, BadZipFile
+import logging
+import mmap
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import Union, List, Dict, Any
+from typing import Union, List, Dict, Any, Iterable, Iterator, Optional, Tuple
 
-def extract_export(zip_path: Union[str, Path]) -> List[Dict[str, Any]]:
-    zip_path = Path(zip_path)
+from rehash.export_cache import CorruptEntry, ExportCache
+from rehash.export_handle import ExportHandle
+from rehash.filter_fitness_logs import is_fitness_conversation, match_raw_conversation, scan_fitness_conversation
+from rehash.fitness_rules import RuleSet
+from rehash.json_stream import (
+    iter_array_items,
+    iter_array_scan,
+    iter_array_spans,
+    iter_buffer_scan,
+    scan_object,
+    scan_object_fields,
+)
+from rehash.pipeline import ordered_map, process_pool
 
-    if not zip_path.exists() or not zip_path.is_file():
-        raise FileNotFoundError(f"Zip path does not exist: {zip_path}")
-    if not zip_path.name.endswith(".zip"):
-        raise BadZipFile(f"Not a .zip file: {zip_path}")
+logger = logging.getLogger(__name__)
 
-    with ZipFile(zip_path, 'r') as zf:
-        try:
-            with zf.open('conversations.json') as f:
-                data = json.load(f)
-        except KeyError:
-            raise FileNotFoundError("conversations.json not found in ZIP.")
+# Smallest slice of conversations.json handed to one worker task.
+MIN_BATCH_BYTES = 1 << 20
 
-    if not isinstance(data, list):
-        raise TypeError("Expected top-level list in conversations.json")
+# Top-level fields kept by shallow extraction; ``mapping`` is never decoded.
+SHALLOW_FIELDS = ("id", "conversation_id", "title", "create_time", "update_time", "default_model_slug")
 
-    return data
+
+def _shallow_projection(found: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": found.get("id") or found.get("conversation_id"),
+        "title": found.get("title"),
+        "create_time": found.get("create_time"),
+        "update_time": found.get("update_time"),
+        "model_slug": found.get("default_model_slug"),
+    }
+
+
+def shallow_record(raw: bytes, pos: int = 0) -> Dict[str, Any]:
+    """
+    Pull conversation metadata out of raw JSON without decoding ``mapping``.
+
+    Returns:
+        Dict[str, Any]: ``id``, ``title``, ``create_time``, ``update_time``
+        and ``model_slug`` (missing fields are ``None``).
+    """
+    return _shallow_projection(scan_object_fields(raw, SHALLOW_FIELDS, pos))
+
+
+def _scan_shallow(buf: Any, pos: int) -> Tuple[Dict[str, Any], int]:
+    found, end = scan_object(buf, SHALLOW_FIELDS, pos)
+    return _shallow_projection(found), end
+
+
+# A batch source is either the bytes of a slice, or ``(file, offset, length)``
+# of a memory-mappable region that each worker maps for itself.
+BatchSource = Union[bytes, Tuple[str, int, int]]
+Batch = Tuple[BatchSource, List[Tuple[int, int]], bool, Optional[RuleSet]]
+
+_worker_maps: Dict[str, mmap.mmap] = {}
+
+
+def _batch_buffer(source: BatchSource) -> Any:
+    if isinstance(source, bytes):
+        return source
+    file, offset, length = source
+    mm = _worker_maps.get(file)
+    if mm is None:
+        with open(file, "rb") as f:
+            mm = _worker_maps[file] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mm)[offset:offset + length]
+
+
+class ExtractStats:
+    """Counts filled in as an extraction stream is consumed."""
+
+    def __init__(self) -> None:
+        self.total = 0  # conversations in the export
+        self.kept = 0  # conversations yielded (after any pushed-down filter)
+
+
+def _decode_batch(batch: Batch) -> List[Any]:
+    """Worker task: decode every element span of one contiguous slice."""
+    source, spans, shallow, rules = batch
+    buf = _batch_buffer(source)
+    if shallow:
+        return [shallow_record(buf, start) for start, _ in spans]
+    if rules is not None:
+        # ``None`` placeholders keep the parent's count of scanned conversations.
+        return [match_raw_conversation(buf, start, end, rules) for start, end in spans]
+    return [json.loads(bytes(buf[start:end])) for start, end in spans]
+
+
+def _iter_batches(
+    buf: Any, jobs: int, shallow: bool, location: Optional[Tuple[Path, int, int]], rules: Optional[RuleSet]
+) -> Iterator[Batch]:
+    """Group element spans into contiguous slices of roughly equal size."""
+    target = max(MIN_BATCH_BYTES, len(buf) // (jobs * 4))
+    spans: List[Tuple[int, int]] = []
+    for start, end in iter_array_spans(buf):
+        spans.append((start, end))
+        if end - spans[0][0] >= target:
+            yield _slice_batch(buf, spans, shallow, location, rules)
+            spans = []
+    if spans:
+        yield _slice_batch(buf, spans, shallow, location, rules)
+
+
+def _slice_batch(
+    buf: Any,
+    spans: List[Tuple[int, int]],
+    shallow: bool,
+    location: Optional[Tuple[Path, int, int]],
+    rules: Optional[RuleSet],
+) -> Batch:
+    base, stop = spans[0][0], spans[-1][1]
+    source: BatchSource
+    if location is not None:
+        file, offset, _ = location
+        source = (str(file), offset + base, stop - base)
+    else:
+        source = bytes(buf[base:stop])
+    return source, [(start - base, end - base) for start, end in spans], shallow, rules
+
+
+def iter_parallel_decode(
+    buf: Any,
+    jobs: int,
+    shallow: bool = False,
+    location: Optional[Tuple[Path, int, int]] = None,
+    rules: Optional[RuleSet] = None,
+) -> Iterator[Any]:
+    """
+    Decode a JSON array across ``jobs`` worker processes, preserving order.
+
+    One pass over ``buf`` finds the byte span of every top-level element;
+    contiguous runs of spans are then decoded by a :func:`~rehash.pipeline.process_pool`.
+    When ``location`` says where ``buf`` is mapped from, workers map the same
+    file region themselves instead of receiving pickled slices. With
+    ``rules``, workers run :func:`~rehash.filter_fitness_logs.match_raw_conversation`
+    and yield ``None`` for conversations that do not match.
+    """
+    batches = _iter_batches(buf, jobs, shallow, location, rules)
+    with process_pool(jobs) as pool:
+        for batch in ordered_map(pool, _decode_batch, batches, window=jobs * 2):
+            yield from batch
+
+
+def _iter_decoded(handle: ExportHandle, jobs: int, shallow: bool, rules: Optional[RuleSet]) -> Iterator[Any]:
+    """Pick the cheapest reader for the export's conversations.json."""
+    scan = _scan_shallow if shallow else partial(scan_fitness_conversation, rules=rules)
+    if jobs > 1 or shallow or rules is not None:
+        with handle.map_conversations() as view:
+            if view is not None:
+                # 🗺️ Stored member or extracted file: scan the mapped bytes in place.
+                if jobs > 1:
+                    yield from iter_parallel_decode(view, jobs, shallow, handle.mapped_location(), rules)
+                else:
+                    yield from (record for _, _, record in iter_buffer_scan(view, scan))
+                return
+
+    with handle.open_conversations() as f:
+        if jobs > 1:
+            yield from iter_parallel_decode(f.read(), jobs, shallow, rules=rules)
+        elif shallow or rules is not None:
+            yield from (record for _, _, record in iter_array_scan(f, scan))
+        else:
+            # Full decode needs text for raw_decode, so it always streams.
+            yield from iter_array_items(f)
+
+
+def iter_conversations(
+    export_path: Union[str, Path],
+    jobs: int = 1,
+    cache: bool = False,
+    shallow: bool = False,
+    rules: Optional[RuleSet] = None,
+    stats: Optional[ExtractStats] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream conversations out of an export one at a time.
+
+    ``export_path`` is an export ZIP or an already-extracted export folder.
+    The top-level array of conversations.json is decoded element by element,
+    so peak memory is bounded by the largest single conversation rather than
+    the whole export.
+
+    With ``jobs > 1`` the array is split into byte ranges that are decoded in
+    parallel (see :func:`iter_parallel_decode`). Uncompressed input (a stored
+    ZIP member or an extracted folder) is memory-mapped rather than read.
+
+    With ``cache=True`` parsed conversations are served from, or written to,
+    the on-disk :class:`~rehash.export_cache.ExportCache`.
+
+    With ``shallow=True`` only metadata records are produced (see
+    :func:`shallow_record`); these are cheap to rebuild and never cached.
+
+    With ``rules`` the fitness filter is pushed into the parser: only the
+    fields it looks at are decoded, and conversations that do not match are
+    skipped byte-wise (see
+    :func:`~rehash.filter_fitness_logs.scan_fitness_conversation`). A
+    filtered stream is served from the cache but never written to it.
+
+    ``stats``, if given, counts the conversations scanned and yielded.
+    """
+    if shallow and rules is not None:
+        raise ValueError("Fitness rules apply to full conversations, not shallow records")
+    stats = stats if stats is not None else ExtractStats()
+    with ExportHandle(export_path) as handle:
+        store: Optional[ExportCache] = None
+        cached = None
+        key = ""
+        if cache and not shallow:
+            store = ExportCache()
+            key = handle.fingerprint()
+            cached = store.load(key)
+
+        stream: Iterable[Any]
+        if cached is not None:
+            handle.close()
+            assert store is not None
+            stream = _iter_cached(export_path, store, key, cached, jobs)
+            if rules is not None:
+                stream = (c if is_fitness_conversation(c, rules) else None for c in stream)
+        else:
+            stream = _iter_decoded(handle, jobs, shallow, rules)
+            if store is not None and rules is None and store.fits(handle.conversations_size):
+                stream = store.store(key, stream)
+
+        for item in stream:
+            stats.total += 1
+            if rules is not None and item is None:
+                continue  # filtered out
+            stats.kept += 1
+            yield item
+
+
+def _iter_cached(
+    export_path: Union[str, Path], store: ExportCache, key: str, cached: Iterator[Any], jobs: int
+) -> Iterator[Any]:
+    """Yield a cache entry; if it turns out corrupt, drop it and re-parse the rest of the export."""
+    done = 0
+    try:
+        for item in cached:
+            yield item
+            done += 1
+        return
+    except CorruptEntry as e:
+        logger.warning("⚠️ Dropped corrupt cache entry for %s: %s", export_path, e)
+        store.drop(key)
+    with ExportHandle(export_path) as handle:
+        stream = _iter_decoded(handle, jobs, False, None)
+        if store.fits(handle.conversations_size):
+            stream = store.store(key, stream)
+        yield from islice(stream, done, None)
+
+
+def extract_export(
+    export_path: Union[str, Path],
+    jobs: int = 1,
+    cache: bool = False,
+    shallow: bool = False,
+    rules: Optional[RuleSet] = None,
+) -> List[Dict[str, Any]]:
+    return list(iter_conversations(export_path, jobs=jobs, cache=cache, shallow=shallow, rules=rules))
 
 # 👇 Legacy alias for backward compatibility
 extract_conversations_json = extract_export
@@ -1,39 +1,60 @@
 # src/rehash/filter_fitness_logs.py
 
-import re
-
-FITNESS_TITLE_PATTERNS = [
-    r"\bphd\b",
-    r"\bfitness\b",
-    r"\bworkout\b",
-    r"\blog\b",
-    r"\btraining\b",
-    r"\bprogress\b",
-    r"\bperfit\b",
-]
-
-FITNESS_MESSAGE_PATTERNS = [
-    r"(?i)workout log",
-    r"training update",
-    r"pull.*fitness",
-    r"reconstruct.*log",
-    r"summary of workout",
-]
-
-
-def is_fitness_title(title: str) -> bool:
+import json
+import logging
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Tuple
+
+from rehash.export_index import conversation_id
+from rehash.fitness_rules import (  # noqa: F401 (re-exported)
+    DEFAULT_RULES,
+    FITNESS_MESSAGE_PATTERNS,
+    FITNESS_TITLE_PATTERNS,
+    MatchTimeout,
+    MessageScan,
+    RuleSet,
+)
+from rehash.json_stream import scan_object_fields, skip_value
+from rehash.messages import iter_messages, iter_text_parts, message_role
+from rehash.pipeline import ordered_map, process_pool
+
+logger = logging.getLogger(__name__)
+
+# Conversations per worker task when filtering with ``jobs > 1``.
+FILTER_CHUNK_SIZE = 64
+
+# The rule set of a filter worker process, set once by ``_init_worker``.
+_worker_rules: Optional[RuleSet] = None
+
+
+def is_fitness_title(title: str, rules: Optional[RuleSet] = None) -> bool:
     """Check if title matches fitness-related keywords."""
-    if not title:
+    return (rules or DEFAULT_RULES).matches_title(title)
+
+
+def is_fitness_conversation(conversation: dict, rules: Optional[RuleSet] = None) -> bool:
+    """
+    Check if a conversation is fitness-related by title or assistant messages.
+
+    A conversation whose search runs out of time is logged with its id and
+    treated as not matching, so one pathological text cannot stall a run.
+    """
+    try:
+        return _is_fitness(conversation, rules or DEFAULT_RULES)
+    except MatchTimeout as e:
+        logger.warning("⚠️ Skipped conversation %s: %s", conversation_id(conversation) or "(no id)", e)
         return False
-    return any(re.search(p, title, re.IGNORECASE) for p in FITNESS_TITLE_PATTERNS)
 
 
-def is_fitness_conversation(conversation: dict) -> bool:
-    """Check if a conversation is fitness-related by title or assistant messages."""
+def _is_fitness(conversation: dict, rules: RuleSet) -> bool:
     # Title check
-    if is_fitness_title(conversation.get("title", "")):
+    if rules.matches_title(conversation.get("title", "")):
         return True
 
+    if rules.scan is not None:
+        return _scan_messages(conversation, rules, rules.scan)
+
     # Message content check
     mapping = conversation.get("mapping", {})
     for msg in mapping.values():
@@ -54,12 +75,120 @@ def is_fitness_conversation(conversation: dict) -> bool:
         if not isinstance(content, str):
             content = str(content)
 
-        if any(re.search(p, content, re.IGNORECASE) for p in FITNESS_MESSAGE_PATTERNS):
+        if rules.matches_message(content):
             return True
 
     return False
 
 
-def filter_fitness_conversations(conversations: list[dict]) -> list[dict]:
+def _scan_messages(conversation: dict, rules: RuleSet, scan: MessageScan) -> bool:
+    """Full-text check: every text part of the chosen roles, within the budget."""
+    budget = scan.max_chars
+    for _, message in iter_messages(conversation):
+        if not scan.covers(message_role(message)):
+            continue
+        for text in iter_text_parts(message):
+            if budget is not None:
+                if budget <= 0:
+                    return False  # ⏱️ out of budget for this conversation
+                text = text[:budget]
+                budget -= len(text)
+            if rules.matches_message(text):
+                return True
+    return False
+
+
+def match_raw_conversation(buf: Any, start: int, end: int, rules: Optional[RuleSet] = None) -> Optional[dict]:
+    """
+    :func:`is_fitness_conversation` for the raw JSON in ``buf[start:end]``.
+
+    Only ``title`` is decoded up front. When it does not match and the rules'
+    byte-level prefilter finds nothing a message rule could match, the
+    conversation is rejected without being decoded; otherwise it is decoded
+    and checked exactly.
+
+    Returns:
+        Optional[dict]: The conversation, or ``None`` when it does not match.
+    """
+    rules = rules or DEFAULT_RULES
+    if buf[start] != 0x7B:  # '{'
+        return None
+    title = scan_object_fields(buf, ("title",), start).get("title", "")
+    if not rules.matches_title(title):
+        prefilter = rules.message_prefilter
+        if prefilter is not None and not prefilter.might_match(buf, start, end):
+            return None  # 🏃 skipped byte-wise, never decoded
+    conversation = json.loads(bytes(buf[start:end]))
+    return conversation if is_fitness_conversation(conversation, rules) else None
+
+
+def scan_fitness_conversation(buf: Any, pos: int, rules: Optional[RuleSet] = None) -> Tuple[Optional[dict], int]:
+    """
+    :func:`match_raw_conversation` for the value at ``buf[pos]``; usable as
+    the ``parse`` callback of :func:`~rehash.json_stream.iter_array_scan`.
+
+    Returns:
+        Tuple[Optional[dict], int]: The matching conversation (or ``None``)
+        and the position just past it.
+    """
+    end = skip_value(buf, pos)
+    return match_raw_conversation(buf, pos, end, rules), end
+
+
+def _init_worker(rules: RuleSet) -> None:
+    global _worker_rules
+    _worker_rules = rules
+
+
+def _filter_chunk(chunk: List[dict]) -> List[int]:
+    """Worker task: positions of the fitness conversations in ``chunk``."""
+    return [i for i, conv in enumerate(chunk) if is_fitness_conversation(conv, _worker_rules)]
+
+
+def _chunked(conversations: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    it = iter(conversations)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_parallel(conversations: Iterable[dict], rules: RuleSet, jobs: int, chunk_size: int) -> Iterator[dict]:
+    sent: Deque[List[dict]] = deque()
+
+    def chunks() -> Iterator[List[dict]]:
+        for chunk in _chunked(conversations, chunk_size):
+            sent.append(chunk)
+            yield chunk
+
+    # 📨 Rules travel once per worker; tasks return indices, not conversations.
+    with process_pool(jobs, initializer=_init_worker, initargs=(rules,)) as pool:
+        for kept in ordered_map(pool, _filter_chunk, chunks(), window=jobs * 2):
+            chunk = sent.popleft()
+            yield from (chunk[i] for i in kept)
+
+
+def iter_fitness_conversations(
+    conversations: Iterable[dict],
+    rules: Optional[RuleSet] = None,
+    jobs: int = 1,
+    chunk_size: int = FILTER_CHUNK_SIZE,
+) -> Iterator[dict]:
+    """
+    Lazily yield fitness-related conversations from any iterable.
+
+    With ``jobs > 1`` conversations are matched in chunks of ``chunk_size``
+    across a process pool; the kept conversations still come out in input order.
+    """
+    rules = rules or DEFAULT_RULES
+    if jobs > 1:
+        return _iter_parallel(conversations, rules, jobs, chunk_size)
+    return (conv for conv in conversations if is_fitness_conversation(conv, rules))
+
+
+def filter_fitness_conversations(
+    conversations: Iterable[dict], rules: Optional[RuleSet] = None, jobs: int = 1
+) -> list[dict]:
     """Return only fitness-related conversations from list."""
-    return [conv for conv in conversations if is_fitness_conversation(conv)]
+    return list(iter_fitness_conversations(conversations, rules, jobs))
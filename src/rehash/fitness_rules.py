@@ -0,0 +1,718 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fitness_rules.py
+
+🏋️ Compiled, configurable rule set for the fitness filter.
+
+Each scope (titles, assistant messages) is compiled once into a single
+case-insensitive alternation, so a check is one regex search instead of one
+per pattern. Rule sets are cached by their patterns and pickle as their
+pattern lists, so worker processes rebuild (and cache) them cheaply.
+
+Literal keywords are matched by one of two engines: ``regex`` folds them into
+the alternations as ``\\b<keyword>\\b``; ``aho-corasick`` hands them to a
+:class:`~rehash.keyword_matcher.KeywordMatcher`, which scans a text once
+however large the vocabulary is. ``auto`` (the default) picks the automaton
+from :data:`AUTO_AHO_CORASICK_KEYWORDS` keywords up.
+
+Patterns are made backtracking-safe when compiled. Ambiguous shapes are
+rejected: a variable-length quantifier nested in another repeat, repeated
+alternatives that can match the same text (``(a|aa)+``), and wildcards
+chained over overlapping characters (``a.*a.*b``). Unbounded quantifiers
+(``*``, ``+``, ``{m,}``) are capped at :data:`MAX_REPEAT` repetitions, so
+every match has a bounded width and one match attempt a bounded cost. Texts
+are then searched window by window, and a search running past
+:data:`MATCH_TIME_BUDGET` raises :class:`MatchTimeout` instead of pinning a
+core.
+
+Message rules are checked against the first part of each assistant message
+by default. A :class:`MessageScan` switches to full-text scanning: every text
+part of the chosen roles, up to a character budget per conversation.
+
+Extra keywords come from the first source that provides them:
+
+1. ``--fitness-keywords`` on the command line,
+2. ``$REHASH_FITNESS_KEYWORDS``,
+3. ``~/.rehash/config.yaml``::
+
+       fitness:
+         keywords: [deadlift, squat]
+         engine: aho-corasick                 # optional: auto | regex | aho-corasick
+         title_patterns: ['\\bphd\\b', ...]     # optional: replace the defaults
+         message_patterns: ['workout log', ...]
+         full_text: true                      # optional: scan every text part
+         roles: [assistant, user]             # optional: implies full_text
+         max_chars: 200000                    # optional: implies full_text
+"""
+
+import os
+import re
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+import yaml
+
+from rehash.keyword_matcher import KeywordMatcher
+
+try:
+    from re import _parser as sre_parse  # type: ignore[attr-defined]  # Python 3.11+
+except ImportError:  # pragma: no cover - Python < 3.11
+    import sre_parse  # type: ignore[no-redef]
+try:
+    from re import _compiler as sre_compile  # type: ignore[attr-defined]  # Python 3.11+
+except ImportError:  # pragma: no cover - Python < 3.11
+    import sre_compile  # type: ignore[no-redef]
+
+FITNESS_TITLE_PATTERNS = [
+    r"\bphd\b",
+    r"\bfitness\b",
+    r"\bworkout\b",
+    r"\blog\b",
+    r"\btraining\b",
+    r"\bprogress\b",
+    r"\bperfit\b",
+]
+
+FITNESS_MESSAGE_PATTERNS = [
+    r"(?i)workout log",
+    r"training update",
+    r"pull.*fitness",
+    r"reconstruct.*log",
+    r"summary of workout",
+]
+
+KEYWORDS_ENV = "REHASH_FITNESS_KEYWORDS"
+
+ENGINE_AUTO = "auto"
+ENGINE_REGEX = "regex"
+ENGINE_AHO_CORASICK = "aho-corasick"
+ENGINES = (ENGINE_AUTO, ENGINE_REGEX, ENGINE_AHO_CORASICK)
+
+# ``auto`` switches to the automaton here; below it, the alternation is faster.
+AUTO_AHO_CORASICK_KEYWORDS = 32
+
+# A leading global flag group such as ``(?i)`` or ``(?is)``.
+_LEADING_FLAGS = re.compile(r"^\(\?([a-zA-Z]+)\)")
+_SCOPED_FLAGS = set("imsx")
+# A brace quantifier: ``{m}``, ``{m,n}``, ``{m,}`` or ``{,n}``.
+_BRACES = re.compile(r"\{(\d*)(,?)(\d*)\}")
+
+
+# Characters a JSON encoder writes verbatim and that only case-fold within
+# ASCII, so a literal made of them shows up as-is in the raw export bytes.
+_RAW_LITERAL_CHARS = frozenset(
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 !#$%&()*+,-.:;<=>?@[]^_`{|}~"
+)
+# Raw bytes that may still decode to a literal match: \u escapes of printable
+# ASCII, and the non-ASCII letters that case-fold onto i, k and s (İ ı ſ and
+# the Kelvin sign), either escaped or UTF-8 encoded.
+_ESCAPED_LITERAL = re.compile(rb"\\u(?:00[2-7][0-9a-f]|013[01]|017f|212a)", re.IGNORECASE)
+_FOLDING_UTF8 = tuple(c.encode("utf-8") for c in "\u0130\u0131\u017f\u212a")
+# Unbounded quantifiers in rule patterns are capped at this many repetitions.
+MAX_REPEAT = 1000
+# Most ways one match attempt may split text between variable-width steps
+# that can consume the same characters (``.*`` alone is MAX_REPEAT + 1).
+MAX_AMBIGUITY = 4 * MAX_REPEAT
+# Texts longer than this are searched window by window, checking the clock in
+# between; small enough that one window stays well inside MATCH_TIME_BUDGET.
+SEARCH_WINDOW = 1 << 13
+# Seconds a single search may run before it is abandoned.
+MATCH_TIME_BUDGET = 2.0
+
+MIN_PREFILTER_LITERAL = 3
+MAX_PREFILTER_LITERALS = 32
+
+_REPEATS = tuple(
+    getattr(sre_parse, name) for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") if hasattr(sre_parse, name)
+)
+_ZERO_WIDTH = (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+# Character sets are compared by the probe characters they accept: Latin,
+# spaces, digits and letters of other scripts, plus every literal and range
+# bound in the pattern and their neighbours (see _probe).
+_PROBE = tuple(chr(c) for c in range(0x250)) + tuple("\u00a0\u2003\u3000\u0660\u0966ΑωЖя一龥가あア")
+
+
+def default_config_path() -> Path:
+    return Path.home() / ".rehash" / "config.yaml"
+
+
+def _scoped(pattern: str) -> str:
+    """
+    Make one pattern safe to embed in an alternation.
+
+    A leading global flag group is rewritten as a scoped group: ``(?i)`` is
+    dropped (everything is matched case-insensitively already), other
+    ``imsx`` flags become ``(?s:...)`` so they do not leak into neighbours.
+    """
+    match = _LEADING_FLAGS.match(pattern)
+    if not match:
+        return f"(?:{pattern})"
+    flags = set(match.group(1)) - {"i"}
+    if not flags <= _SCOPED_FLAGS:
+        raise ValueError(f"Unsupported global flags in fitness pattern: {pattern!r}")
+    rest = pattern[match.end():]
+    return f"(?{''.join(sorted(flags))}:{rest})" if flags else f"(?:{rest})"
+
+
+class MatchTimeout(RuntimeError):
+    """A rule search ran past :data:`MATCH_TIME_BUDGET`."""
+
+
+def _subpatterns(arg: Any) -> Iterable[Any]:
+    if isinstance(arg, sre_parse.SubPattern):
+        yield arg
+    elif isinstance(arg, (list, tuple)):
+        for item in arg:
+            yield from _subpatterns(item)
+
+
+def _step(parsed: Any, op: Any, arg: Any) -> Any:
+    return sre_parse.SubPattern(parsed.state, [(op, arg)])
+
+
+def _bounds(parsed: Any, found: Set[int]) -> None:
+    for op, arg in parsed:
+        items = arg if op is sre_parse.IN else [(op, arg)]
+        for item_op, item in items:
+            if item_op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL):
+                found.update((item - 1, item, item + 1))
+            elif item_op is sre_parse.RANGE:
+                found.update((item[0] - 1, item[0], item[1], item[1] + 1))
+        for sub in _subpatterns(arg):
+            _bounds(sub, found)
+
+
+def _probe(parsed: Any) -> Tuple[str, ...]:
+    """
+    :data:`_PROBE` plus each literal and range bound in ``parsed`` and its
+    neighbours: two ranges overlap exactly when one holds a bound of the other,
+    whatever script they are in.
+    """
+    found: Set[int] = set()
+    _bounds(parsed, found)
+    extra = {chr(c) for c in found if 0 <= c <= sys.maxunicode} - set(_PROBE)
+    return _PROBE + tuple(sorted(extra))
+
+
+def _chars(parsed: Any, probe: Sequence[str]) -> FrozenSet[str]:
+    """Characters of ``probe`` some single-character step of ``parsed`` can consume."""
+    found: Set[str] = set()
+    for op, arg in parsed:
+        subs = list(_subpatterns(arg))
+        if op in _ZERO_WIDTH:
+            continue
+        if subs:
+            found.update(*(_chars(sub, probe) for sub in subs))
+        elif op is sre_parse.GROUPREF:
+            found.update(probe)
+        else:
+            atom = sre_compile.compile(_step(parsed, op, arg), re.IGNORECASE)
+            found.update(c for c in probe if atom.fullmatch(c))
+    return frozenset(found)
+
+
+def _first(parsed: Any, probe: Sequence[str]) -> Tuple[FrozenSet[str], bool]:
+    """Probe characters a match of ``parsed`` can start with, and whether it can be empty."""
+    first: Set[str] = set()
+    for op, arg in parsed:
+        if op in _ZERO_WIDTH:
+            continue
+        if op is sre_parse.BRANCH:
+            branches = [_first(branch, probe) for branch in arg[1]]
+            first.update(*(chars for chars, _ in branches))
+            empty = any(e for _, e in branches)
+        elif op is sre_parse.SUBPATTERN:
+            chars, empty = _first(arg[-1], probe)
+            first |= chars
+        elif op in _REPEATS:
+            chars, empty = _first(arg[2], probe)
+            first |= chars
+            empty = empty or arg[0] == 0
+        else:
+            first |= _chars(_step(parsed, op, arg), probe)
+            empty = False
+        if not empty:
+            return frozenset(first), False
+    return frozenset(first), True
+
+
+def _check_nesting(parsed: Any, pattern: str, probe: Sequence[str], in_repeat: bool = False) -> None:
+    """
+    Reject ambiguous repeat bodies: a variable-length quantifier inside
+    another repeat, e.g. ``(\\w+\\s?)+`` or ``(a?a)+``, and alternatives
+    that can match the same text, e.g. ``(a|aa)+``.
+    """
+    for op, arg in parsed:
+        if op in _REPEATS:
+            lo, hi, body = arg
+            if in_repeat and lo != hi:
+                raise ValueError(
+                    f"Fitness pattern {pattern!r} nests variable-length quantifiers "
+                    "(catastrophic backtracking); simplify it"
+                )
+            _check_nesting(body, pattern, probe, in_repeat or hi > 1)
+            continue
+        if in_repeat and op is sre_parse.BRANCH:
+            # sre factors common prefixes out, so (a|aa) arrives as a(?:|a).
+            firsts = [_first(branch, probe) for branch in arg[1]]
+            if any(empty for _, empty in firsts) or any(
+                one & other for i, (one, _) in enumerate(firsts) for other, _ in firsts[i + 1:]
+            ):
+                raise ValueError(
+                    f"Fitness pattern {pattern!r} repeats alternatives that can match the same "
+                    "text (catastrophic backtracking); make each one start differently"
+                )
+        for sub in _subpatterns(arg):
+            _check_nesting(sub, pattern, probe, in_repeat)
+
+
+def _check_sequences(parsed: Any, pattern: str, probe: Sequence[str]) -> None:
+    """
+    Reject variable-width steps in sequence that can trade the same characters
+    back and forth, e.g. ``a.*a.*b``: each is linear alone, but a failing
+    attempt tries every way of splitting the text between them.
+    """
+    steps: List[Tuple[int, FrozenSet[str], bool]] = []  # (width choices, characters, can be empty)
+
+    def flatten(seq: Any) -> None:
+        for op, arg in seq:
+            if op is sre_parse.SUBPATTERN:
+                flatten(arg[-1])
+            elif op not in _ZERO_WIDTH:
+                step = _step(seq, op, arg)
+                lo, hi = step.getwidth()
+                steps.append((min(hi, MAX_REPEAT) - lo + 1, _chars(step, probe), _first(step, probe)[1]))
+
+    flatten(parsed)
+    for i, (choices, chars, _) in enumerate(steps):
+        if choices < 2:
+            continue
+        ways = choices
+        for later, later_chars, empty in steps[i + 1:]:
+            if later > 1 and chars & later_chars:
+                ways *= later
+                if ways > MAX_AMBIGUITY:
+                    raise ValueError(
+                        f"Fitness pattern {pattern!r} chains wildcards over overlapping characters "
+                        "(catastrophic backtracking); anchor them with distinct literals"
+                    )
+            if not empty and not later_chars <= chars:
+                break  # 🧱 the first step cannot run past this one
+    for op, arg in parsed:
+        if op is not sre_parse.SUBPATTERN:
+            for sub in _subpatterns(arg):
+                _check_sequences(sub, pattern, probe)
+
+
+def _bound_quantifiers(pattern: str) -> str:
+    """Rewrite ``*``, ``+`` and ``{m,}`` as ``{0,N}``, ``{1,N}`` and ``{m,N}``."""
+    out = []
+    i, n = 0, len(pattern)
+    after_quantifier = False
+    while i < n:
+        c = pattern[i]
+        if c == "\\":
+            out.append(pattern[i:i + 2])
+            i += 2
+            after_quantifier = False
+            continue
+        if c == "[":  # copy a character class verbatim
+            j = i + 1
+            if pattern[j:j + 1] == "^":
+                j += 1
+            if pattern[j:j + 1] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 2 if pattern[j] == "\\" else 1
+            out.append(pattern[i:j + 1])
+            i = j + 1
+            after_quantifier = False
+            continue
+        if c == "(" and pattern[i + 1:i + 2] == "?":
+            out.append("(?")
+            i += 2
+            after_quantifier = False
+            continue
+        if after_quantifier and c in "?+":  # lazy / possessive modifier
+            out.append(c)
+            i += 1
+            after_quantifier = False
+            continue
+        braces = _BRACES.match(pattern, i) if c == "{" else None
+        if c in "*+" or (braces and braces.group(2) and not braces.group(3)):
+            if braces:
+                low = braces.group(1) or "0"
+            else:
+                low = "0" if c == "*" else "1"
+            out.append(f"{{{low},{max(int(low), MAX_REPEAT)}}}")
+            i = braces.end() if braces else i + 1
+            after_quantifier = True
+            continue
+        if c == "?" or braces:
+            out.append(braces.group(0) if braces else c)
+            i = braces.end() if braces else i + 1
+            after_quantifier = True
+            continue
+        out.append(c)
+        i += 1
+        after_quantifier = False
+    return "".join(out)
+
+
+def _assert_width(parsed: Any) -> int:
+    """Widest text any lookaround in ``parsed`` may inspect."""
+    width = 0
+    for op, arg in parsed:
+        if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            width += arg[1].getwidth()[1] + _assert_width(arg[1])
+        else:
+            width += sum(_assert_width(sub) for sub in _subpatterns(arg))
+    return width
+
+
+def _bounded(pattern: str) -> Tuple[str, int]:
+    """
+    The backtracking-safe form of ``pattern`` and its reach: how far past a
+    match start the engine can look while matching there.
+    """
+    parsed = sre_parse.parse(pattern)
+    probe = _probe(parsed)
+    _check_nesting(parsed, pattern, probe)
+    _check_sequences(parsed, pattern, probe)
+    bounded = _bound_quantifiers(pattern)
+    parsed = sre_parse.parse(bounded)
+    reach = parsed.getwidth()[1] + _assert_width(parsed) + 1
+    if reach >= sre_parse.MAXREPEAT - 1:
+        raise ValueError(f"Fitness pattern {pattern!r} has no bounded match width")
+    return bounded, reach
+
+
+def search_bounded(pattern: "re.Pattern[str]", reach: int, text: str) -> bool:
+    """
+    ``pattern.search(text)`` in :data:`SEARCH_WINDOW`-sized windows.
+
+    Each window only accepts matches that start inside it, and sees ``reach``
+    characters past its end, so the result is the same as one search over
+    the whole text. The clock is checked after every window, a lone one
+    included; a single window cannot be interrupted, but the compile-time
+    checks bound what one costs.
+
+    Raises:
+        MatchTimeout: The search ran past :data:`MATCH_TIME_BUDGET`.
+    """
+    deadline = time.monotonic() + MATCH_TIME_BUDGET
+    for start in range(0, max(len(text), 1), SEARCH_WINDOW):
+        stop = start + SEARCH_WINDOW
+        match = pattern.search(text, start, stop + reach)
+        if match is not None and match.start() < stop:
+            return True
+        if time.monotonic() > deadline:
+            raise MatchTimeout(
+                f"pattern search exceeded {MATCH_TIME_BUDGET:g}s at character {min(stop, len(text)):,} of {len(text):,}"
+            )
+    return False
+
+
+def _literal_runs(parsed: Any, runs: list) -> None:
+    run: list = []
+    for op, arg in parsed:
+        if op is sre_parse.LITERAL and chr(arg) in _RAW_LITERAL_CHARS:
+            run.append(chr(arg))
+            continue
+        if run:
+            runs.append("".join(run))
+            run = []
+        if op is sre_parse.SUBPATTERN:
+            _literal_runs(arg[-1], runs)
+        elif op in _REPEATS and arg[0] >= 1:
+            _literal_runs(arg[2], runs)
+    if run:
+        runs.append("".join(run))
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """
+    The longest literal that every match of ``pattern`` must contain.
+
+    Only runs of characters that appear verbatim in raw JSON are considered;
+    alternations and optional parts contribute nothing. ``None`` when the
+    pattern has no such literal.
+    """
+    runs: list = []
+    _literal_runs(sre_parse.parse(pattern), runs)
+    return max(runs, key=len) if runs else None
+
+
+class RawPrefilter:
+    """
+    A necessary condition, checked on raw export bytes, for any of a set of
+    patterns to match the decoded text: one of their required literals occurs
+    (ASCII case-insensitively), or the bytes hold an escape or letter that
+    could decode into one.
+    """
+
+    def __init__(self, literals: Iterable[str]) -> None:
+        self.needles: Tuple[bytes, ...] = tuple(sorted({lit.lower().encode("ascii") for lit in literals}))
+
+    def might_match(self, buf: Any, start: int, end: int) -> bool:
+        raw = bytes(buf[start:end])
+        lowered = raw.lower()
+        if any(needle in lowered for needle in self.needles):
+            return True
+        if b"\\u" in raw and _ESCAPED_LITERAL.search(raw):
+            return True
+        return not raw.isascii() and any(letter in raw for letter in _FOLDING_UTF8)
+
+
+def _prefilter(patterns: Sequence[str]) -> Optional[RawPrefilter]:
+    """The :class:`RawPrefilter` for ``patterns``, or ``None`` when one has no usable literal."""
+    literals = set()
+    for pattern in patterns:
+        literal = required_literal(pattern)
+        if literal is None or len(literal) < MIN_PREFILTER_LITERAL:
+            return None
+        literals.add(literal)
+    if not literals or len(literals) > MAX_PREFILTER_LITERALS:
+        return None
+    return RawPrefilter(literals)
+
+
+def _combine(patterns: Sequence[str], keywords: Sequence[str] = ()) -> Optional[Tuple["re.Pattern[str]", int]]:
+    """One case-insensitive alternation of the bounded ``patterns`` and ``keywords``, and its reach."""
+    if not patterns and not keywords:
+        return None
+    try:
+        bounded = [_bounded(p) for p in patterns]
+        # Escaped keywords are plain literals: nothing to analyse or cap.
+        bounded += [(keyword_pattern(k), len(k) + 1) for k in keywords]
+        combined = re.compile("|".join(_scoped(b) for b, _ in bounded), re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"Invalid fitness pattern: {e}") from e
+    return combined, max(reach for _, reach in bounded)
+
+
+class MessageScan(NamedTuple):
+    """
+    Full-text message scanning.
+
+    Attributes:
+        roles: Author roles whose messages are scanned; empty means any role.
+        max_chars: Text scanned per conversation before giving up on it
+            (``None``: no limit), so one giant pasted log cannot stall a run.
+    """
+
+    roles: Tuple[str, ...] = ("assistant",)
+    max_chars: Optional[int] = None
+
+    def covers(self, role: Optional[str]) -> bool:
+        return not self.roles or role in self.roles
+
+
+class RuleSet:
+    """
+    Title and message patterns, each compiled into one alternation, plus
+    literal keywords that apply to both scopes.
+
+    Args:
+        title_patterns: Regexes checked against conversation titles.
+        message_patterns: Regexes checked against assistant messages.
+        keywords: Literal keywords, matched as whole words.
+        engine: ``auto``, ``regex`` or ``aho-corasick`` (see module docs).
+        scan: Full-text message scanning; ``None`` checks only the first
+            part of assistant messages.
+    """
+
+    def __init__(
+        self,
+        title_patterns: Iterable[str],
+        message_patterns: Iterable[str],
+        keywords: Iterable[str] = (),
+        engine: str = ENGINE_AUTO,
+        scan: Optional[MessageScan] = None,
+    ) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown fitness engine '{engine}'; choose from {', '.join(ENGINES)}")
+        self.title_patterns: Tuple[str, ...] = tuple(title_patterns)
+        self.message_patterns: Tuple[str, ...] = tuple(message_patterns)
+        self.keywords: Tuple[str, ...] = tuple(keywords)
+        self.engine = engine
+        self.scan = scan
+
+        if engine == ENGINE_AUTO:
+            engine = ENGINE_AHO_CORASICK if len(self.keywords) >= AUTO_AHO_CORASICK_KEYWORDS else ENGINE_REGEX
+        self._keywords: Optional[KeywordMatcher] = None
+        literal: Tuple[str, ...] = ()
+        if engine == ENGINE_AHO_CORASICK:
+            self._keywords = KeywordMatcher(self.keywords) if self.keywords else None
+        else:
+            literal = self.keywords
+        self._title = _combine(self.title_patterns, literal)
+        self._message = _combine(self.message_patterns, literal)
+        self.message_prefilter = _prefilter(self.message_patterns + tuple(keyword_pattern(k) for k in self.keywords))
+
+    def _matches_keyword(self, text: str) -> bool:
+        return self._keywords is not None and self._keywords.matches(text)
+
+    def matches_title(self, title: str) -> bool:
+        if not title:
+            return False
+        return (self._title is not None and search_bounded(*self._title, title)) or self._matches_keyword(title)
+
+    def matches_message(self, text: str) -> bool:
+        """
+        Raises:
+            MatchTimeout: The search ran past :data:`MATCH_TIME_BUDGET`.
+        """
+        return (self._message is not None and search_bounded(*self._message, text)) or self._matches_keyword(text)
+
+    def _key(self) -> Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...], str, Optional[MessageScan]]:
+        return self.title_patterns, self.message_patterns, self.keywords, self.engine, self.scan
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
+        # 📦 Ship patterns, not regex objects or automata; the receiver hits compile_rules' cache.
+        return compile_rules, self._key()
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, RuleSet) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return (
+            f"RuleSet({len(self.title_patterns)} title, {len(self.message_patterns)} message patterns, "
+            f"{len(self.keywords)} keywords, engine={self.engine}, scan={self.scan})"
+        )
+
+
+@lru_cache(maxsize=32)
+def _cached_rules(
+    title_patterns: Tuple[str, ...],
+    message_patterns: Tuple[str, ...],
+    keywords: Tuple[str, ...],
+    engine: str,
+    scan: Optional[MessageScan],
+) -> RuleSet:
+    return RuleSet(title_patterns, message_patterns, keywords, engine, scan)
+
+
+def compile_rules(
+    title_patterns: Tuple[str, ...],
+    message_patterns: Tuple[str, ...],
+    keywords: Tuple[str, ...] = (),
+    engine: str = ENGINE_AUTO,
+    scan: Optional[MessageScan] = None,
+) -> RuleSet:
+    """Compile (or fetch the cached) rule set for these exact patterns."""
+    return _cached_rules(tuple(title_patterns), tuple(message_patterns), tuple(keywords), engine, scan)
+
+
+DEFAULT_RULES = compile_rules(tuple(FITNESS_TITLE_PATTERNS), tuple(FITNESS_MESSAGE_PATTERNS))
+
+
+def keyword_pattern(keyword: str) -> str:
+    """A literal keyword, matched as a whole word."""
+    return rf"\b{re.escape(keyword)}\b"
+
+
+def parse_keywords(value: str) -> Tuple[str, ...]:
+    """Split a comma-separated keyword list, dropping blanks."""
+    return tuple(k.strip() for k in value.split(",") if k.strip())
+
+
+def _string_list(section: Mapping[str, Any], key: str, path: Path) -> Optional[Tuple[str, ...]]:
+    value = section.get(key)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"fitness.{key} in {path} must be a list of strings")
+    return tuple(value)
+
+
+def _load_config(path: Path) -> Mapping[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML in {path}: {e}") from e
+    section = data.get("fitness") if isinstance(data, dict) else None
+    if section is None:
+        return {}
+    if not isinstance(section, dict):
+        raise ValueError(f"'fitness' in {path} must be a mapping")
+    return section
+
+
+def _message_scan(
+    section: Mapping[str, Any], path: Path, full_text: bool, roles: Optional[str], max_chars: Optional[int]
+) -> Optional[MessageScan]:
+    role_list = parse_keywords(roles) if roles is not None else _string_list(section, "roles", path)
+    if max_chars is None:
+        max_chars = section.get("max_chars")
+        if max_chars is not None and (not isinstance(max_chars, int) or max_chars < 1):
+            raise ValueError(f"fitness.max_chars in {path} must be a positive integer")
+    if not (full_text or section.get("full_text") or role_list is not None or max_chars is not None):
+        return None
+    if role_list is None:
+        role_list = MessageScan().roles
+    return MessageScan(() if "*" in role_list else tuple(role_list), max_chars)
+
+
+def load_rules(
+    keywords: Optional[str] = None,
+    environ: Optional[Mapping[str, str]] = None,
+    config_path: Optional[Path] = None,
+    engine: Optional[str] = None,
+    full_text: bool = False,
+    roles: Optional[str] = None,
+    max_chars: Optional[int] = None,
+) -> RuleSet:
+    """
+    Build the rule set from defaults, config file, environment and CLI.
+
+    Args:
+        keywords: Comma-separated ``--fitness-keywords`` value.
+        environ: Environment to read ``REHASH_FITNESS_KEYWORDS`` from
+            (default: ``os.environ``).
+        config_path: Config file (default: ``~/.rehash/config.yaml``).
+        engine: ``--fitness-engine`` value (else ``fitness.engine`` from the
+            config, else ``auto``).
+        full_text: ``--fitness-full-text``: scan every text part (see
+            :class:`MessageScan`); else ``fitness.full_text``.
+        roles: Comma-separated ``--fitness-roles`` (``*`` for any role); else
+            ``fitness.roles``. Implies full-text scanning.
+        max_chars: ``--fitness-max-chars``; else ``fitness.max_chars``.
+            Implies full-text scanning.
+
+    Returns:
+        RuleSet: Cached, compiled rules. Keywords are added to both scopes.
+    """
+    environ = os.environ if environ is None else environ
+    path = Path(config_path) if config_path is not None else default_config_path()
+    section = _load_config(path)
+
+    titles = _string_list(section, "title_patterns", path) or tuple(FITNESS_TITLE_PATTERNS)
+    messages = _string_list(section, "message_patterns", path) or tuple(FITNESS_MESSAGE_PATTERNS)
+
+    if keywords is not None:
+        extra = parse_keywords(keywords)
+    elif environ.get(KEYWORDS_ENV):
+        extra = parse_keywords(environ[KEYWORDS_ENV])
+    else:
+        extra = _string_list(section, "keywords", path) or ()
+
+    if engine is None:
+        engine = section.get("engine", ENGINE_AUTO)
+        if engine not in ENGINES:
+            raise ValueError(f"fitness.engine in {path} must be one of {', '.join(ENGINES)}")
+
+    scan = _message_scan(section, path, full_text, roles, max_chars)
+    return compile_rules(titles, messages, extra, engine, scan)
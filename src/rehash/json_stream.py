@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+json_stream.py
+
+🌊 Incremental readers for the top-level JSON array in conversations.json.
+
+Two kinds of tools live here:
+- ``iter_array_items`` decodes elements one at a time with the C decoder
+  (``json.JSONDecoder.raw_decode``), so memory stays bounded by the largest
+  single element while throughput stays on par with ``json.load``.
+- ``iter_array_spans``, ``iter_array_scan`` and ``scan_object_fields`` locate
+  elements and object members by byte offset *without* building Python
+  objects, for byte-range decoding and metadata-only scans.
+"""
+
+import io
+import json
+import re
+import sys
+from typing import IO, Any, Callable, Collection, Dict, Generator, Iterator, Tuple
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class IncompleteJSONError(ValueError):
+    """The buffer ends before the JSON value being scanned does."""
+
+
+# UTF-8 never reuses ASCII bytes inside multi-byte sequences, so scanning raw
+# bytes for structural characters is safe.
+_STRUCTURAL = re.compile(rb'[\[\]{}"]')
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+_SCALAR_END = re.compile(rb'[,}\]\s]')
+_NOT_WHITESPACE = re.compile(rb'[^ \t\r\n]')
+_TEXT_NOT_WHITESPACE = re.compile(r'[^ \t\r\n]')
+_BOM = b"\xef\xbb\xbf"
+
+# ⚡ One regex match per container, down to MAX_FAST_DEPTH levels of nesting.
+# It relies on possessive quantifiers (Python 3.11+) so a truncated buffer
+# fails in linear time instead of backtracking; deeper values, or older
+# Pythons, fall back to the token-by-token bracket matcher.
+MAX_FAST_DEPTH = 32
+
+
+def _compile_fast_container() -> Any:
+    if sys.version_info < (3, 11):
+        return None
+    string = rb'"[^"\\]*+(?:\\.[^"\\]*+)*+"'
+    body = rb'(?:[^"\[\]{}]++|' + string + rb')*+'
+    for _ in range(MAX_FAST_DEPTH - 1):
+        body = rb'(?:[^"\[\]{}]++|' + string + rb'|[\[{]' + body + rb'[\]}])*+'
+    return re.compile(rb'[\[{]' + body + rb'[\]}]')
+
+
+_FAST_CONTAINER = _compile_fast_container()
+
+
+def _skip_ws(buf: Any, pos: int) -> int:
+    m = _NOT_WHITESPACE.search(buf, pos)
+    return m.start() if m else len(buf)
+
+
+def _skip_string(buf: Any, pos: int) -> int:
+    """Return the position just past the string that opens at ``buf[pos]``."""
+    m = _STRING.match(buf, pos)
+    if m is None:
+        raise IncompleteJSONError("Unterminated string")
+    return m.end()
+
+
+def _skip_container(buf: Any, pos: int) -> int:
+    """Bracket-match the object or array at ``buf[pos]`` one token at a time."""
+    depth = 0
+    while True:
+        m = _STRUCTURAL.search(buf, pos)
+        if m is None:
+            raise IncompleteJSONError("Unterminated object or array")
+        byte = buf[m.start()]
+        if byte == 0x22:  # '"'
+            pos = _skip_string(buf, m.start())
+            continue
+        pos = m.end()
+        if byte in (0x7B, 0x5B):  # '{' '['
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos
+
+
+def skip_value(buf: Any, pos: int) -> int:
+    """
+    Return the position just past the JSON value starting at ``buf[pos]``.
+
+    Nothing is decoded: strings and brackets are only matched up.
+
+    Raises:
+        IncompleteJSONError: ``buf`` ends before the value does.
+    """
+    byte = buf[pos]
+    if byte == 0x22:  # '"'
+        return _skip_string(buf, pos)
+    if byte in (0x7B, 0x5B):  # '{' '['
+        if _FAST_CONTAINER is not None:
+            m = _FAST_CONTAINER.match(buf, pos)
+            if m is not None:
+                return m.end()
+        return _skip_container(buf, pos)
+    m = _SCALAR_END.search(buf, pos)
+    if m is None:
+        raise IncompleteJSONError("Unterminated scalar")
+    return m.start()
+
+
+def _require(buf: Any, pos: int) -> int:
+    pos = _skip_ws(buf, pos)
+    if pos >= len(buf):
+        raise IncompleteJSONError("Unterminated object")
+    return pos
+
+
+def _walk_object(buf: Any, pos: int) -> Generator[Tuple[str, int, int], None, int]:
+    """Generator over object members; its return value is the closing ``}`` position."""
+    pos = _skip_ws(buf, pos)
+    if pos >= len(buf) or buf[pos] != 0x7B:  # '{'
+        raise ValueError("Expected a JSON object")
+    pos += 1
+    while True:
+        pos = _require(buf, pos)
+        byte = buf[pos]
+        if byte == 0x7D:  # '}'
+            return pos
+        if byte == 0x2C:  # ','
+            pos += 1
+            continue
+        key_end = _skip_string(buf, pos)
+        key_raw = bytes(buf[pos + 1:key_end - 1])
+        key = json.loads(b"\"" + key_raw + b"\"") if b"\\" in key_raw else key_raw.decode("utf-8")
+        pos = _require(buf, key_end)
+        if buf[pos] != 0x3A:  # ':'
+            raise ValueError("Expected ':' after key in JSON object")
+        start = _require(buf, pos + 1)
+        end = skip_value(buf, start)
+        yield key, start, end
+        pos = end
+
+
+def iter_object_members(buf: Any, pos: int = 0) -> Iterator[Tuple[str, int, int]]:
+    """
+    Yield ``(key, value_start, value_end)`` for each member of a JSON object.
+
+    Values are located with :func:`skip_value`, never decoded, so callers
+    only pay for the members they actually ``json.loads``.
+    """
+    yield from _walk_object(buf, pos)
+
+
+def scan_object_fields(buf: Any, fields: Collection[str], pos: int = 0) -> Dict[str, Any]:
+    """
+    Decode only the named top-level members of the JSON object at ``buf[pos]``.
+
+    Every other member (e.g. a conversation's heavy ``mapping``) is skipped
+    over byte-wise, and scanning stops once all ``fields`` have been seen.
+    Non-object values yield an empty dict.
+    """
+    found: Dict[str, Any] = {}
+    pos = _skip_ws(buf, pos)
+    if pos >= len(buf) or buf[pos] != 0x7B:
+        return found
+    for key, start, end in _walk_object(buf, pos):
+        if key in fields:
+            found[key] = json.loads(bytes(buf[start:end]))
+            if len(found) == len(fields):
+                break
+    return found
+
+
+def scan_object(buf: Any, fields: Collection[str], pos: int = 0) -> Tuple[Dict[str, Any], int]:
+    """
+    Like :func:`scan_object_fields`, but walk to the end of the value.
+
+    Usable as the ``parse`` callback of :func:`iter_array_scan`.
+
+    Returns:
+        Tuple[Dict[str, Any], int]: Decoded ``fields`` and the position just
+        past the value. Non-object values yield an empty dict.
+    """
+    if buf[pos] != 0x7B:  # '{'
+        return {}, skip_value(buf, pos)
+    found: Dict[str, Any] = {}
+    members = _walk_object(buf, pos)
+    while True:
+        try:
+            key, start, end = next(members)
+        except StopIteration as stop:
+            return found, stop.value + 1
+        if key in fields:
+            found[key] = json.loads(bytes(buf[start:end]))
+
+
+def _array_start(buf: Any, pos: int) -> int:
+    """Skip a BOM and whitespace, then the opening ``[`` of the top-level array."""
+    if pos == 0 and buf[:3] == _BOM:
+        pos = 3
+    pos = _skip_ws(buf, pos)
+    if pos >= len(buf):
+        raise IncompleteJSONError("conversations.json is empty")
+    if buf[pos] != 0x5B:  # '['
+        raise TypeError("Expected top-level list in conversations.json")
+    return pos + 1
+
+
+def _first_element(buf: Any, pos: int) -> Tuple[int, bool]:
+    """Skip whitespace after ``[``; report whether the array is empty."""
+    pos = _skip_ws(buf, pos)
+    if pos >= len(buf):
+        raise IncompleteJSONError("Truncated JSON array")
+    return pos, buf[pos] == 0x5D
+
+
+def _next_element(buf: Any, pos: int) -> Tuple[int, bool]:
+    """
+    Skip the separator after an element.
+
+    Returns:
+        Tuple[int, bool]: Start of the next element, and whether the
+        closing ``]`` of the array was reached instead.
+    """
+    pos = _skip_ws(buf, pos)
+    if pos >= len(buf):
+        raise IncompleteJSONError("Truncated JSON array")
+    byte = buf[pos]
+    if byte == 0x5D:  # ']'
+        return pos, True
+    if byte != 0x2C:  # ','
+        raise ValueError(f"Expected ',' or ']' in conversations.json at byte {pos}")
+    pos = _skip_ws(buf, pos + 1)
+    if pos >= len(buf):
+        raise IncompleteJSONError("Truncated JSON array")
+    if buf[pos] == 0x5D:
+        raise ValueError(f"Trailing ',' before ']' in conversations.json at byte {pos}")
+    return pos, False
+
+
+def iter_buffer_scan(
+    buf: Any, parse: Callable[[Any, int], Tuple[Any, int]]
+) -> Iterator[Tuple[int, int, Any]]:
+    """
+    Walk an in-memory (or memory-mapped) JSON array, calling ``parse(buf, pos)``.
+
+    The buffer is never copied; ``parse`` sees absolute positions in it.
+
+    Yields:
+        Tuple[int, int, Any]: Offset, byte length and ``value`` of each element.
+    """
+    try:
+        pos, done = _first_element(buf, _array_start(buf, 0))
+        while not done:
+            value, end = parse(buf, pos)
+            yield pos, end - pos, value
+            pos, done = _next_element(buf, end)
+    except IncompleteJSONError as exc:
+        raise ValueError(f"Truncated JSON array in conversations.json ({exc})") from None
+
+
+def _span(buf: Any, pos: int) -> Tuple[None, int]:
+    return None, skip_value(buf, pos)
+
+
+def iter_array_spans(buf: Any) -> Iterator[Tuple[int, int]]:
+    """
+    Yield ``(start, end)`` byte spans of each element of an in-memory JSON array.
+
+    Args:
+        buf: ``bytes``, ``bytearray``, ``memoryview`` or ``mmap`` holding the whole array.
+    """
+    for offset, length, _ in iter_buffer_scan(buf, _span):
+        yield offset, offset + length
+
+
+def iter_array_scan(
+    stream: IO[bytes],
+    parse: Callable[[Any, int], Tuple[Any, int]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Tuple[int, int, Any]]:
+    """
+    Walk a streamed JSON array, calling ``parse(buf, pos)`` on each element.
+
+    ``parse`` returns ``(value, end)`` or raises :class:`IncompleteJSONError`
+    when the buffer stops short; more bytes are then read (doubling the read
+    size for oversized elements) and the element is retried. Only the bytes
+    of the current element are kept in memory.
+
+    Yields:
+        Tuple[int, int, Any]: Stream offset, byte length and ``value``.
+    """
+    buf = bytearray()
+    base = 0  # stream offset of buf[0]
+    pos = 0
+
+    def refill(exc: Exception) -> None:
+        """Drop consumed bytes and read more, or give up at EOF."""
+        nonlocal base, pos
+        if pos:
+            del buf[:pos]
+            base += pos
+            pos = 0
+        chunk = stream.read(max(chunk_size, len(buf)))
+        if not chunk:
+            if base == 0 and not buf.strip():
+                raise ValueError("conversations.json is empty") from None
+            raise ValueError(f"Truncated JSON array in conversations.json ({exc})") from None
+        buf.extend(chunk)
+
+    while True:
+        try:
+            pos, done = _first_element(buf, _array_start(buf, 0))
+            break
+        except IncompleteJSONError as exc:
+            refill(exc)
+
+    between = False  # True once an element has been consumed
+    while not done:
+        try:
+            if between:
+                pos, done = _next_element(buf, pos)
+                between = False
+                continue
+            value, end = parse(buf, pos)
+            yield base + pos, end - pos, value
+            pos = end
+            between = True
+        except IncompleteJSONError as exc:
+            refill(exc)
+
+
+def _raw_element(buf: Any, pos: int) -> Tuple[bytes, int]:
+    end = skip_value(buf, pos)
+    if end == len(buf) and buf[pos] not in b'{["':
+        raise IncompleteJSONError("Scalar may continue past the buffer")
+    return bytes(buf[pos:end]), end
+
+
+def iter_array_elements(
+    stream: IO[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Tuple[int, bytes]]:
+    """Yield ``(offset, raw_bytes)`` for each element of a streamed JSON array."""
+    for offset, _, raw in iter_array_scan(stream, _raw_element, chunk_size):
+        yield offset, raw
+
+
+def _continues(buf: str, pos: int) -> bool:
+    """True if the element at ``buf[pos:]`` is cut off by the end of ``buf``."""
+    try:
+        skip_value(buf[pos:].encode("utf-8"), 0)
+    except IncompleteJSONError:
+        return True
+    return False
+
+
+def iter_array_items(
+    stream: IO[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Any]:
+    """
+    Decode and yield each element of a streamed JSON array.
+
+    Elements are decoded straight from a text buffer with the C
+    ``raw_decode``. A failed decode only triggers a refill when the byte
+    scanner confirms the element is cut off by the end of the buffer; a
+    malformed element that is complete raises at once, without reading the
+    rest of the stream.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+
+    def fill(min_size: int) -> bool:
+        nonlocal buf, pos
+        chunk = text.read(max(chunk_size, min_size))
+        if not chunk:
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_ws() -> bool:
+        """Advance to the next non-whitespace character; False at EOF."""
+        nonlocal pos
+        while True:
+            m = _TEXT_NOT_WHITESPACE.search(buf, pos)
+            if m is not None:
+                pos = m.start()
+                return True
+            pos = len(buf)
+            if not fill(0):
+                return False
+
+    if not skip_ws():
+        raise ValueError("conversations.json is empty")
+    if buf[pos] != "[":
+        raise TypeError("Expected top-level list in conversations.json")
+    pos += 1
+
+    first = True
+    while True:
+        if not skip_ws():
+            raise ValueError("Truncated JSON array in conversations.json")
+        if buf[pos] == "]":
+            return
+        if not first:
+            if buf[pos] != ",":
+                raise ValueError("Expected ',' or ']' in conversations.json")
+            pos += 1
+            if not skip_ws():
+                raise ValueError("Truncated JSON array in conversations.json")
+        first = False
+
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as exc:
+                if _continues(buf, pos) and fill(len(buf) - pos):
+                    continue
+                raise ValueError(f"Truncated or malformed conversations.json: {exc}") from None
+            if end == len(buf) and fill(0):
+                continue  # a number may continue in the next chunk
+            break
+        yield value
+        pos = end
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+keyword_matcher.py
+
+🔤 Whole-word literal keyword matching with an Aho-Corasick automaton.
+
+A regex alternation of literal words is tried branch by branch at every
+position, so its cost grows with the vocabulary. The automaton reads each
+character once whatever the number of keywords, which is what makes
+vocabularies of thousands of exercise names or client ids affordable.
+
+When `pyahocorasick <https://pypi.org/project/pyahocorasick/>`_ is installed
+its C automaton is used; otherwise a pure-Python one is built. Both report the
+same matches: a keyword hits where ``\\b<keyword>\\b`` would under
+``re.IGNORECASE`` (text and keywords are compared lower-cased).
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import ahocorasick  # type: ignore[import-not-found]  # pyahocorasick
+except ImportError:  # pragma: no cover - optional accelerator
+    ahocorasick = None
+
+
+def _is_word(ch: str) -> bool:
+    # Same test sre uses for \w on str patterns.
+    return ch.isalnum() or ch == "_"
+
+
+def _whole_word(text: str, start: int, end: int) -> bool:
+    """True if ``text[start:end]`` has a ``\\b`` on both sides."""
+    before = start > 0 and _is_word(text[start - 1])
+    after = end < len(text) and _is_word(text[end])
+    return before != _is_word(text[start]) and after != _is_word(text[end - 1])
+
+
+class _Automaton:
+    """Pure-Python Aho-Corasick: trie transitions, failure links, outputs."""
+
+    def __init__(self, words: Iterable[str]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        lengths: List[Tuple[int, ...]] = [()]
+        for word in words:
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    lengths.append(())
+                state = nxt
+            if len(word) not in lengths[state]:
+                lengths[state] += (len(word),)
+
+        # 🔗 Breadth-first, so every failure target is finished before it is used.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in goto[state].items():
+                queue.append(child)
+                target = fail[state]
+                while target and ch not in goto[target]:
+                    target = fail[target]
+                fail[child] = goto[target].get(ch, 0)
+                lengths[child] += lengths[fail[child]]
+
+        self._goto = goto
+        self._fail = fail
+        self._lengths = lengths
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield ``(end, length)`` for every keyword occurrence in ``text``."""
+        goto, fail, lengths = self._goto, self._fail, self._lengths
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length in lengths[state]:
+                yield i + 1, length
+
+
+class _Accelerated:
+    """The same interface over a pyahocorasick automaton."""
+
+    def __init__(self, words: Iterable[str]) -> None:
+        self._automaton = ahocorasick.Automaton()
+        for word in words:
+            self._automaton.add_word(word, len(word))
+        self._automaton.make_automaton()
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int]]:
+        for last, length in self._automaton.iter(text):
+            yield last + 1, length
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive, whole-word matcher for a set of literal keywords.
+
+    Args:
+        keywords: Literal keywords; blanks are ignored.
+        accelerated: Use pyahocorasick (``True``), the pure-Python automaton
+            (``False``), or pyahocorasick when it is installed (``None``).
+
+    Raises:
+        ValueError: ``accelerated=True`` but pyahocorasick is not installed.
+    """
+
+    def __init__(self, keywords: Iterable[str], accelerated: Optional[bool] = None) -> None:
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(k.lower() for k in keywords if k))
+        if accelerated and ahocorasick is None:
+            raise ValueError("pyahocorasick is not installed (pip install pyahocorasick)")
+        self.accelerated = ahocorasick is not None if accelerated is None else accelerated
+        self._automaton = (_Accelerated if self.accelerated else _Automaton)(self.keywords)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield ``(start, end)`` spans of whole-word hits in ``text.lower()``."""
+        if not self.keywords or not text:
+            return
+        lowered = text.lower()
+        for end, length in self._automaton.iter(lowered):
+            if _whole_word(lowered, end - length, end):
+                yield end - length, end
+
+    def matches(self, text: str) -> bool:
+        """True if any keyword occurs in ``text`` as a whole word."""
+        return next(self.iter_matches(text), None) is not None
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def __repr__(self) -> str:
+        engine = "pyahocorasick" if self.accelerated else "python"
+        return f"KeywordMatcher({len(self.keywords)} keywords, {engine})"
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+merge_exports.py
+
+🔀 Merge overlapping ChatGPT exports, keeping the newest copy of each conversation.
+
+Weekly exports repeat almost every conversation. Merging runs in two passes:
+
+1. A shallow (metadata-only) scan of every export fills a compact
+   ``id ➤ (update_time, source, position)`` table with the winning copy of
+   each id.
+2. Each export is streamed again and only the copies that won are yielded,
+   one at a time, matched by their position in the export.
+
+Only the table is ever held in memory, never the conversations themselves.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+from rehash.extract_export import iter_conversations
+from rehash.export_index import conversation_id
+from rehash.utils import to_epoch
+
+# id ➤ (update_time in epoch seconds, index of the winning source, position
+# of the winning copy within that source's conversations.json)
+WinnerTable = Dict[str, Tuple[float, int, int]]
+
+
+class MergePlan(NamedTuple):
+    sources: List[Path]
+    winners: WinnerTable
+    total: int  # conversations seen across all sources, duplicates included
+
+
+def freshness(record: Dict[str, Any]) -> float:
+    """Sort key for competing copies: ``update_time``, else ``create_time``."""
+    for field in ("update_time", "create_time"):
+        value = record.get(field)
+        if value is None:
+            continue
+        try:
+            return to_epoch(value)
+        except ValueError:
+            continue
+    return float("-inf")
+
+
+def plan_merge(sources: Iterable[Union[str, Path]], jobs: int = 1) -> MergePlan:
+    """
+    Pass 1: decide which export supplies each conversation id.
+
+    The newest ``update_time`` wins; on a tie the later source wins, so list
+    exports oldest first. An export that repeats an id with the same
+    ``update_time`` keeps its first copy.
+    """
+    paths = [Path(s) for s in sources]
+    winners: WinnerTable = {}
+    total = 0
+    for index, path in enumerate(paths):
+        for position, record in enumerate(iter_conversations(path, jobs=jobs, shallow=True)):
+            total += 1
+            if record["id"] is None:
+                continue
+            cid = str(record["id"])
+            stamp = freshness(record)
+            best = winners.get(cid)
+            if best is None or stamp > best[0] or (stamp == best[0] and index > best[1]):
+                winners[cid] = (stamp, index, position)
+    return MergePlan(paths, winners, total)
+
+
+def iter_merged(plan: MergePlan, jobs: int = 1, cache: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Pass 2: stream the winning copy of every conversation.
+
+    Conversations without an id cannot be deduplicated and are passed through.
+    Output follows source order, then each export's own order.
+    """
+    for index, path in enumerate(plan.sources):
+        for position, convo in enumerate(iter_conversations(path, jobs=jobs, cache=cache)):
+            cid = conversation_id(convo)
+            if cid is None:
+                yield convo
+            elif plan.winners.get(cid, (None, -1, -1))[1:] == (index, position):
+                yield convo
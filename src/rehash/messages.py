@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+messages.py
+
+💬 Walk the messages of a parsed conversation and pull out their text.
+
+Conversations store messages in a ``mapping`` of node id ➤ node, each node
+optionally holding a ``message`` with an ``author.role`` and
+``content.parts``. Parts are plain strings for text, or dicts for multimodal
+content (images, files, audio). Only text is surfaced here: strings, and the
+``text`` of dict parts that carry one (e.g. audio transcriptions). Other dict
+parts are skipped without being stringified.
+"""
+
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+def iter_messages(conversation: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield ``(node_id, message)`` for every node that holds a message object."""
+    mapping = conversation.get("mapping") or {}
+    if not isinstance(mapping, dict):
+        return
+    for node_id, node in mapping.items():
+        message = node.get("message") if isinstance(node, dict) else None
+        if isinstance(message, dict):
+            yield str(node_id), message
+
+
+def message_role(message: Dict[str, Any]) -> Optional[str]:
+    """``author.role`` of a message, or ``None`` when it has none."""
+    author = message.get("author")
+    return author.get("role") if isinstance(author, dict) else None
+
+
+def iter_text_parts(message: Dict[str, Any]) -> Iterator[str]:
+    """Yield the text parts of a message, in order; non-text parts are skipped."""
+    content = message.get("content")
+    parts = content.get("parts") if isinstance(content, dict) else None
+    if not isinstance(parts, list):
+        return
+    for part in parts:
+        if isinstance(part, str):
+            yield part
+        elif isinstance(part, dict) and isinstance(part.get("text"), str):
+            yield part["text"]
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    """All text parts of a message, joined with newlines."""
+    return "\n".join(iter_text_parts(message))
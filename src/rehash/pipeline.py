@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pipeline.py
+
+🔗 Lazy, bounded stages for the extract ➤ filter ➤ emit stream.
+"""
+
+import multiprocessing
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+DEFAULT_QUEUE_SIZE = 64
+
+_DONE = object()
+
+
+class _Failure:
+    """Wraps an exception raised by a producer thread."""
+
+    def __init__(self, exc: BaseException) -> None:
+        self.exc = exc
+
+
+class Counter:
+    """Pass-through iterator that counts the items flowing through a stage."""
+
+    def __init__(self, iterable: Iterable[Any]) -> None:
+        self._it = iter(iterable)
+        self.count = 0
+
+    def __iter__(self) -> "Counter":
+        return self
+
+    def __next__(self) -> Any:
+        item = next(self._it)
+        self.count += 1
+        return item
+
+    def close(self) -> None:
+        close = getattr(self._it, "close", None)
+        if callable(close):
+            close()
+
+
+def staged(iterable: Iterable[Any], maxsize: int = DEFAULT_QUEUE_SIZE) -> Iterator[Any]:
+    """
+    Run ``iterable`` in a background thread, handing items over a bounded queue.
+
+    The producer blocks once ``maxsize`` items are waiting, so memory stays
+    bounded while the downstream stage works. Exceptions raised by the
+    producer are re-raised in the consumer, and closing the consumer early
+    stops the producer.
+    """
+    q: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        it = iter(iterable)
+        try:
+            for item in it:
+                if not put(item):
+                    break
+            else:
+                put(_DONE)
+        except BaseException as exc:  # handed to the consumer
+            put(_Failure(exc))
+        finally:
+            close = getattr(it, "close", None)
+            if callable(close):
+                close()
+
+    worker = threading.Thread(target=produce, name="rehash-stage", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        worker.join(timeout=1.0)
+
+
+def process_pool(jobs: int, **kwargs: Any) -> ProcessPoolExecutor:
+    """
+    A ``ProcessPoolExecutor`` whose workers never ``fork`` the calling process.
+
+    Pools are opened inside :func:`staged` producer threads, and forking a
+    multi-threaded process can copy a lock another thread holds. Workers come
+    from a ``forkserver`` where the platform has one, else ``spawn``.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context(method), **kwargs)
+
+
+def ordered_map(
+    executor: Executor,
+    fn: Callable[..., Any],
+    iterable: Iterable[Any],
+    window: int,
+) -> Iterator[Any]:
+    """
+    Like ``executor.map`` but with at most ``window`` tasks in flight.
+
+    Results come back in input order, and the input is consumed lazily so a
+    streamed source is never materialized. The first failing task raises and
+    the still-pending tasks are cancelled.
+    """
+    pending: "deque[Any]" = deque()
+    try:
+        for item in iterable:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+search_index.py
+
+🔎 Persistent inverted index over message text, memory-mapped at query time.
+
+An index is a directory of immutable *segments* plus a manifest. A segment
+maps every term to a postings list: the messages it occurs in, and its token
+positions inside each message (for phrase queries)::
+
+    seg-000001.json    conversations: id, title, freshness, length in tokens
+    seg-000001.terms   term bytes, sorted
+    seg-000001.tix     one fixed-size record per term: where its bytes and
+                       postings are, and its document frequency
+    seg-000001.post    uint32 postings: doc, tf, positions… for each message
+    seg-000001.docs    one record per message: conversation, length, node id
+                       and text locations
+    seg-000001.nodes   message node ids
+    seg-000001.text    message text, for snippets
+
+A query binary-searches the term records in place, so only the postings of
+its own terms are read. Indexing a newer export adds a segment holding the
+conversations that are new or have a newer ``update_time`` (the same rule
+:mod:`rehash.merge_exports` uses), and the manifest marks their older
+copies deleted. Segments already written are never rewritten.
+
+Ranked queries score whole conversations with BM25, from the stored term
+frequencies and conversation lengths, and keep the top K on a heap. Snippets
+come from the stored text of the best-matching messages, so an export is
+never re-read.
+"""
+
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+from rehash.export_index import conversation_id
+from rehash.extract_export import iter_conversations
+from rehash.merge_exports import freshness
+from rehash.messages import iter_messages, message_text
+
+SEARCH_FORMAT = 2
+SEARCH_INDEX_ENV = "REHASH_SEARCH_INDEX"
+MANIFEST_NAME = "manifest.json"
+
+# Messages per segment; larger exports are written as several segments.
+SEGMENT_DOCS = 100_000
+
+# BM25 term-frequency saturation and length normalization.
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Snippets per ranked hit, and characters of text around the first match.
+SNIPPETS_PER_HIT = 2
+SNIPPET_CHARS = 160
+
+_TOKEN = re.compile(r"\w+")
+_QUERY_WORD = re.compile(r'"([^"]*)"|(\S+)')
+_UINT32 = "I" if array("I").itemsize == 4 else "L"
+# term offset, postings offset (in uint32 items), term length, postings length, document frequency
+_TERM = struct.Struct("<QQIII")
+# conversation ordinal, length in tokens, node id offset, node id length, text offset, text length
+_DOC = struct.Struct("<IIQIQI")
+
+# AND-ed groups of OR-ed phrases; a one-token phrase is a plain term.
+Query = List[List[Tuple[str, ...]]]
+# phrase ➤ doc ➤ occurrences, within one segment
+_Counts = Dict[Tuple[str, ...], Dict[int, int]]
+
+
+class SearchHit(NamedTuple):
+    id: str
+    title: Optional[str]
+    update_time: Optional[float]
+    messages: Tuple[str, ...]  # node ids of the matching messages
+    score: Optional[float] = None  # BM25, for ranked results
+    snippets: Tuple[str, ...] = ()  # highlighted text of the best messages, for ranked results
+
+
+class IndexStats:
+    """Counts from one :func:`build_search_index` run."""
+
+    def __init__(self) -> None:
+        self.added = 0
+        self.replaced = 0
+        self.unchanged = 0
+        self.messages = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.added} added, {self.replaced} replaced, "
+            f"{self.unchanged} unchanged, {self.messages} messages indexed"
+        )
+
+
+def default_search_path() -> Path:
+    """Resolve ``$REHASH_SEARCH_INDEX``, then ``~/.rehash/search``."""
+    explicit = os.environ.get(SEARCH_INDEX_ENV)
+    return Path(explicit) if explicit else Path.home() / ".rehash" / "search"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased ``\\w+`` runs of ``text``; the same tokens for documents and queries."""
+    return _TOKEN.findall(text.lower())
+
+
+def parse_query(text: str) -> Query:
+    """
+    Parse a search query.
+
+    Words are AND-ed, ``OR`` between two words or phrases makes them
+    alternatives, and ``"..."`` is a phrase. A word the tokenizer splits
+    (``pull-ups``) is searched as a phrase too.
+
+    Raises:
+        ValueError: Unbalanced quotes, or no searchable terms.
+    """
+    if text.count('"') % 2:
+        raise ValueError(f"Unbalanced quote in search query: {text}")
+    groups: Query = []
+    alternative = False
+    for match in _QUERY_WORD.finditer(text):
+        quoted, word = match.groups()
+        if word in ("OR", "AND"):
+            alternative = word == "OR" and bool(groups)
+            continue
+        phrase = tuple(tokenize(quoted if quoted is not None else word))
+        if not phrase:
+            continue
+        if alternative:
+            groups[-1].append(phrase)
+        else:
+            groups.append([phrase])
+        alternative = False
+    if not groups:
+        raise ValueError(f"Search query has no searchable terms: {text!r}")
+    return groups
+
+
+def _write_uint32(f: IO[bytes], items: "array[int]") -> None:
+    if sys.byteorder == "big":
+        items = array(_UINT32, items)
+        items.byteswap()
+    items.tofile(f)
+
+
+def _read_uint32(raw: bytes) -> "array[int]":
+    items = array(_UINT32, raw)
+    if sys.byteorder == "big":
+        items.byteswap()
+    return items
+
+
+def _map(path: Path) -> Any:
+    """Read-only map of ``path``; empty files, which mmap rejects, read as ``b""``."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _save_json(path: Path, payload: Any) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    tmp.replace(path)
+
+
+def _load_manifest(directory: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(directory / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get("format") != SEARCH_FORMAT:
+        raise ValueError(f"Unsupported search index format in {directory}; delete it and run `rehash index build`")
+    return manifest
+
+
+def _load_conversations(directory: Path, name: str) -> List[List[Any]]:
+    with open(directory / f"{name}.json", "r", encoding="utf-8") as f:
+        return json.load(f)["conversations"]
+
+
+class _SegmentWriter:
+    """Collects postings in memory until they are written out as one segment."""
+
+    def __init__(self) -> None:
+        self.conversations: List[List[Any]] = []
+        self.docs: List[Tuple[int, int, bytes, bytes]] = []
+        self.postings: Dict[str, "array[int]"] = {}
+        self.doc_freq: Dict[str, int] = {}
+        self.tokens = 0
+
+    def add_conversation(self, cid: str, title: Any, stamp: float) -> int:
+        self.conversations.append([cid, title, stamp, 0])
+        return len(self.conversations) - 1
+
+    def add_message(self, ordinal: int, node_id: str, text: str) -> bool:
+        """Index one message; ``False`` if it has no tokens."""
+        tokens = tokenize(text)
+        if not tokens:
+            return False
+        doc = len(self.docs)
+        self.docs.append((ordinal, len(tokens), node_id.encode("utf-8"), text.encode("utf-8")))
+        self.conversations[ordinal][3] += len(tokens)
+        self.tokens += len(tokens)
+        positions: Dict[str, List[int]] = {}
+        for position, term in enumerate(tokens):
+            positions.setdefault(term, []).append(position)
+        for term, where in positions.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = array(_UINT32)
+                self.doc_freq[term] = 0
+            postings.append(doc)
+            postings.append(len(where))
+            postings.extend(where)
+            self.doc_freq[term] += 1
+        return True
+
+    def write(self, directory: Path, name: str) -> None:
+        base = directory / name
+        # 🔤 str order is code point order, which is also UTF-8 byte order.
+        with open(f"{base}.tix", "wb") as tix, open(f"{base}.terms", "wb") as terms, open(f"{base}.post", "wb") as post:
+            term_offset = post_offset = 0
+            for term in sorted(self.postings):
+                raw = term.encode("utf-8")
+                postings = self.postings[term]
+                tix.write(_TERM.pack(term_offset, post_offset, len(raw), len(postings), self.doc_freq[term]))
+                terms.write(raw)
+                _write_uint32(post, postings)
+                term_offset += len(raw)
+                post_offset += len(postings)
+        with open(f"{base}.docs", "wb") as docs, open(f"{base}.nodes", "wb") as nodes, open(f"{base}.text", "wb") as texts:
+            node_offset = text_offset = 0
+            for ordinal, length, node, text in self.docs:
+                docs.write(_DOC.pack(ordinal, length, node_offset, len(node), text_offset, len(text)))
+                nodes.write(node)
+                texts.write(text)
+                node_offset += len(node)
+                text_offset += len(text)
+        _save_json(base.with_name(f"{name}.json"), {"tokens": self.tokens, "conversations": self.conversations})
+
+
+class _Segment:
+    """One memory-mapped segment, minus the conversations deleted from it."""
+
+    def __init__(self, directory: Path, name: str, deleted: List[int]) -> None:
+        self.name = name
+        self.deleted = frozenset(deleted)
+        self.conversations = _load_conversations(directory, name)
+        base = directory / name
+        self._tix = _map(Path(f"{base}.tix"))
+        self._terms = _map(Path(f"{base}.terms"))
+        self._post = _map(Path(f"{base}.post"))
+        self._docs = _map(Path(f"{base}.docs"))
+        self._nodes = _map(Path(f"{base}.nodes"))
+        self._text = _map(Path(f"{base}.text"))
+        self.term_count = len(self._tix) // _TERM.size
+
+    def _find(self, term: str) -> Optional[Tuple[int, int]]:
+        """``(postings offset, postings length)`` of ``term``, by binary search."""
+        key = term.encode("utf-8")
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            term_offset, post_offset, term_length, post_length, _ = _TERM.unpack_from(self._tix, mid * _TERM.size)
+            probe = self._terms[term_offset:term_offset + term_length]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return post_offset, post_length
+        return None
+
+    def postings(self, term: str) -> Dict[int, "array[int]"]:
+        """doc ➤ token positions of ``term``."""
+        found = self._find(term)
+        if found is None:
+            return {}
+        offset, length = found
+        items = _read_uint32(self._post[offset * 4:(offset + length) * 4])
+        result = {}
+        i = 0
+        while i < len(items):
+            tf = items[i + 1]
+            result[items[i]] = items[i + 2:i + 2 + tf]
+            i += 2 + tf
+        return result
+
+    def conversation_of(self, doc: int) -> int:
+        return _DOC.unpack_from(self._docs, doc * _DOC.size)[0]
+
+    def node_id(self, doc: int) -> str:
+        _, _, offset, length, _, _ = _DOC.unpack_from(self._docs, doc * _DOC.size)
+        return self._nodes[offset:offset + length].decode("utf-8")
+
+    def text(self, doc: int) -> str:
+        *_, offset, length = _DOC.unpack_from(self._docs, doc * _DOC.size)
+        return self._text[offset:offset + length].decode("utf-8")
+
+    def close(self) -> None:
+        for view in (self._tix, self._terms, self._post, self._docs, self._nodes, self._text):
+            if isinstance(view, mmap.mmap):
+                view.close()
+
+
+def _phrase_counts(segment: _Segment, phrase: Tuple[str, ...]) -> Dict[int, int]:
+    """doc ➤ occurrences of ``phrase`` (its tokens at consecutive positions) in ``segment``."""
+    lists = [segment.postings(term) for term in phrase]
+    if not all(lists):
+        return {}
+    docs = set(lists[0]).intersection(*lists[1:])
+    if len(phrase) == 1:
+        return {doc: len(lists[0][doc]) for doc in docs}
+    counts = {}
+    for doc in docs:
+        later = [set(postings[doc]) for postings in lists[1:]]
+        found = sum(all(start + k in where for k, where in enumerate(later, 1)) for start in lists[0][doc])
+        if found:
+            counts[doc] = found
+    return counts
+
+
+def _match_segment(segment: _Segment, query: Query, counts: _Counts) -> Dict[int, Set[int]]:
+    """Live conversation ordinal ➤ docs holding any query phrase, for conversations matching ``query``."""
+    matched: Dict[int, Set[int]] = {}
+    conversations: Optional[Set[int]] = None
+    for group in query:
+        found: Set[int] = set()
+        for phrase in group:
+            for doc in counts[phrase]:
+                ordinal = segment.conversation_of(doc)
+                found.add(ordinal)
+                matched.setdefault(ordinal, set()).add(doc)
+        conversations = found if conversations is None else conversations & found
+        if not conversations:
+            return {}
+    if conversations is None:
+        return {}  # empty query
+    return {ordinal: matched[ordinal] for ordinal in sorted(conversations - segment.deleted)}
+
+
+def _hit(segment: _Segment, ordinal: int, docs: Iterable[int], **ranked: Any) -> SearchHit:
+    cid, title, stamp, _ = segment.conversations[ordinal]
+    nodes = tuple(segment.node_id(doc) for doc in sorted(docs))
+    return SearchHit(cid, title, stamp if stamp != float("-inf") else None, nodes, **ranked)
+
+
+def snippet(text: str, terms: Set[str], width: int = SNIPPET_CHARS) -> str:
+    """
+    About ``width`` characters of ``text`` around its first query term, with
+    every query term in the window wrapped in ``[...]``.
+    """
+    hits = [m for m in _TOKEN.finditer(text) if m.group().lower() in terms]
+    first = hits[0].start() if hits else 0
+    start = max(0, first - width // 4)
+    if start:
+        space = text.find(" ", start, first)  # don't open mid-word
+        start = space + 1 if space != -1 else start
+    end = min(len(text), start + width)
+    parts = ["…" if start else ""]
+    cursor = start
+    for m in hits:
+        if m.end() > end:
+            break
+        parts += [text[cursor:m.start()], "[", m.group(), "]"]
+        cursor = m.end()
+    parts += [text[cursor:end], "…" if end < len(text) else ""]
+    return " ".join("".join(parts).split())
+
+
+class SearchIndex:
+    """
+    Read-only view of a search index directory.
+
+    Raises:
+        FileNotFoundError: ``directory`` holds no index.
+        ValueError: The index was written in another format.
+    """
+
+    def __init__(self, directory: Optional[Path] = None) -> None:
+        self.directory = Path(directory) if directory is not None else default_search_path()
+        manifest = _load_manifest(self.directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No search index in {self.directory}; run `rehash index build <zip>`")
+        self.segments = [_Segment(self.directory, s["name"], s["deleted"]) for s in manifest["segments"]]
+
+    def __len__(self) -> int:
+        """Live (not superseded) conversations."""
+        return sum(len(s.conversations) - len(s.deleted) for s in self.segments)
+
+    def search(self, query: Union[str, Query]) -> List[SearchHit]:
+        """
+        Conversations matching ``query`` (see :func:`parse_query`), newest first.
+
+        Every AND-ed group must match somewhere in the conversation; a phrase
+        must match within one message.
+        """
+        groups = parse_query(query) if isinstance(query, str) else query
+        phrases = {phrase for group in groups for phrase in group}
+        hits = []
+        for segment in self.segments:
+            counts = {phrase: _phrase_counts(segment, phrase) for phrase in phrases}
+            hits += [_hit(segment, ordinal, docs) for ordinal, docs in _match_segment(segment, groups, counts).items()]
+        hits.sort(key=lambda h: (-(h.update_time if h.update_time is not None else float("-inf")), h.id))
+        return hits
+
+    def rank(self, query: Union[str, Query], limit: int = 10) -> List[SearchHit]:
+        """
+        The ``limit`` conversations matching ``query`` with the highest BM25
+        scores, best first, with snippets of their best-matching messages.
+
+        Each phrase of the query counts as one BM25 term. A conversation is
+        one document: its term frequency is summed over its messages, and its
+        length is its total number of tokens.
+        """
+        groups = parse_query(query) if isinstance(query, str) else query
+        phrases = {phrase for group in groups for phrase in group}
+        total = len(self)
+        if not total:
+            return []
+        live_tokens = sum(
+            conversation[3]
+            for segment in self.segments
+            for ordinal, conversation in enumerate(segment.conversations)
+            if ordinal not in segment.deleted
+        )
+        average = max(live_tokens / total, 1.0)
+
+        # 1️⃣ Postings of every phrase in every segment: document frequencies and matches.
+        doc_freq = dict.fromkeys(phrases, 0)
+        scanned = []
+        for segment in self.segments:
+            counts = {phrase: _phrase_counts(segment, phrase) for phrase in phrases}
+            for phrase, found in counts.items():
+                doc_freq[phrase] += len({segment.conversation_of(doc) for doc in found} - segment.deleted)
+            scanned.append((segment, counts, _match_segment(segment, groups, counts)))
+        idf = {p: math.log(1 + (total - df + 0.5) / (df + 0.5)) for p, df in doc_freq.items()}
+
+        # 2️⃣ BM25 per matching conversation; only the top ``limit`` survive the heap.
+        def candidates() -> Iterator[Tuple[float, int, _Segment, _Counts, int, Set[int]]]:
+            serial = 0
+            for segment, counts, matched in scanned:
+                for ordinal, docs in matched.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * segment.conversations[ordinal][3] / average)
+                    score = 0.0
+                    for phrase, found in counts.items():
+                        tf = sum(found.get(doc, 0) for doc in docs)
+                        if tf:
+                            score += idf[phrase] * tf * (BM25_K1 + 1) / (tf + norm)
+                    serial -= 1  # ties keep index order
+                    yield score, serial, segment, counts, ordinal, docs
+
+        terms = {term for phrase in phrases for term in phrase}
+        hits = []
+        for score, _, segment, counts, ordinal, docs in heapq.nlargest(limit, candidates(), key=lambda c: c[:2]):
+            # 🔦 Snippets from the messages carrying the most query weight.
+            weight = {doc: sum(idf[p] * found.get(doc, 0) for p, found in counts.items()) for doc in docs}
+            best = sorted(docs, key=lambda doc: (-weight[doc], doc))[:SNIPPETS_PER_HIT]
+            snippets = tuple(snippet(segment.text(doc), terms) for doc in best)
+            hits.append(_hit(segment, ordinal, docs, score=round(score, 4), snippets=snippets))
+        return hits
+
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
+
+    def __enter__(self) -> "SearchIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def build_search_index(
+    zip_path: Union[str, Path],
+    directory: Optional[Path] = None,
+    jobs: int = 1,
+    cache: bool = False,
+) -> IndexStats:
+    """
+    Add an export's message text to a search index, creating it if needed.
+
+    Conversations already indexed with the same or a newer ``update_time`` are
+    skipped; newer copies go into new segments and supersede the old ones.
+    Conversations without an id cannot be tracked and are not indexed.
+
+    Args:
+        zip_path: Export ZIP or extracted export folder.
+        directory: Index directory (default: :func:`default_search_path`).
+        jobs: Decode ``conversations.json`` across this many processes.
+        cache: Read through the parsed-export cache.
+    """
+    directory = Path(directory) if directory is not None else default_search_path()
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(directory) or {"format": SEARCH_FORMAT, "segments": [], "next": 1}
+
+    # id ➤ (segment, ordinal, freshness) of every live conversation
+    deleted: Dict[str, Set[int]] = {s["name"]: set(s["deleted"]) for s in manifest["segments"]}
+    live: Dict[str, Tuple[str, int, float]] = {}
+    for segment in manifest["segments"]:
+        for ordinal, (cid, _, stamp, _) in enumerate(_load_conversations(directory, segment["name"])):
+            if ordinal not in deleted[segment["name"]]:
+                live[cid] = (segment["name"], ordinal, stamp)
+
+    stats = IndexStats()
+    written: List[str] = []
+    writer = _SegmentWriter()
+    name = f"seg-{manifest['next']:06d}"
+    for convo in iter_conversations(zip_path, jobs=jobs, cache=cache):
+        cid = conversation_id(convo)
+        if cid is None:
+            continue
+        stamp = freshness(convo)
+        previous = live.get(cid)
+        if previous is not None:
+            if stamp <= previous[2]:
+                stats.unchanged += 1
+                continue
+            deleted.setdefault(previous[0], set()).add(previous[1])
+            stats.replaced += 1
+        else:
+            stats.added += 1
+
+        ordinal = writer.add_conversation(cid, convo.get("title"), stamp)
+        live[cid] = (name, ordinal, stamp)
+        for node_id, message in iter_messages(convo):
+            stats.messages += writer.add_message(ordinal, node_id, message_text(message))
+        if len(writer.docs) >= SEGMENT_DOCS:
+            writer.write(directory, name)
+            written.append(name)
+            writer = _SegmentWriter()
+            name = f"seg-{manifest['next'] + len(written):06d}"
+    if writer.conversations:
+        writer.write(directory, name)
+        written.append(name)
+
+    # 📌 The manifest is the commit point: until it is replaced, new segments are invisible.
+    manifest["segments"] += [{"name": n} for n in written]
+    for segment in manifest["segments"]:
+        segment["deleted"] = sorted(deleted.get(segment["name"], ()))
+    manifest["next"] += len(written)
+    _save_json(directory / MANIFEST_NAME, manifest)
+    return stats
@@ -6,13 +6,14 @@ utils.py
 🧠 Utilities for rehash toolchain:
 - Filename parsing
 - ISO timestamp extraction
+- Export timestamp normalization
 - Title sanitization
 """
 
 import re
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 
 def extract_timestamp_from_filename(filename: str) -> Optional[str]:
@@ -35,6 +36,21 @@ def extract_timestamp_from_filename(filename: str) -> Optional[str]:
         return None
 
 
+def to_epoch(value: Any) -> float:
+    """
+    Normalize an export timestamp (epoch number or ISO 8601 string) to epoch seconds.
+
+    Raises:
+        ValueError: If the value cannot be interpreted as a timestamp.
+    """
+    if isinstance(value, str) and "T" in value:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    try:
+        return float(value)
+    except TypeError:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+
+
 def sanitize_title(title: str) -> str:
     """
     Replace unsafe characters and normalize for filenames.
@@ -1,7 +1,57 @@
 # tests/conftest.py
 
+import json
 import sys
+import zipfile
 from pathlib import Path
 
+import pytest
+
 # Add project root to sys.path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep the parsed-export cache (and CLI subprocesses) out of ~/.cache."""
+    cache_dir = tmp_path / "rehash-cache"
+    monkeypatch.setenv("REHASH_CACHE_DIR", str(cache_dir))
+    monkeypatch.delenv("REHASH_CACHE_MAX_SIZE", raising=False)
+    return cache_dir
+
+
+@pytest.fixture(autouse=True)
+def isolated_fitness_config(tmp_path_factory, monkeypatch):
+    """Ignore the developer's ~/.rehash/config.yaml and fitness keyword env var."""
+    home = tmp_path_factory.mktemp("home")
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.delenv("REHASH_FITNESS_KEYWORDS", raising=False)
+    return home
+
+
+@pytest.fixture(autouse=True)
+def isolated_search_index(tmp_path, monkeypatch):
+    """Keep `rehash index build` / `rehash search` away from ~/.rehash/search."""
+    directory = tmp_path / "rehash-search"
+    monkeypatch.setenv("REHASH_SEARCH_INDEX", str(directory))
+    return directory
+
+
+@pytest.fixture
+def make_export(tmp_path):
+    """Factory writing a ChatGPT-style export ZIP under tmp_path.
+
+    ``make_export(name, conversations, compression=zipfile.ZIP_STORED, extra=None)``
+    writes the ``extra`` members (name ➤ text) ahead of conversations.json and
+    returns the ZIP path.
+    """
+
+    def make(name, conversations, compression=zipfile.ZIP_STORED, extra=None):
+        path = tmp_path / name
+        with zipfile.ZipFile(path, "w", compression) as zf:
+            for member, text in (extra or {}).items():
+                zf.writestr(member, text)
+            zf.writestr("conversations.json", json.dumps(conversations))
+        return path
+
+    return make
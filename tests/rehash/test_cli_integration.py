@@ -178,6 +178,18 @@ def test_cli_nonexistent_file():
     assert "does not exist" in result.stderr.lower()
 
 
+@pytest.mark.parametrize("fmt", ["json", "jsonl", "sqlite"])
+def test_cli_failed_export_creates_no_output(tmp_path, fmt):
+    out = tmp_path / ("w2.db" if fmt == "sqlite" else "w2")
+    result = subprocess.run(
+        [sys.executable, "-m", "rehash", "parse-export", str(tmp_path / "missing.zip"), "--out", str(out), "--format", fmt],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode != 0
+    assert not out.exists()
+
+
 def test_cli_missing_conversations(tmp_path):
     """Should fail if zip doesn't contain conversations.json."""
     broken = tmp_path / "broken.zip"
@@ -321,3 +333,326 @@ def test_cli_main_module_invocation():
 
     assert result.returncode == 0
     assert "Rehash CLI Tool" in result.stdout
+
+def test_parse_export_handler_streaming_summary(tmp_path, capsys):
+    import json
+    import zipfile
+    from rehash import cli
+
+    zip_path = tmp_path / "export.zip"
+    data = [
+        {"title": "Workout log", "create_time": 1717452300},
+        {"title": "Vacation", "create_time": 1717452300},
+    ]
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    args = cli.get_parser().parse_args(
+        ["parse-export", str(zip_path), "--out", str(tmp_path / "out"), "--fitness-only"]
+    )
+    cli.parse_export_handler(args)
+
+    out = capsys.readouterr().out
+    assert "🧠 Total conversations: 2" in out
+    assert "🏋️ Filtered fitness conversations: 1" in out
+    assert "✅ Exported: 1 files" in out
+
+    args = cli.get_parser().parse_args(
+        ["parse-export", str(zip_path), "--out", str(tmp_path / "pool"), "--fitness-only", "--filter-jobs", "2"]
+    )
+    cli.parse_export_handler(args)
+    assert "🏋️ Filtered fitness conversations: 1" in capsys.readouterr().out
+
+def test_cli_summary_counts_files_once_per_repeated_id(tmp_path, capsys):
+    import json
+    import zipfile
+    from rehash import cli
+
+    zip_path = tmp_path / "export.zip"
+    data = [
+        {"id": "a", "title": "Leg day", "create_time": 1717452300},
+        {"id": "b", "title": "Rest day", "create_time": 1717452300},
+        {"id": "a", "title": "Leg day", "create_time": 1717452300},
+    ]
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    for out in (tmp_path / "out", tmp_path / "out.zip"):
+        cli.parse_export_handler(cli.get_parser().parse_args(["parse-export", str(zip_path), "--out", str(out)]))
+        assert "✅ Exported: 2 files" in capsys.readouterr().out
+    assert len(list((tmp_path / "out").glob("*.json"))) == 2
+
+
+def test_cli_parse_export_jobs(tmp_path):
+    zip_path = "tests/rehash/fixtures/valid_export.zip"
+    out_dir = tmp_path / "jobs"
+
+    result = subprocess.run(
+        [sys.executable, "-m", "rehash", "parse-export", zip_path, "--out", str(out_dir), "--jobs", "2"],
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0
+    assert "✅ Exported: 1 files" in result.stdout
+    assert len(list(out_dir.glob("*.json"))) == 1
+
+def test_cli_index_build_and_show(tmp_path):
+    import json
+    import zipfile
+
+    zip_path = tmp_path / "export.zip"
+    data = [
+        {"id": "aaa-1", "title": "Alpha", "create_time": 1, "mapping": {}},
+        {"id": "bbb-2", "title": "Beta", "create_time": 2, "mapping": {}},
+    ]
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    build = subprocess.run(
+        [sys.executable, "-m", "rehash", "index", "build", str(zip_path)],
+        capture_output=True,
+        text=True,
+    )
+    assert build.returncode == 0
+    assert "🗂️ Index written" in build.stdout
+
+    show = subprocess.run(
+        [sys.executable, "-m", "rehash", "show", str(zip_path), "bbb"],
+        capture_output=True,
+        text=True,
+    )
+    assert show.returncode == 0
+    assert json.loads(show.stdout) == data[1]
+
+def test_cli_list_fitness_titles(tmp_path):
+    import json
+    import zipfile
+
+    zip_path = tmp_path / "export.zip"
+    data = [
+        {"id": "aaa-1", "title": "Workout log", "create_time": 1717452300, "mapping": {}},
+        {"id": "bbb-2", "title": "Vacation", "create_time": 1717452300, "mapping": {}},
+    ]
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    result = subprocess.run(
+        [sys.executable, "-m", "rehash", "list", str(zip_path), "--fitness-only"],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0
+    assert "aaa-1  2024-06-" in result.stdout
+    assert "Workout log" in result.stdout
+    assert "bbb-2" not in result.stdout
+    assert "Listed 1 of 2 conversations" in result.stdout
+
+def test_cli_merge_exports(tmp_path):
+    import json
+    import zipfile
+
+    for name, data in [
+        ("2024-06-01.zip", [{"id": "a", "title": "Alpha", "create_time": 1717452300, "update_time": 1}]),
+        ("2024-06-08.zip", [
+            {"id": "a", "title": "Alpha", "create_time": 1717452300, "update_time": 2},
+            {"id": "b", "title": "Beta", "create_time": 1717452300, "update_time": 2},
+        ]),
+    ]:
+        with zipfile.ZipFile(tmp_path / name, "w") as zf:
+            zf.writestr("conversations.json", json.dumps(data))
+
+    out_dir = tmp_path / "merged"
+    result = subprocess.run(
+        [sys.executable, "-m", "rehash", "merge",
+         str(tmp_path / "2024-06-01.zip"), str(tmp_path / "2024-06-08.zip"), "--out", str(out_dir)],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0
+    assert "🧠 Total conversations: 3" in result.stdout
+    assert "🔁 Unique conversation ids: 2" in result.stdout
+    assert "✅ Exported: 2 files" in result.stdout
+    assert json.loads(next(out_dir.glob("*alpha.json")).read_text())["update_time"] == 2
+
+def test_cli_parse_export_writers(tmp_path):
+    zip_path = "tests/rehash/fixtures/valid_export.zip"
+    out_dir = tmp_path / "writers"
+
+    result = subprocess.run(
+        [sys.executable, "-m", "rehash", "parse-export", zip_path, "--out", str(out_dir), "--writers", "4"],
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0
+    assert "✅ Exported: 1 files" in result.stdout
+
+def test_cli_parse_export_jsonl_gz(tmp_path):
+    out_dir = tmp_path / "bundle"
+
+    result = subprocess.run(
+        [sys.executable, "-m", "rehash", "parse-export", "tests/rehash/fixtures/valid_export.zip",
+         "--out", str(out_dir), "--format", "jsonl.gz", "--max-file-size", "1M"],
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0
+    assert "✅ Exported: 1 conversations" in result.stdout
+    assert (out_dir / "conversations-00000.jsonl.gz").exists()
+    assert (out_dir / "conversations.index.json").exists()
+
+def test_cli_parse_export_incremental(tmp_path):
+    import json
+    import zipfile
+
+    zip_path = tmp_path / "export.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("conversations.json", json.dumps(
+            [{"id": "a", "title": "Alpha", "create_time": 1717452300, "update_time": 1717452300}]
+        ))
+    args = [sys.executable, "-m", "rehash", "parse-export", str(zip_path),
+            "--out", str(tmp_path / "sync"), "--incremental"]
+
+    first = subprocess.run(args, capture_output=True, text=True)
+    second = subprocess.run(args, capture_output=True, text=True)
+
+    assert first.returncode == 0 and second.returncode == 0
+    assert "♻️ Synced: 1 added, 0 updated, 0 unchanged, 0 removed" in first.stdout
+    assert "♻️ Synced: 0 added, 0 updated, 1 unchanged, 0 removed" in second.stdout
+
+def test_cli_parse_export_into_zip(tmp_path):
+    import zipfile
+
+    out_zip = tmp_path / "result.zip"
+    result = subprocess.run(
+        [sys.executable, "-m", "rehash", "parse-export", "tests/rehash/fixtures/valid_export.zip",
+         "--out", str(out_zip), "--zip-compression", "bzip2"],
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0
+    assert "✅ Exported: 1 files" in result.stdout
+    with zipfile.ZipFile(out_zip) as zf:
+        assert len(zf.namelist()) == 1
+
+def test_cli_parse_export_sqlite(tmp_path):
+    import sqlite3
+
+    db_path = tmp_path / "out.db"
+    result = subprocess.run(
+        [sys.executable, "-m", "rehash", "parse-export", "tests/rehash/fixtures/valid_export.zip",
+         "--out", str(db_path), "--format", "sqlite", "--defer-indexes"],
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0
+    assert "✅ Exported: 1 conversations" in result.stdout
+    db = sqlite3.connect(db_path)
+    assert db.execute("SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH 'log'").fetchone()[0] >= 1
+    db.close()
+
+def test_cli_list_fitness_keywords(tmp_path):
+    import json
+    import os
+    import zipfile
+
+    zip_path = tmp_path / "export.zip"
+    data = [
+        {"id": "aaa-1", "title": "Deadlift PR", "create_time": 1717452300, "mapping": {}},
+        {"id": "bbb-2", "title": "Squat day", "create_time": 1717452300, "mapping": {}},
+    ]
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    env = dict(os.environ, REHASH_FITNESS_KEYWORDS="squat")
+    cmd = [sys.executable, "-m", "rehash", "list", str(zip_path), "--fitness-only"]
+    from_env = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    from_flag = subprocess.run(cmd + ["--fitness-keywords", "deadlift"], capture_output=True, text=True, env=env)
+
+    assert "Listed 1 of 2" in from_env.stdout and "bbb-2" in from_env.stdout
+    assert "Listed 1 of 2" in from_flag.stdout and "aaa-1" in from_flag.stdout
+
+    engine = ["--fitness-keywords", "deadlift", "--fitness-engine", "aho-corasick"]
+    from_automaton = subprocess.run(cmd + engine, capture_output=True, text=True, env=env)
+    assert "Listed 1 of 2" in from_automaton.stdout and "aaa-1" in from_automaton.stdout
+
+def test_parse_export_full_text_roles(tmp_path, capsys):
+    import json
+    import zipfile
+    from rehash import cli
+
+    zip_path = tmp_path / "export.zip"
+    user_msg = {"message": {"author": {"role": "user"}, "content": {"parts": ["hi", "workout log"]}}}
+    data = [{"title": "Chat", "mapping": {"1": user_msg}}, {"title": "Other", "mapping": {}}]
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    base = ["parse-export", str(zip_path), "--out", str(tmp_path / "out"), "--fitness-only"]
+    cli.parse_export_handler(cli.get_parser().parse_args(base))
+    assert "🏋️ Filtered fitness conversations: 0" in capsys.readouterr().out
+
+    cli.parse_export_handler(cli.get_parser().parse_args(base + ["--fitness-roles", "user,assistant"]))
+    assert "🏋️ Filtered fitness conversations: 1" in capsys.readouterr().out
+
+def test_cli_index_build_and_search(tmp_path, capsys):
+    import json
+    import zipfile
+    from rehash import cli
+
+    zip_path = tmp_path / "export.zip"
+    msg = {"message": {"author": {"role": "user"}, "content": {"parts": ["Deadlift 5x5 went well"]}}}
+    data = [
+        {"id": "aaa-1", "title": "Lifting", "update_time": 1717452300, "mapping": {"n1": msg}},
+        {"id": "bbb-2", "title": "Vacation", "update_time": 1717452300, "mapping": {}},
+    ]
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    cli.main(["index", "build", str(zip_path)])
+    assert "🔎 Search index updated" in capsys.readouterr().out
+
+    cli.main(["search", "deadlift 5x5"])
+    out = capsys.readouterr().out
+    assert "aaa-1  2024-06-" in out and "Lifting" in out and "n1" in out
+    assert "Showing 1 matching conversations" in out
+
+    cli.main(["search", "deadlift", "--rank"])
+    out = capsys.readouterr().out
+    assert "aaa-1" in out and "💬 [Deadlift] 5x5 went well" in out
+    assert "Top 1 conversations by BM25" in out
+
+    with pytest.raises(SystemExit):
+        cli.main(["search", "deadlift", "--search-index", str(tmp_path / "none")])
+    assert "No search index" in capsys.readouterr().err
+
+def test_parse_export_filter_with_fitness_only(tmp_path, capsys):
+    import json
+    import zipfile
+    from rehash import cli
+
+    zip_path = tmp_path / "export.zip"
+    data = [
+        {"id": "a", "title": "Workout log", "default_model_slug": "gpt-4", "mapping": {}},
+        {"id": "b", "title": "Workout plan", "default_model_slug": "gpt-4o", "mapping": {}},
+        {"id": "c", "title": "Vacation", "default_model_slug": "gpt-4", "mapping": {}},
+    ]
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    base = ["parse-export", str(zip_path), "--out", str(tmp_path / "out"), "--filter", "items[?model=='gpt-4']"]
+    cli.main(base)
+    out = capsys.readouterr().out
+    assert "🔍 Matched --filter: 2" in out and "✅ Exported: 2 files" in out
+
+    cli.main(base[:3] + [str(tmp_path / "fit")] + base[4:] + ["--fitness-only"])
+    out = capsys.readouterr().out
+    assert "🏋️ Filtered fitness conversations: 2" in out and "🔍 Matched --filter: 1" in out
+    assert "✅ Exported: 1 files" in out
+
+    with pytest.raises(SystemExit):
+        cli.main(base[:-1] + ["items[?"])
+    assert "Invalid --filter expression" in capsys.readouterr().err
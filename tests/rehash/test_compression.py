@@ -0,0 +1,18 @@
+import pytest
+from rehash.compression import CODECS, codec_for_path, get_codec
+
+
+@pytest.mark.parametrize("name", list(CODECS))
+def test_concatenated_blocks_decode_as_one_stream(tmp_path, name):
+    codec = get_codec(name)
+    path = tmp_path / f"blocks{codec.suffix}"
+    path.write_bytes(codec.compress(b"first\n") + codec.compress(b"second\n", codec.max_level))
+    with open(path, "rb") as raw, codec.reader(raw) as f:
+        assert f.read() == b"first\nsecond\n"
+    assert codec_for_path(path.name) is codec
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError, match="Unknown compression 'zstd'"):
+        get_codec("zstd")
+    assert codec_for_path("conversations.jsonl") is None
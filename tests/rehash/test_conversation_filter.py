@@ -0,0 +1,62 @@
+import pytest
+from rehash.conversation_filter import ConversationFilter, iter_filtered, project
+
+
+def _message(role, *parts, **metadata):
+    return {"message": {"author": {"role": role}, "content": {"parts": list(parts)}, "metadata": metadata}}
+
+
+CONVERSATIONS = [
+    {
+        "id": "aaa-1", "title": "Leg day", "default_model_slug": "gpt-4",
+        "create_time": 1717452300, "update_time": "2024-06-04T00:00:00Z",
+        "mapping": {
+            "root": {"message": None},
+            "1": _message("user", "how many sets?"),
+            "2": _message("assistant", "five"),
+            "3": _message("user", {"content_type": "image_asset_pointer"}),
+        },
+    },
+    {
+        "id": "bbb-2", "title": "Pasta", "default_model_slug": "gpt-4o", "gizmo_id": "g-123",
+        "create_time": 1709251200, "mapping": {"1": _message("user", "recipe?", attachments=[{"name": "a.pdf"}])},
+    },
+    {"conversation_id": "ccc-3", "title": None, "mapping": {}},
+]
+
+
+def test_projection_fields():
+    record = project(CONVERSATIONS[0])
+    assert record == {
+        "id": "aaa-1", "title": "Leg day", "model": "gpt-4",
+        "create_time": 1717452300.0, "update_time": 1717459200.0, "created_at": "2024-06-03 22:05:00",
+        "custom": "No", "total_messages": 3, "messages_by_role": {"user": 2, "assistant": 1},
+        "attachments": "Yes",
+    }
+    assert project(CONVERSATIONS[1])["custom"] == "Yes"
+    assert project(CONVERSATIONS[1])["attachments"] == "Yes"
+    empty = project(CONVERSATIONS[2])
+    assert (empty["id"], empty["created_at"], empty["total_messages"], empty["attachments"]) == ("ccc-3", None, 0, "No")
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("items[?model=='gpt-4']", ["aaa-1"]),  # legacy v0.1.6 form
+    ("model=='gpt-4'", ["aaa-1"]),
+    ("starts_with(created_at || '', '2024-03')", ["bbb-2"]),
+    ("contains(title || '', 'Pasta') || total_messages > `2`", ["aaa-1", "bbb-2"]),
+    ("messages_by_role.assistant", ["aaa-1"]),
+    ("total_messages", ["aaa-1", "bbb-2", "ccc-3"]),  # 0 is truthy in JMESPath
+    ("items[?custom=='Yes'].id", ["bbb-2"]),
+    ("title", ["aaa-1", "bbb-2"]),
+    ("starts_with(created_at, '2024-')", ["aaa-1", "bbb-2"]),  # ccc-3 has no created_at: a type error, not kept
+])
+def test_filter_expressions(expression, expected):
+    kept = iter_filtered(CONVERSATIONS, ConversationFilter(expression))
+    assert [project(c)["id"] for c in kept] == expected
+
+
+def test_invalid_expressions_raise_value_error():
+    with pytest.raises(ValueError, match="Invalid --filter expression"):
+        ConversationFilter("items[?model==")
+    with pytest.raises(ValueError, match="failed on aaa-1"):
+        ConversationFilter("no_such_function(title)").matches(CONVERSATIONS[0])
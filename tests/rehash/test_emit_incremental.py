@@ -0,0 +1,83 @@
+import json
+import rehash.emit_incremental as mod
+from rehash.emit_incremental import MANIFEST_NAME, EmitStats, iter_emit_incremental
+
+
+def _run(convos, out, **kwargs):
+    stats = EmitStats()
+    paths = list(iter_emit_incremental(convos, out, stats, **kwargs))
+    return paths, stats
+
+
+def _convo(cid, title, update_time, body="hi"):
+    return {"id": cid, "title": title, "create_time": 1717452300, "update_time": update_time, "body": body}
+
+
+def test_second_run_skips_unchanged_without_serializing(tmp_path, monkeypatch):
+    convos = [_convo("a", "Alpha", 1), _convo("b", "Beta", 1)]
+    paths, stats = _run(convos, tmp_path)
+    assert (stats.added, stats.updated, stats.unchanged, stats.removed) == (2, 0, 0, 0)
+    assert (tmp_path / MANIFEST_NAME).exists()
+
+    def boom(convo):
+        raise AssertionError("unchanged conversation was serialized")
+
+    monkeypatch.setattr(mod, "render", boom)
+    again, stats = _run(convos, tmp_path, writers=2)
+    assert again == paths
+    assert (stats.added, stats.updated, stats.unchanged, stats.removed) == (0, 0, 2, 0)
+
+
+def test_updates_renames_and_removals(tmp_path):
+    _run([_convo("a", "Alpha", 1), _convo("b", "Beta", None), _convo("c", "Gamma", 1)], tmp_path)
+
+    convos = [
+        _convo("a", "Alpha", 2, body="edited"),   # changed content
+        _convo("b", "Beta", None),                # no update_time: hash decides
+        _convo("d", "Delta", 1),                  # new
+    ]
+    paths, stats = _run(convos, tmp_path)
+    assert (stats.added, stats.updated, stats.unchanged, stats.removed) == (1, 1, 1, 1)
+    assert json.loads(paths[0].read_text(encoding="utf-8"))["body"] == "edited"
+    assert not any("gamma" in p.name for p in tmp_path.iterdir())
+
+    # A retitled conversation moves to its new file; the old one is dropped.
+    paths, stats = _run([_convo("a", "Renamed", 2, body="edited")], tmp_path)
+    assert stats.updated == 1 and stats.removed == 2
+    assert sorted(p.name for p in tmp_path.glob("*__*.json")) == [paths[0].name]
+
+
+def test_deleted_output_file_is_rewritten(tmp_path):
+    convos = [_convo("a", "Alpha", 1)]
+    paths, _ = _run(convos, tmp_path)
+    paths[0].unlink()
+    _, stats = _run(convos, tmp_path)
+    assert stats.updated == 1
+    assert paths[0].exists()
+
+
+def test_new_conversation_listed_first_does_not_take_an_existing_name(tmp_path):
+    a = {"id": "aaa", "title": "Same", "create_time": 1717452300, "update_time": 1}
+    b = {"id": "bbb", "title": "Same", "create_time": 1717452300, "update_time": 1}
+    (first,), _ = _run([a], tmp_path)
+
+    paths, stats = _run([b, a], tmp_path)
+    assert paths[1] == first
+    assert paths[0] != first
+    assert (stats.added, stats.updated, stats.unchanged) == (1, 0, 1)
+
+
+def test_repeated_id_keeps_the_newest_copy_and_reruns_are_idempotent(tmp_path, monkeypatch):
+    convos = [_convo("a", "Alpha", 1, body="old"), _convo("b", "Beta", 1), _convo("a", "Alpha", 2, body="new")]
+    paths, stats = _run(convos, tmp_path)
+    assert (stats.added, stats.updated, stats.unchanged) == (2, 0, 0)
+    assert json.loads(paths[0].read_text(encoding="utf-8"))["body"] == "new"
+
+    def boom(convo):
+        raise AssertionError("re-run serialized a conversation")
+
+    monkeypatch.setattr(mod, "render", boom)
+    for order in (convos, convos[::-1]):
+        _, stats = _run(order, tmp_path)
+        assert (stats.added, stats.updated, stats.unchanged, stats.removed) == (0, 0, 2, 0)
+    assert json.loads(paths[0].read_text(encoding="utf-8"))["body"] == "new"
@@ -0,0 +1,66 @@
+import bz2
+import gzip
+import json
+import lzma
+import pytest
+import rehash.emit_jsonl as mod
+from rehash.emit_jsonl import iter_emit_jsonl, load_bundle_index, read_bundle_conversation
+
+CONVERSATIONS = [{"id": f"c{i}", "title": f"Chat {i}", "body": "x" * (i * 10)} for i in range(40)]
+
+
+OPENERS = {None: (".jsonl", open), "gzip": (".jsonl.gz", gzip.open), "bz2": (".jsonl.bz2", bz2.open), "xz": (".jsonl.xz", lzma.open)}
+
+
+@pytest.mark.parametrize("compression", list(OPENERS))
+@pytest.mark.parametrize("threads", [1, 3])
+def test_bundle_round_trip(tmp_path, monkeypatch, compression, threads):
+    monkeypatch.setattr(mod, "BLOCK_BYTES", 256)  # force several compressed blocks
+    paths = list(iter_emit_jsonl(CONVERSATIONS, tmp_path, compression=compression, threads=threads))
+    suffix, opener = OPENERS[compression]
+    assert {p.name for p in paths} == {f"conversations{suffix}"}
+
+    # Concatenated blocks read back as one stream with the stock decompressors.
+    with opener(paths[0], "rb") as f:
+        assert [json.loads(line) for line in f] == CONVERSATIONS
+
+    index = load_bundle_index(tmp_path)
+    assert len(index) == len(CONVERSATIONS)
+    assert len({e.block for e in index.values()}) > 1
+    for convo in CONVERSATIONS:
+        assert read_bundle_conversation(tmp_path, index[convo["id"]]) == convo
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_bundle_rolls_over_at_size(tmp_path, monkeypatch, compression):
+    monkeypatch.setattr(mod, "BLOCK_BYTES", 256)
+    paths = list(iter_emit_jsonl(CONVERSATIONS, tmp_path, compression=compression, max_bytes=1000))
+    parts = sorted(set(paths))
+    assert len(parts) > 1
+    assert parts[0].name.startswith("conversations-00000.jsonl")
+    assert all(p.stat().st_size <= 1000 for p in parts)
+
+    index = load_bundle_index(tmp_path)
+    assert read_bundle_conversation(tmp_path, index["c39"]) == CONVERSATIONS[-1]
+
+
+def test_smaller_rerun_removes_stale_parts(tmp_path, monkeypatch):
+    monkeypatch.setattr(mod, "BLOCK_BYTES", 256)
+    list(iter_emit_jsonl(CONVERSATIONS, tmp_path, compression="gzip", max_bytes=200))
+    assert len(list(tmp_path.glob("conversations-*.jsonl.gz"))) > 2
+    (tmp_path / "notes.jsonl").write_text("keep me", encoding="utf-8")
+
+    list(iter_emit_jsonl(CONVERSATIONS[:2], tmp_path, max_bytes=200))
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert names == ["conversations-00000.jsonl", "conversations.index.json", "notes.jsonl"]
+
+
+def test_conversations_without_id_are_written_but_not_indexed(tmp_path):
+    list(iter_emit_jsonl([{"title": "anon"}, {"id": "a"}], tmp_path))
+    assert (tmp_path / "conversations.jsonl").read_text(encoding="utf-8").count("\n") == 2
+    assert list(load_bundle_index(tmp_path)) == ["a"]
+
+
+def test_bundle_rejects_bad_level(tmp_path):
+    with pytest.raises(ValueError, match="bz2 compression level must be 1-9"):
+        list(iter_emit_jsonl(CONVERSATIONS, tmp_path, compression="bz2", level=0))
@@ -0,0 +1,84 @@
+import json
+import sqlite3
+import pytest
+import rehash.emit_sqlite as mod
+from rehash.emit_sqlite import iter_emit_sqlite
+
+
+def _convo(cid, title, texts):
+    mapping = {"root": {"message": None}}
+    for i, (role, text) in enumerate(texts):
+        mapping[f"n{i}"] = {"message": {
+            "author": {"role": role},
+            "create_time": 1717452300 + i,
+            "content": {"parts": [text, {"asset_pointer": "file-x"}]},
+        }}
+    return {"id": cid, "title": title, "create_time": "2024-06-03T22:05:00Z", "update_time": 1717452400, "mapping": mapping}
+
+
+CONVERSATIONS = [
+    _convo("a", "Leg day", [("user", "Log my deadlift"), ("assistant", "Deadlift 3x5 at 140kg logged")]),
+    _convo("b", "Trip", [("user", "Plan a trip to Lisbon")]),
+    _convo("c", "Empty", []),
+]
+
+
+@pytest.mark.parametrize("defer_indexes", [False, True])
+def test_load_and_full_text_search(tmp_path, monkeypatch, defer_indexes):
+    monkeypatch.setattr(mod, "BATCH_SIZE", 2)
+    monkeypatch.setattr(mod, "BATCHES_PER_COMMIT", 1)
+    db_path = tmp_path / "out.db"
+    assert list(iter_emit_sqlite(CONVERSATIONS, db_path, defer_indexes=defer_indexes)) == ["a", "b", "c"]
+    assert [p.name for p in tmp_path.iterdir()] == ["out.db"]
+
+    db = sqlite3.connect(db_path)
+    assert db.execute("SELECT COUNT(*) FROM conversations").fetchone() == (3,)
+    assert db.execute("SELECT COUNT(*) FROM messages").fetchone() == (3,)
+    assert json.loads(db.execute("SELECT json FROM conversations WHERE id = 'b'").fetchone()[0]) == CONVERSATIONS[1]
+
+    hits = db.execute(
+        "SELECT c.id, m.role FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid "
+        "JOIN conversations c ON c.pk = m.conversation_pk "
+        "WHERE messages_fts MATCH 'deadlift' ORDER BY m.create_time"
+    ).fetchall()
+    assert hits == [("a", "user"), ("a", "assistant")]
+    indexes = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_messages_conversation" in indexes
+    db.close()
+
+
+def test_interrupted_load_leaves_no_database(tmp_path):
+    def broken():
+        yield CONVERSATIONS[0]
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        list(iter_emit_sqlite(broken(), tmp_path / "out.db"))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_conversations_without_id_keep_their_messages(tmp_path):
+    convos = [dict(CONVERSATIONS[1], id=None), CONVERSATIONS[1], CONVERSATIONS[1]]
+    list(iter_emit_sqlite(convos, tmp_path / "out.db"))
+    db = sqlite3.connect(tmp_path / "out.db")
+    assert db.execute("SELECT COUNT(*) FROM conversations").fetchone() == (2,)
+    assert db.execute("SELECT COUNT(DISTINCT conversation_pk) FROM messages").fetchone() == (2,)
+    db.close()
+
+
+@pytest.mark.parametrize("batch_size", [1, 100])
+def test_repeated_id_keeps_newest_copy(tmp_path, monkeypatch, batch_size):
+    monkeypatch.setattr(mod, "BATCH_SIZE", batch_size)
+    old = dict(_convo("a", "Old", [("user", "stale squat")]), update_time=1717452400)
+    new = dict(_convo("a", "New", [("user", "fresh bench"), ("assistant", "logged")]), update_time=1717452500)
+    older = dict(_convo("a", "Older", [("user", "ancient row")]), update_time=1717452300)
+    assert list(iter_emit_sqlite([old, CONVERSATIONS[1], new, older], tmp_path / "out.db")) == ["a", "b"]
+    db = sqlite3.connect(tmp_path / "out.db")
+    assert db.execute("SELECT title FROM conversations WHERE id = 'a'").fetchall() == [("New",)]
+    texts = db.execute(
+        "SELECT m.text FROM messages m JOIN conversations c ON c.pk = m.conversation_pk "
+        "WHERE c.id = 'a' ORDER BY m.create_time"
+    ).fetchall()
+    assert texts == [("fresh bench",), ("logged",)]
+    assert db.execute("SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH 'stale'").fetchone() == (0,)
+    db.close()
@@ -15,3 +15,80 @@ def test_emit_conversations(tmp_path):
     assert len(out_paths) == 1
     assert out_paths[0].name.startswith("2024-06")
     assert out_paths[0].read_text(encoding="utf-8").startswith("{")
+
+
+def test_emit_conversations_writer_pool_keeps_order(tmp_path):
+    import json
+    from rehash.emit_structured_json import emit_conversations
+
+    convos = [{"title": f"Chat {i}", "create_time": 1717452300 + i} for i in range(50)]
+    # Repeats of one id share a file: the later copy must win, as in a serial run.
+    convos += [{"id": "dup", "title": "Dup", "create_time": 1717452300, "n": n} for n in range(5)]
+
+    serial = emit_conversations(convos, tmp_path / "serial")
+    pooled = emit_conversations(convos, tmp_path / "pooled", writers=4)
+    assert [p.name for p in pooled] == [p.name for p in serial]
+    dup = json.loads((tmp_path / "pooled" / serial[-1].name).read_text(encoding="utf-8"))
+    assert dup["n"] == 4
+
+
+def test_emit_conversations_writer_pool_first_error(tmp_path):
+    import pytest
+    from rehash.emit_structured_json import iter_emit_conversations
+
+    convos = [
+        {"title": "ok", "create_time": 1717452300},
+        {"title": "bad", "create_time": "not-a-time"},
+        {"title": "never", "create_time": 1717452300},
+    ]
+    stream = iter_emit_conversations(convos, tmp_path, writers=3)
+    assert next(stream).name.endswith("__ok.json")
+    with pytest.raises(ValueError, match="Invalid timestamp"):
+        next(stream)
+    assert not any(p.name.endswith("__never.json") for p in tmp_path.iterdir())
+
+
+def test_emit_conversations_compressed_files(tmp_path):
+    import bz2
+    import gzip
+    import json
+    import lzma
+    from rehash.emit_structured_json import emit_conversations
+
+    convos = [{"title": f"Chat {i}", "create_time": 1717452300 + i} for i in range(3)]
+    for compression, suffix, opener in [("gzip", ".json.gz", gzip.open), ("bz2", ".json.bz2", bz2.open), ("xz", ".json.xz", lzma.open)]:
+        paths = emit_conversations(convos, tmp_path / compression, writers=2, compression=compression, level=1)
+        assert all(p.name.endswith(suffix) for p in paths)
+        with opener(paths[0], "rt", encoding="utf-8") as f:
+            assert json.load(f) == convos[0]
+
+
+def test_same_day_same_title_never_overwrites(tmp_path):
+    from rehash.emit_structured_json import emit_conversations, id_suffix
+
+    convos = [
+        {"id": "one", "title": "Standup", "create_time": 1717452300},
+        {"id": "two", "title": "Standup", "create_time": 1717452301},
+        {"title": "Standup", "create_time": 1717452302},
+    ]
+    paths = emit_conversations(convos, tmp_path, writers=2)
+    assert len(set(paths)) == 3
+    assert len(list(tmp_path.iterdir())) == 3
+    assert paths[0].name.endswith("__standup.json")
+    assert paths[1].name.endswith(f"__standup__{id_suffix('two')}.json")
+    assert paths[2].name.endswith("__standup__2.json")
+
+
+def test_allocator_prefers_previous_names():
+    from rehash.emit_structured_json import FilenameAllocator, id_suffix
+
+    one = {"id": "one", "title": "Standup", "create_time": 1717452300}
+    two = {"id": "two", "title": "Standup", "create_time": 1717452300}
+    first = FilenameAllocator()
+    names = {c["id"]: first.allocate(c) for c in (one, two)}
+
+    # Input order flips, but the manifest keeps every id on its old file.
+    again = FilenameAllocator(preferred=names)
+    assert again.allocate(two) == names["two"]
+    assert again.allocate(one) == names["one"]
+    assert names["two"].endswith(f"__{id_suffix('two')}.json")
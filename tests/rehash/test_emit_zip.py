@@ -0,0 +1,60 @@
+import json
+import zipfile
+import pytest
+from rehash.emit_zip import iter_emit_zip
+
+CONVERSATIONS = [
+    {"id": "a", "title": "Standup", "create_time": 1717452300},
+    {"id": "b", "title": "Standup", "create_time": 1717452300},
+    {"id": "c", "title": "Retro", "create_time": 1717452300},
+]
+
+
+@pytest.mark.parametrize("compression, method", [("stored", zipfile.ZIP_STORED), ("lzma", zipfile.ZIP_LZMA)])
+def test_conversations_stream_into_archive(tmp_path, compression, method):
+    out = tmp_path / "nested" / "result.zip"
+    names = list(iter_emit_zip(CONVERSATIONS, out, compression=compression))
+    assert len(set(names)) == 3
+
+    with zipfile.ZipFile(out) as zf:
+        assert zf.namelist() == names
+        assert all(info.compress_type == method for info in zf.infolist())
+        assert json.loads(zf.read(names[1])) == CONVERSATIONS[1]
+    assert [p.name for p in out.parent.iterdir()] == ["result.zip"]
+
+
+def test_interrupted_stream_leaves_no_archive(tmp_path):
+    def broken():
+        yield CONVERSATIONS[0]
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        list(iter_emit_zip(broken(), tmp_path / "result.zip"))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unknown_zip_compression(tmp_path):
+    with pytest.raises(ValueError, match="Unknown ZIP compression"):
+        list(iter_emit_zip(CONVERSATIONS, tmp_path / "result.zip", compression="zstd"))
+
+
+def test_repeated_id_is_written_once(tmp_path, recwarn):
+    out = tmp_path / "result.zip"
+    repeat = dict(CONVERSATIONS[0], title="Standup", extra=True)
+    names = list(iter_emit_zip([CONVERSATIONS[0], CONVERSATIONS[2], repeat], out))
+    assert len(names) == 2
+    with zipfile.ZipFile(out) as zf:
+        assert zf.namelist() == names
+        assert json.loads(zf.read(names[0])) == CONVERSATIONS[0]
+    assert not [w for w in recwarn if "Duplicate name" in str(w.message)]
+
+
+@pytest.mark.parametrize("compression, level, message", [
+    ("deflated", 99, "deflated compression level must be 0-9"),
+    ("bzip2", 0, "bzip2 compression level must be 1-9"),
+    ("lzma", 5, "does not take a compression level"),
+])
+def test_zip_level_is_validated_up_front(tmp_path, compression, level, message):
+    with pytest.raises(ValueError, match=message):
+        list(iter_emit_zip(CONVERSATIONS, tmp_path / "result.zip", compression=compression, level=level))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,107 @@
+import os
+import zipfile
+import pytest
+from rehash.export_cache import ExportCache, fingerprint
+
+
+def test_store_then_load_roundtrip(tmp_path):
+    cache = ExportCache(tmp_path / "c")
+    data = [{"id": "a"}, {"id": "b"}]
+
+    assert cache.load("k") is None
+    assert list(cache.store("k", iter(data))) == data
+    assert list(cache.load("k")) == data
+
+
+def test_interrupted_store_leaves_no_entry(tmp_path):
+    cache = ExportCache(tmp_path / "c")
+    stream = cache.store("k", iter([{"id": "a"}, {"id": "b"}]))
+    next(stream)
+    stream.close()
+
+    assert cache.load("k") is None
+    assert list((tmp_path / "c").iterdir()) == []
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ExportCache(tmp_path / "c", max_bytes=10 ** 9)
+    for key in ("old", "mid", "new"):
+        list(cache.store(key, [{"blob": "x" * 1000}]))
+    os.utime(cache.path_for("old"), (1, 1))
+    os.utime(cache.path_for("mid"), (2, 2))
+
+    cache.max_bytes = cache.path_for("new").stat().st_size * 2
+    cache.evict()
+
+    assert not cache.path_for("old").exists()
+    assert cache.path_for("mid").exists()
+    assert cache.path_for("new").exists()
+
+
+def test_fingerprint_tracks_member_crc(make_export):
+    zip_path = make_export("a.zip", [{"id": "a"}], zipfile.ZIP_DEFLATED)
+    with zipfile.ZipFile(zip_path) as zf:
+        info = zf.getinfo("conversations.json")
+    key = fingerprint(zip_path, info)
+
+    info.CRC ^= 1
+    assert fingerprint(zip_path, info) != key
+
+
+def test_extract_export_warm_run_skips_decode(monkeypatch, isolated_cache_dir, make_export):
+    from rehash import extract_export as mod
+
+    data = [{"id": "a", "title": "One"}, {"id": "b", "title": "Two"}]
+    zip_path = make_export("export.zip", data, zipfile.ZIP_DEFLATED)
+
+    assert mod.extract_export(zip_path, cache=True) == data
+    assert len(list(isolated_cache_dir.glob("*.pickle"))) == 1
+
+    def no_decode(_f):
+        raise AssertionError("warm run should not decode JSON")
+
+    monkeypatch.setattr(mod, "iter_array_items", no_decode)
+    assert mod.extract_export(zip_path, cache=True) == data
+    with pytest.raises(AssertionError):
+        mod.extract_export(zip_path, cache=False)
+
+
+def test_export_larger_than_the_cap_is_not_stored(monkeypatch, isolated_cache_dir, make_export):
+    from rehash.extract_export import extract_export
+
+    data = [{"id": "a", "blob": "x" * 2000}]
+    zip_path = make_export("export.zip", data, zipfile.ZIP_DEFLATED)
+    monkeypatch.setenv("REHASH_CACHE_MAX_SIZE", "1K")
+    assert extract_export(zip_path, cache=True) == data
+    assert not isolated_cache_dir.exists() or not list(isolated_cache_dir.iterdir())
+
+    monkeypatch.setenv("REHASH_CACHE_MAX_SIZE", "1M")
+    extract_export(zip_path, cache=True)
+    assert len(list(isolated_cache_dir.glob("*.pickle"))) == 1
+
+
+def test_max_size_env_is_validated(monkeypatch):
+    from rehash.export_cache import default_max_bytes
+
+    monkeypatch.setenv("REHASH_CACHE_MAX_SIZE", "8G")
+    assert default_max_bytes() == 8 << 30
+    monkeypatch.setenv("REHASH_CACHE_MAX_SIZE", "lots")
+    with pytest.raises(ValueError, match="REHASH_CACHE_MAX_SIZE"):
+        ExportCache()
+
+
+@pytest.mark.parametrize("damage", ["truncate", "garble"])
+def test_corrupt_entry_is_dropped_and_reparsed(isolated_cache_dir, damage, make_export):
+    from rehash.extract_export import extract_export
+
+    data = [{"id": str(i), "blob": "x" * 100} for i in range(20)]
+    zip_path = make_export("export.zip", data, zipfile.ZIP_DEFLATED)
+    extract_export(zip_path, cache=True)
+    (entry,) = isolated_cache_dir.glob("*.pickle")
+    raw = entry.read_bytes()
+    half = len(raw) // 2
+    entry.write_bytes(raw[:half] if damage == "truncate" else raw[:half] + b"\x00garbage" + raw[half:])
+
+    assert extract_export(zip_path, cache=True) == data
+    assert extract_export(zip_path, cache=True) == data  # the entry was rebuilt
+    assert entry.read_bytes() == raw
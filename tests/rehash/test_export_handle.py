@@ -0,0 +1,89 @@
+import json
+import zipfile
+import pytest
+import rehash.extract_export as mod
+from rehash.export_handle import ExportHandle
+from rehash.extract_export import extract_export
+
+CONVERSATIONS = [
+    {"id": f"c{i}", "title": f"Title {i}", "update_time": i, "mapping": {"n": {"x": "y" * i}}}
+    for i in range(20)
+]
+
+
+PADDING = {"readme.txt": "padding before the member"}
+
+
+def test_stored_member_is_mapped(make_export):
+    path = make_export("export.zip", CONVERSATIONS, compression=zipfile.ZIP_STORED, extra=PADDING)
+    with ExportHandle(path) as handle:
+        with handle.map_conversations() as view:
+            assert view is not None
+            assert bytes(view) == json.dumps(CONVERSATIONS).encode("utf-8")
+
+
+def test_deflated_member_is_not_mapped(make_export):
+    path = make_export("export.zip", CONVERSATIONS, compression=zipfile.ZIP_DEFLATED, extra=PADDING)
+    with ExportHandle(path) as handle:
+        assert handle.mapped_location() is None
+        with handle.map_conversations() as view:
+            assert view is None
+
+
+def test_folder_export(tmp_path):
+    (tmp_path / "conversations.json").write_text(json.dumps(CONVERSATIONS), encoding="utf-8")
+    assert extract_export(tmp_path) == CONVERSATIONS
+    assert [c["id"] for c in extract_export(tmp_path, shallow=True)] == [c["id"] for c in CONVERSATIONS]
+
+
+def test_folder_without_conversations(tmp_path):
+    with pytest.raises(FileNotFoundError, match="export folder"):
+        ExportHandle(tmp_path)
+
+
+@pytest.mark.parametrize("shallow", [False, True])
+def test_parallel_workers_map_stored_member(monkeypatch, shallow, make_export):
+    monkeypatch.setattr(mod, "MIN_BATCH_BYTES", 64)
+    path = make_export("export.zip", CONVERSATIONS, compression=zipfile.ZIP_STORED, extra=PADDING)
+    result = extract_export(path, jobs=2, shallow=shallow)
+    assert [c["id"] for c in result] == [c["id"] for c in CONVERSATIONS]
+    if not shallow:
+        assert result == CONVERSATIONS
+
+
+def test_member_index_finds_nested_export(tmp_path):
+    path = tmp_path / "nested.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("docs/", "")
+        zf.writestr("docs/export/conversations.json", json.dumps(CONVERSATIONS))
+        zf.writestr("docs/export/user.json", json.dumps({"id": "user-1"}))
+        zf.writestr("docs/export/chat.html", "<html></html>")
+        zf.writestr("docs/export/file-abc.png", b"\x89PNG")
+        zf.writestr("docs/export/message_feedback.json", "[]")
+        zf.writestr("other/conversations/conversations.json", "[]")
+
+    with ExportHandle(path) as handle:
+        members = handle.members
+        assert members.root == "docs/export"
+        assert members.conversations == "docs/export/conversations.json"
+        assert members.user == "docs/export/user.json"
+        assert members.html == ["docs/export/chat.html"]
+        assert members.assets == ["docs/export/file-abc.png"]
+        with handle.open_member(members.user) as f:
+            assert json.load(f) == {"id": "user-1"}
+        with pytest.raises(FileNotFoundError):
+            handle.open_member("docs/export/missing.png")
+    assert extract_export(path) == CONVERSATIONS
+
+
+def test_member_index_for_nested_folder(tmp_path):
+    export = tmp_path / "export"
+    export.mkdir()
+    (export / "conversations.json").write_text(json.dumps(CONVERSATIONS), encoding="utf-8")
+    (export / "file-1.txt").write_text("asset", encoding="utf-8")
+
+    with ExportHandle(tmp_path) as handle:
+        assert handle.members.conversations == "export/conversations.json"
+        assert handle.members.user is None
+        assert handle.members.assets == ["export/file-1.txt"]
+    assert extract_export(tmp_path) == CONVERSATIONS
@@ -0,0 +1,83 @@
+import json
+import zipfile
+import pytest
+from rehash.export_index import (
+    AmbiguousIdError,
+    build_index,
+    default_index_path,
+    open_index,
+    read_conversation,
+)
+
+CONVERSATIONS = [
+    {"id": "abc-111", "title": "First", "create_time": 1, "update_time": 2, "mapping": {}},
+    {"id": "abc-222", "title": "Second", "create_time": 3, "update_time": 4, "mapping": {}},
+    {"id": "def-333", "title": "Third", "create_time": 5, "update_time": 6, "mapping": {"x": {}}},
+]
+
+
+@pytest.fixture(params=[zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def export_zip(tmp_path, request):
+    path = tmp_path / "export.zip"
+    with zipfile.ZipFile(path, "w", request.param) as zf:
+        zf.writestr("conversations.json", json.dumps(CONVERSATIONS, indent=2))
+    return path
+
+
+def test_build_and_read_each_conversation(export_zip):
+    out = build_index(export_zip)
+    assert out == default_index_path(export_zip)
+
+    index = open_index(export_zip)
+    assert len(index) == 3
+    for convo in CONVERSATIONS:
+        entry = index.lookup(convo["id"])
+        assert entry.title == convo["title"]
+        assert read_conversation(export_zip, index, entry) == convo
+
+
+def test_lookup_unique_prefix(export_zip):
+    build_index(export_zip)
+    index = open_index(export_zip)
+    assert index.lookup("def").id == "def-333"
+
+
+def test_lookup_ambiguous_prefix_lists_matches(export_zip):
+    build_index(export_zip)
+    index = open_index(export_zip)
+    with pytest.raises(AmbiguousIdError, match="abc-111  First") as exc:
+        index.lookup("abc")
+    assert [m.id for m in exc.value.matches] == ["abc-111", "abc-222"]
+
+
+def test_lookup_no_match(export_zip):
+    build_index(export_zip)
+    with pytest.raises(ValueError, match="No conversation matches"):
+        open_index(export_zip).lookup("zzz")
+
+
+def test_stale_index_is_rejected(export_zip):
+    build_index(export_zip)
+    with zipfile.ZipFile(export_zip, "w") as zf:
+        zf.writestr("conversations.json", json.dumps(CONVERSATIONS[:1]))
+    with pytest.raises(ValueError, match="stale"):
+        open_index(export_zip)
+
+
+def test_missing_index(export_zip):
+    with pytest.raises(FileNotFoundError, match="rehash index build"):
+        open_index(export_zip)
+
+
+def test_folder_export_index(tmp_path):
+    (tmp_path / "conversations.json").write_text(json.dumps(CONVERSATIONS), encoding="utf-8")
+    out = build_index(tmp_path)
+    assert out.parent == tmp_path
+
+    index = open_index(tmp_path)
+    entry = index.lookup("def")
+    assert read_conversation(tmp_path, index, entry) == CONVERSATIONS[2]
+
+    (tmp_path / "conversations.json").write_text(json.dumps(CONVERSATIONS[:1]), encoding="utf-8")
+    with pytest.raises(ValueError, match="stale"):
+        open_index(tmp_path)
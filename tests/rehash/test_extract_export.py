@@ -3,6 +3,7 @@ import json
 from zipfile import ZipFile, BadZipFile
 from pathlib import Path
 from rehash.extract_export import extract_conversations_json, extract_export
+from rehash.fitness_rules import DEFAULT_RULES
 
 FIXTURE_DIR = Path("tests/rehash/fixtures")
 
@@ -64,3 +65,103 @@ def test_extract_export_not_list_json(tmp_path):
 
     with pytest.raises(TypeError, match="Expected top-level list"):
         extract_export(zip_path)
+
+def test_iter_conversations_streams(tmp_path):
+    from rehash.extract_export import iter_conversations
+    import zipfile
+    import json
+
+    zip_path = tmp_path / "stream.zip"
+    data = [{"title": f"Chat {i}", "create_time": 1234567890 + i} for i in range(3)]
+
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    stream = iter_conversations(zip_path)
+    assert next(stream) == data[0]
+    assert list(stream) == data[1:]
+
+def test_extract_export_parallel_jobs_keeps_order(tmp_path, monkeypatch):
+    from rehash import extract_export as mod
+    import zipfile
+    import json
+
+    # Force many tiny batches so several worker tasks are involved.
+    monkeypatch.setattr(mod, "MIN_BATCH_BYTES", 64)
+
+    zip_path = tmp_path / "parallel.zip"
+    data = [{"title": f"Chat {i}", "mapping": {"n": {"message": None}}} for i in range(50)]
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    assert mod.extract_export(zip_path, jobs=3) == data
+
+def test_shallow_extraction_skips_mapping(tmp_path, monkeypatch):
+    from rehash import extract_export as mod
+    import zipfile
+    import json
+
+    zip_path = tmp_path / "shallow.zip"
+    data = [
+        {
+            "title": "Leg day",
+            "create_time": 1.0,
+            "update_time": 2.0,
+            "mapping": {"n": {"message": {"content": {"parts": ["{ [ \"tricky\" ] }"]}}}},
+            "id": "conv-1",
+            "default_model_slug": "gpt-4",
+        },
+        {"title": "No id", "mapping": {}},
+    ]
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    expected = [
+        {"id": "conv-1", "title": "Leg day", "create_time": 1.0, "update_time": 2.0, "model_slug": "gpt-4"},
+        {"id": None, "title": "No id", "create_time": None, "update_time": None, "model_slug": None},
+    ]
+    assert mod.extract_export(zip_path, shallow=True) == expected
+    monkeypatch.setattr(mod, "MIN_BATCH_BYTES", 16)
+    assert mod.extract_export(zip_path, shallow=True, jobs=2) == expected
+
+
+def test_nested_conversations_member():
+    """The legacy fixture keeps its export under docs/testdata/."""
+    conversations = extract_export(Path("legacy/test_misc/test_misc/testdata.zip"))
+    assert isinstance(conversations, list)
+    assert len(conversations) > 0
+
+
+@pytest.mark.parametrize("compression", ["stored", "deflated"])
+def test_filter_pushdown(tmp_path, monkeypatch, compression):
+    from rehash import extract_export as mod
+    from rehash.filter_fitness_logs import filter_fitness_conversations
+    import zipfile
+
+    monkeypatch.setenv("REHASH_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(mod, "MIN_BATCH_BYTES", 64)
+    data = [
+        {"title": "Workout" if i % 5 == 0 else f"Chat {i}", "mapping": {
+            "n": {"message": {"author": {"role": "assistant"}, "content": {"parts": ["training update" if i % 7 == 0 else "hi"]}}},
+        }}
+        for i in range(40)
+    ]
+    zip_path = tmp_path / "export.zip"
+    method = zipfile.ZIP_STORED if compression == "stored" else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(zip_path, "w", method) as zf:
+        zf.writestr("conversations.json", json.dumps(data))
+
+    expected = filter_fitness_conversations(data)
+    for jobs in (1, 2):
+        stats = mod.ExtractStats()
+        assert list(mod.iter_conversations(zip_path, jobs=jobs, rules=DEFAULT_RULES, stats=stats)) == expected
+        assert (stats.total, stats.kept) == (40, len(expected))
+
+    # A filtered run never fills the cache, but is served from a full one.
+    assert mod.extract_export(zip_path, cache=True, rules=DEFAULT_RULES) == expected
+    assert not list((tmp_path / "cache").glob("*"))
+    assert mod.extract_export(zip_path, cache=True) == data
+    assert mod.extract_export(zip_path, cache=True, rules=DEFAULT_RULES) == expected
+
+    with pytest.raises(ValueError, match="shallow"):
+        mod.extract_export(zip_path, shallow=True, rules=DEFAULT_RULES)
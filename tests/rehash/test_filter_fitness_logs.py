@@ -1,4 +1,5 @@
 import pytest
+from rehash.fitness_rules import DEFAULT_RULES
 from rehash.filter_fitness_logs import (
     is_fitness_title,
     is_fitness_conversation,
@@ -46,3 +47,80 @@ def test_filter_fitness_conversations_mixed():
     filtered = filter_fitness_conversations(convos)
     assert len(filtered) == 1
     assert "training" in filtered[0]["mapping"]["abc"]["message"]["content"]["parts"][0]
+
+def test_parallel_filter_keeps_input_order():
+    from rehash.filter_fitness_logs import iter_fitness_conversations
+    from rehash.fitness_rules import compile_rules
+
+    rules = compile_rules((), (), ("squat",))
+    convos = [{"id": i, "title": "Squat" if i % 3 == 0 else "Chat", "mapping": {}} for i in range(50)]
+    expected = [c["id"] for c in convos if c["id"] % 3 == 0]
+
+    kept = iter_fitness_conversations(iter(convos), rules, jobs=2, chunk_size=4)
+    assert [c["id"] for c in kept] == expected
+    assert filter_fitness_conversations(convos, jobs=2) == filter_fitness_conversations(convos)
+
+def test_scan_matches_is_fitness_conversation():
+    import json
+    from rehash.filter_fitness_logs import scan_fitness_conversation
+
+    def node(role, parts):
+        return {"message": {"content": {"content_type": "text", "parts": parts}, "author": {"role": role}}}
+
+    convos = [
+        {"title": "Workout plan", "mapping": {}},
+        {"mapping": {"a": node("assistant", ["a workout log"])}, "title": "Chat"},  # title after mapping
+        {"title": "Chat", "mapping": {"a": node("user", ["workout log"])}},
+        {"title": "Chat", "mapping": {"a": node("assistant", ["hi", "workout log"])}},  # only parts[0]
+        {"title": "Chat", "mapping": {"a": node("assistant", [{"text": "training update"}])}},
+        {"title": "Chat", "mapping": {"a": {"message": None}, "b": node("assistant", [])}},
+        {"title": None, "mapping": {"a": "junk", "b": node("assistant", ['reconstruct "the" log'])}},
+        {"title": "Chat"},
+        [1, 2],
+    ]
+    raw = json.dumps(convos).encode()
+    decoder = json.JSONDecoder()
+    pos = 1
+    for convo in convos:
+        pos = raw.index(b"[" if isinstance(convo, list) else b"{", pos)
+        found, end = scan_fitness_conversation(raw, pos)
+        assert decoder.raw_decode(raw.decode(), pos)[1] == end
+        expected = isinstance(convo, dict) and is_fitness_conversation(convo)
+        assert found == (convo if expected else None)
+        pos = end
+
+def test_full_text_scan_roles_parts_and_budget():
+    from rehash.fitness_rules import MessageScan, compile_rules
+
+    class Exploding(dict):
+        def __str__(self):
+            raise AssertionError("non-text parts must not be stringified")
+
+    convo = {"title": "Chat", "mapping": {
+        "1": {"message": {"author": {"role": "user"}, "content": {"parts": ["x" * 50, "my workout log"]}}},
+        "2": {"message": {"author": {"role": "assistant"}, "content": {"parts": [Exploding(), "hello"]}}},
+        "3": {"message": {"author": {"role": "tool"}, "content": {"parts": [{"text": "training update"}]}}},
+    }}
+
+    def rules(**scan):
+        return compile_rules(tuple(DEFAULT_RULES.title_patterns), tuple(DEFAULT_RULES.message_patterns), scan=MessageScan(**scan))
+
+    assert not is_fitness_conversation(convo, rules())
+    assert is_fitness_conversation(convo, rules(roles=("user",)))
+    assert is_fitness_conversation(convo, rules(roles=("tool",)))  # text of dict parts
+    assert is_fitness_conversation(convo, rules(roles=()))
+    assert is_fitness_conversation(convo, rules(roles=(), max_chars=64))
+    assert not is_fitness_conversation(convo, rules(roles=("user",), max_chars=60))
+
+
+def test_search_timeout_is_logged_and_skipped(monkeypatch, caplog):
+    from rehash import fitness_rules
+
+    monkeypatch.setattr(fitness_rules, "SEARCH_WINDOW", 8)
+    monkeypatch.setattr(fitness_rules, "MATCH_TIME_BUDGET", -1)
+    convo = {"id": "conv-slow", "title": "Chat", "mapping": {
+        "1": {"message": {"author": {"role": "assistant"}, "content": {"parts": ["hello " * 10 + "workout log"]}}},
+    }}
+    with caplog.at_level("WARNING", logger="rehash.filter_fitness_logs"):
+        assert filter_fitness_conversations([convo, {"title": "Workout"}]) == [{"title": "Workout"}]
+    assert "conv-slow" in caplog.text
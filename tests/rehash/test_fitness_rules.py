@@ -0,0 +1,218 @@
+import pickle
+import re
+import pytest
+from rehash import fitness_rules
+from rehash.fitness_rules import (
+    AUTO_AHO_CORASICK_KEYWORDS,
+    DEFAULT_RULES,
+    MatchTimeout,
+    RuleSet,
+    compile_rules,
+    load_rules,
+    search_bounded,
+)
+from rehash.filter_fitness_logs import is_fitness_conversation
+
+
+def _assistant(text):
+    return {"title": "Chat", "mapping": {"1": {"message": {
+        "author": {"role": "assistant"}, "content": {"parts": [text]},
+    }}}}
+
+
+def test_default_rules_match_like_the_pattern_lists():
+    assert DEFAULT_RULES.matches_title("PHD Progress")
+    assert not DEFAULT_RULES.matches_title("Philosophy")  # \b still applies
+    assert DEFAULT_RULES.matches_message("WORKOUT LOG for today")
+    assert DEFAULT_RULES.matches_message("Pull-ups and fitness")
+    assert not DEFAULT_RULES.matches_message("hello world")
+
+
+def test_leading_flags_are_scoped():
+    rules = RuleSet([], [r"(?i)alpha", r"(?s)be.ta", "gamma"])
+    assert rules.matches_message("ALPHA")
+    assert rules.matches_message("be\nta")
+    assert not rules.matches_message("gam\nma")
+    with pytest.raises(ValueError, match="Unsupported global flags"):
+        RuleSet([r"(?a)\w"], [])
+
+
+def test_compiled_rules_are_cached_and_picklable():
+    rules = compile_rules(("a",), ("b",))
+    assert compile_rules(("a",), ("b",)) is rules
+    assert pickle.loads(pickle.dumps(rules)) is rules
+
+
+def test_keyword_sources_in_precedence_order(tmp_path):
+    config = tmp_path / "config.yaml"
+    config.write_text("fitness:\n  keywords: [squat]\n", encoding="utf-8")
+
+    from_config = load_rules(environ={}, config_path=config)
+    assert from_config.matches_title("Squat day")
+
+    from_env = load_rules(environ={"REHASH_FITNESS_KEYWORDS": "deadlift"}, config_path=config)
+    assert from_env.matches_title("Deadlift PR") and not from_env.matches_title("Squat day")
+
+    from_cli = load_rules("bench, ohp", environ={"REHASH_FITNESS_KEYWORDS": "deadlift"}, config_path=config)
+    assert from_cli.matches_title("OHP") and not from_cli.matches_title("Deadlift PR")
+    assert is_fitness_conversation(_assistant("new bench max"), from_cli)
+    assert not is_fitness_conversation(_assistant("new bench max"))
+
+
+def test_config_can_replace_default_patterns(tmp_path):
+    config = tmp_path / "config.yaml"
+    config.write_text("fitness:\n  title_patterns: ['^run ']\n  message_patterns: []\n", encoding="utf-8")
+    rules = load_rules(environ={}, config_path=config)
+    assert rules.matches_title("Run club")
+    assert not rules.matches_title("Workout")
+    assert rules.message_patterns == tuple(DEFAULT_RULES.message_patterns)  # empty list keeps defaults
+
+
+def test_bad_config(tmp_path):
+    config = tmp_path / "config.yaml"
+    config.write_text("fitness:\n  keywords: 3\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="must be a list of strings"):
+        load_rules(environ={}, config_path=config)
+    assert load_rules(environ={}, config_path=tmp_path / "missing.yaml") is DEFAULT_RULES
+
+
+@pytest.mark.parametrize("engine", ["regex", "aho-corasick"])
+def test_engines_match_keywords_alike(engine):
+    rules = compile_rules((), ("workout log",), ("romanian deadlift", "c-1234"), engine)
+    assert rules.matches_title("Romanian Deadlift form")
+    assert rules.matches_message("client C-1234 checked in")
+    assert rules.matches_message("WORKOUT LOG")
+    assert not rules.matches_message("romanian deadlifts")
+    assert pickle.loads(pickle.dumps(rules)) is rules
+
+
+def test_auto_engine_switches_on_vocabulary_size(tmp_path):
+    small = compile_rules((), (), ("squat",))
+    large = compile_rules((), (), tuple(f"move{i}" for i in range(AUTO_AHO_CORASICK_KEYWORDS)))
+    assert small._keywords is None and small.matches_title("Squat")
+    assert large._keywords is not None and large.matches_title("move7 day")
+
+    config = tmp_path / "config.yaml"
+    config.write_text("fitness:\n  engine: aho-corasick\n", encoding="utf-8")
+    assert load_rules("squat", environ={}, config_path=config).engine == "aho-corasick"
+    assert load_rules("squat", environ={}, config_path=config, engine="regex").engine == "regex"
+    config.write_text("fitness:\n  engine: grep\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="fitness.engine"):
+        load_rules(environ={}, config_path=config)
+
+
+def test_required_literal():
+    from rehash.fitness_rules import required_literal
+
+    assert required_literal(r"(?i)workout log") == "workout log"
+    assert required_literal(r"pull.*fitness") == "fitness"
+    assert required_literal(r"(?:ab)?cde|x") is None  # alternation: nothing is required
+    assert required_literal(r"(?:set)+s \d+") == "set"
+    assert required_literal(r"a/b") == "a"  # JSON may write '/' as '\/'
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_prefilter_never_rejects_a_decoded_match(ensure_ascii):
+    import json
+
+    rules = compile_rules((), ("pull.*fitness",), ("kettlebell", "café"), "regex")
+    assert rules.message_prefilter is not None
+    texts = ["Pull for FITNESS", "Kettlebell swings", "cafÉ", "pull fitness", "plain chat"]
+    for text in texts:
+        raw = json.dumps({"text": text}, ensure_ascii=ensure_ascii).encode()
+        if rules.matches_message(text):
+            assert rules.message_prefilter.might_match(raw, 0, len(raw)), text
+    assert rules.matches_message("\u212aettlebell swings")  # the Kelvin sign folds to k
+    raw = json.dumps({"text": "plain chat"}).encode()
+    assert not rules.message_prefilter.might_match(raw, 0, len(raw))
+    assert compile_rules((), (r"\d+",)).message_prefilter is None
+
+
+def test_message_scan_options(tmp_path):
+    from rehash.fitness_rules import MessageScan
+
+    config = tmp_path / "config.yaml"
+    config.write_text("fitness:\n  roles: [assistant, user]\n", encoding="utf-8")
+    assert load_rules(environ={}, config_path=tmp_path / "missing.yaml").scan is None
+    assert load_rules(environ={}, config_path=config).scan == MessageScan(("assistant", "user"))
+    assert load_rules(environ={}, config_path=config, roles="*", max_chars=10).scan == MessageScan((), 10)
+    assert load_rules(environ={}, config_path=tmp_path / "missing.yaml", full_text=True).scan == MessageScan()
+
+    config.write_text("fitness:\n  max_chars: -1\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="max_chars"):
+        load_rules(environ={}, config_path=config)
+
+
+def test_nested_variable_quantifiers_are_rejected():
+    for pattern in (r"(\w+\s?)+", r"(a*)*", r"(?:x|y+){2,}"):
+        with pytest.raises(ValueError, match="nests variable-length quantifiers"):
+            RuleSet([], [pattern])
+    RuleSet([], [r"(ab){2,}", r"(?:a{3})+", r"(a+)?"])  # fixed-width or optional bodies are fine
+
+
+def test_overlapping_alternatives_in_a_repeat_are_rejected():
+    for pattern in (r"(a|aa)+b", r"(?:a|ab){1,5}", r"(?:x|)+", r"(a?a)+b"):
+        with pytest.raises(ValueError, match="catastrophic backtracking"):
+            RuleSet([], [pattern])
+    RuleSet([], [r"(?:kg|lbs)+", r"(a|b)+", r"(?:sets|reps)?"])  # distinct starts, or not repeated
+
+
+def test_chained_wildcards_over_overlapping_characters_are_rejected():
+    for pattern in (r"a.*a.*a.*b", r"a.*a.*b", r"\d+\s*\d+", r"(?=.*a.*b)x"):
+        with pytest.raises(ValueError, match="chains wildcards"):
+            RuleSet([], [pattern])
+    # One wildcard, short ones, or ones a distinct literal keeps apart are fine.
+    RuleSet([], [r"pull.*fitness", r"\d+\s*x\s*\d+", r"\w+ \w+", r"a.{0,30}a.{0,30}b"])
+
+
+def test_overlap_checks_cover_every_script():
+    for pattern in ("[一-龥]+[一-龥]+[一-龥]+x", "[а-я]+[а-я]+[а-я]+x", "[А-Я]+[а-я]+x", r"\w+[一-龥]+x", r"[^\x00-ɏ]+[^\x00-ɏ]+x"):
+        with pytest.raises(ValueError, match="chains wildcards"):
+            RuleSet([], [pattern])
+    RuleSet([], [r"[一-龥]+ [一-龥]+", r"[а-я]+\d+"])
+
+
+def test_keywords_skip_the_pattern_analysis(monkeypatch):
+    def boom(pattern):
+        raise AssertionError(f"analysed keyword pattern {pattern!r}")
+
+    monkeypatch.setattr(fitness_rules, "_bounded", boom)
+    rules = RuleSet([], [], [f"lift{i}" for i in range(500)], engine="regex")
+    assert rules.matches_message("Today: LIFT499.")
+    assert not rules.matches_message("lift4999")
+
+
+def test_unbounded_quantifiers_are_capped():
+    rules = RuleSet([], [r"pull.*fitness", r"a{2,}b", r"[*+]+x"])
+    pattern, reach = rules._message
+    assert "pull.{0,1000}fitness" in pattern.pattern
+    assert "a{2,1000}b" in pattern.pattern
+    assert "[*+]{1,1000}x" in pattern.pattern
+    assert reach == 1012
+    assert rules.matches_message("pull " + "-" * 990 + " fitness")
+    assert not rules.matches_message("pull " + "-" * 1001 + " fitness")
+
+
+def test_windowed_search_agrees_with_a_plain_search(monkeypatch):
+    monkeypatch.setattr(fitness_rules, "SEARCH_WINDOW", 16)
+    pattern = re.compile(r"\bsquat\b|dead.{0,20}lift(?=!)", re.IGNORECASE)
+    reach = 5 + 24 + 1 + 1
+    texts = [
+        "x" * 14 + " squat " + "y" * 30,  # straddles the first window edge
+        "x" * 15 + "squats" + "y" * 30,  # \b fails just past the edge
+        "y" * 20 + "dead" + "-" * 19 + "lift!",
+        "y" * 20 + "dead" + "-" * 19 + "lift?",
+        "z" * 100,
+    ]
+    for text in texts:
+        assert search_bounded(pattern, reach, text) == (pattern.search(text) is not None), text
+
+
+def test_windowed_search_times_out(monkeypatch):
+    monkeypatch.setattr(fitness_rules, "SEARCH_WINDOW", 8)
+    monkeypatch.setattr(fitness_rules, "MATCH_TIME_BUDGET", -1)
+    with pytest.raises(MatchTimeout, match="exceeded"):
+        search_bounded(re.compile("needle"), 7, "hay" * 10)
+    monkeypatch.setattr(fitness_rules, "SEARCH_WINDOW", 1 << 13)
+    with pytest.raises(MatchTimeout, match="at character 3 of 3"):
+        search_bounded(re.compile("needle"), 7, "hay")  # a single window is timed too
@@ -0,0 +1,125 @@
+import io
+import json
+import pytest
+from rehash.json_stream import iter_array_elements, iter_array_items, iter_array_spans
+
+
+def test_iter_array_items_small_chunks():
+    data = [
+        {"title": "a [tricky] {title}", "mapping": {"1": {"message": None}}},
+        {"title": 'escaped " quote \\', "parts": [1, [2, 3]]},
+        "scalar",
+        42,
+        None,
+    ]
+    raw = json.dumps(data, indent=2).encode("utf-8")
+    for chunk_size in (1, 3, 7, 1024):
+        assert list(iter_array_items(io.BytesIO(raw), chunk_size)) == data
+
+
+def test_iter_array_elements_offsets():
+    raw = b'  [ {"a": 1} , {"b": "\\u00e9 \xc3\xa9"} ]'
+    elements = list(iter_array_elements(io.BytesIO(raw), chunk_size=4))
+    for offset, chunk in elements:
+        assert raw[offset:offset + len(chunk)] == chunk
+    assert [json.loads(c) for _, c in elements] == [{"a": 1}, {"b": "é é"}]
+
+
+def test_iter_array_spans_matches_stream():
+    raw = json.dumps([{"x": i} for i in range(5)]).encode()
+    spans = list(iter_array_spans(raw))
+    assert [json.loads(raw[s:e]) for s, e in spans] == [{"x": i} for i in range(5)]
+
+
+def test_empty_array():
+    assert list(iter_array_items(io.BytesIO(b"[]"))) == []
+
+
+def test_not_a_list():
+    with pytest.raises(TypeError, match="Expected top-level list"):
+        list(iter_array_items(io.BytesIO(b'{"not": "a list"}')))
+
+
+def test_truncated_array():
+    with pytest.raises(ValueError, match="Truncated"):
+        list(iter_array_items(io.BytesIO(b'[{"a": 1}, {"b":')))
+
+
+def test_malformed_element_fails_without_reading_the_rest():
+    good = json.dumps({"id": "x", "text": "y" * 1000}).encode()
+    raw = b"[" + good + b", {bad json}, " + b", ".join([good] * 5000) + b"]"
+
+    class Counting(io.BytesIO):
+        read_bytes = 0
+
+        def read(self, size=-1):
+            chunk = super().read(size)
+            Counting.read_bytes += len(chunk)
+            return chunk
+
+    stream = Counting(raw)
+    items = iter_array_items(stream, chunk_size=4096)
+    assert next(items)["id"] == "x"
+    with pytest.raises(ValueError, match="malformed"):
+        next(items)
+    assert Counting.read_bytes < 64 * 1024 < len(raw)
+
+
+def test_element_split_across_chunks_still_decodes():
+    data = [{"s": "a\\\"b" * 300, "n": [1.5, True, None]}, "tail", 12345]
+    raw = json.dumps(data).encode()
+    for chunk_size in (1, 7, 64):
+        assert list(iter_array_items(io.BytesIO(raw), chunk_size)) == data
+
+
+def test_scan_object_fields_skips_other_members():
+    from rehash.json_stream import iter_object_members, scan_object_fields
+
+    raw = json.dumps({
+        "title": 'x "q"',
+        "mapping": {"a": [1, {"b": "}"}]},
+        "create_time": 1.5,
+        "esc\\u00e9": True,
+        "id": "z",
+    }).encode()
+
+    assert scan_object_fields(raw, ["id", "title", "create_time"]) == {
+        "title": 'x "q"', "create_time": 1.5, "id": "z",
+    }
+    keys = [key for key, _, _ in iter_object_members(raw)]
+    assert keys == ["title", "mapping", "create_time", "esc\\u00e9", "id"]
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_iter_array_scan_shallow_fields(monkeypatch, fast):
+    from rehash import json_stream
+    from rehash.json_stream import iter_array_scan, scan_object
+
+    if not fast:
+        monkeypatch.setattr(json_stream, "_FAST_CONTAINER", None)
+
+    data = [
+        {"title": "one", "mapping": {"a": {"b": ["]", "}", '"', "\\"]}}, "id": "1"},
+        {"mapping": {}, "id": "2"},
+        7,
+    ]
+    raw = json.dumps(data).encode()
+
+    def parse(buf, pos):
+        return scan_object(buf, ("id", "title"), pos)
+
+    for chunk_size in (1, 5, 4096):
+        scanned = list(iter_array_scan(io.BytesIO(raw), parse, chunk_size))
+        assert [v for _, _, v in scanned] == [{"title": "one", "id": "1"}, {"id": "2"}, {}]
+        for (offset, length, _), expected in zip(scanned, data):
+            assert json.loads(raw[offset:offset + length]) == expected
+
+
+def test_trailing_comma_is_rejected_by_every_reader():
+    raw = b'[{"a": 1}, ]'
+    with pytest.raises(ValueError):
+        list(iter_array_items(io.BytesIO(raw)))
+    with pytest.raises(ValueError, match="Trailing ','"):
+        list(iter_array_spans(raw))
+    with pytest.raises(ValueError, match="Trailing ','"):
+        list(iter_array_elements(io.BytesIO(raw), chunk_size=4))
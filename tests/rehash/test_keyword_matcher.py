@@ -0,0 +1,55 @@
+import random
+import re
+import string
+
+import pytest
+from rehash.keyword_matcher import KeywordMatcher
+
+
+def _regex_spans(keywords, text):
+    spans = set()
+    for k in keywords:
+        for m in re.finditer(rf"(?=(\b{re.escape(k)}\b))", text, re.IGNORECASE):
+            spans.add(m.span(1))
+    return spans
+
+
+def test_whole_word_case_insensitive():
+    matcher = KeywordMatcher(["Deadlift", "bench press", "#legday"], accelerated=False)
+    assert matcher.matches("new DEADLIFT pr")
+    assert matcher.matches("Bench Press: 5x5")
+    assert not matcher.matches("deadlifts")  # no \b after the keyword
+    assert not matcher.matches("bench pressing")
+    assert matcher.matches("today#legday")  # like \b#: a word character must precede
+    assert not matcher.matches("today #legday")
+
+
+def test_overlapping_keywords_use_failure_links():
+    matcher = KeywordMatcher(["she", "he", "hers", "his"], accelerated=False)
+    assert list(matcher.iter_matches("ushers he his")) == [(7, 9), (10, 13)]
+    assert not matcher.matches("ushers")
+
+
+def test_matches_agree_with_regex():
+    rng = random.Random(7)
+    alphabet = "ab _-"
+    keywords = ["".join(rng.choices("ab", k=rng.randint(1, 4))) for _ in range(30)]
+    matcher = KeywordMatcher(keywords, accelerated=False)
+    for _ in range(200):
+        text = "".join(rng.choices(alphabet, k=rng.randint(0, 30)))
+        assert set(matcher.iter_matches(text)) == _regex_spans(keywords, text)
+
+
+def test_empty_and_duplicate_keywords():
+    matcher = KeywordMatcher(["", "Squat", "squat"], accelerated=False)
+    assert matcher.keywords == ("squat",)
+    assert not KeywordMatcher([], accelerated=False).matches("squat")
+
+
+def test_accelerated_path_agrees():
+    pytest.importorskip("ahocorasick")
+    keywords = ["".join(random.choices(string.ascii_lowercase, k=5)) for _ in range(200)] + ["row"]
+    text = "easy row day, then " + " ".join(keywords[::7])
+    fast = KeywordMatcher(keywords, accelerated=True)
+    slow = KeywordMatcher(keywords, accelerated=False)
+    assert list(fast.iter_matches(text)) == list(slow.iter_matches(text))
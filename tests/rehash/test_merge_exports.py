@@ -0,0 +1,47 @@
+from rehash.merge_exports import iter_merged, plan_merge
+
+
+def test_newest_update_time_wins(make_export):
+    week1 = make_export("week1.zip", [
+        {"id": "a", "title": "A v1", "update_time": 10},
+        {"id": "b", "title": "B v2", "update_time": 30},
+    ])
+    week2 = make_export("week2.zip", [
+        {"id": "a", "title": "A v2", "update_time": 20},
+        {"id": "b", "title": "B v1", "update_time": 25},
+        {"id": "c", "title": "C", "update_time": "2024-06-01T00:00:00Z"},
+    ])
+
+    plan = plan_merge([week1, week2])
+    assert plan.total == 5
+    assert plan.winners["a"] == (20.0, 1, 0)
+    assert plan.winners["b"] == (30.0, 0, 1)
+
+    merged = list(iter_merged(plan))
+    assert [c["title"] for c in merged] == ["B v2", "A v2", "C"]
+
+
+def test_tie_goes_to_later_source_and_ids_emit_once(make_export):
+    old = make_export("old.zip", [{"id": "a", "title": "old", "update_time": 5}])
+    new = make_export("new.zip", [
+        {"id": "a", "title": "new", "update_time": 5},
+        {"id": "a", "title": "new again", "update_time": 5},
+    ])
+    assert [c["title"] for c in iter_merged(plan_merge([old, new]))] == ["new"]
+
+
+def test_conversations_without_id_pass_through(make_export):
+    first = make_export("1.zip", [{"title": "anon", "create_time": 1}])
+    second = make_export("2.zip", [{"title": "anon", "create_time": 1}])
+    assert len(list(iter_merged(plan_merge([first, second])))) == 2
+
+
+def test_newer_repeat_within_one_export_wins(make_export):
+    export = make_export("export.zip", [
+        {"id": "a", "update_time": 1, "v": "old"},
+        {"id": "b", "update_time": 1, "v": "b"},
+        {"id": "a", "update_time": 2, "v": "new"},
+    ])
+    plan = plan_merge([export])
+    assert plan.winners["a"] == (2.0, 0, 2)
+    assert [c["v"] for c in iter_merged(plan)] == ["b", "new"]
@@ -0,0 +1,51 @@
+import threading
+import pytest
+from rehash.pipeline import Counter, ordered_map, process_pool, staged
+
+
+def test_staged_preserves_order():
+    assert list(staged(range(500), maxsize=4)) == list(range(500))
+
+
+def test_staged_reraises_producer_error():
+    def broken():
+        yield 1
+        raise FileNotFoundError("gone")
+
+    stream = staged(broken())
+    assert next(stream) == 1
+    with pytest.raises(FileNotFoundError, match="gone"):
+        next(stream)
+
+
+def test_staged_early_close_stops_producer():
+    closed = threading.Event()
+
+    def endless():
+        try:
+            n = 0
+            while True:
+                yield n
+                n += 1
+        finally:
+            closed.set()
+
+    stream = staged(endless(), maxsize=2)
+    assert next(stream) == 0
+    stream.close()
+    assert closed.wait(timeout=2)
+
+
+def test_counter_counts_consumed_items():
+    counter = Counter(iter("abc"))
+    assert list(counter) == ["a", "b", "c"]
+    assert counter.count == 3
+
+
+def test_process_pool_in_a_staged_thread_never_forks():
+    def absolutes():
+        with process_pool(2) as pool:
+            assert pool._mp_context.get_start_method() != "fork"
+            yield from ordered_map(pool, abs, range(-5, 0), window=4)
+
+    assert list(staged(absolutes())) == [5, 4, 3, 2, 1]
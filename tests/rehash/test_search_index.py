@@ -0,0 +1,143 @@
+import pytest
+from rehash import search_index
+from rehash.search_index import SearchIndex, build_search_index, parse_query, snippet, tokenize
+
+
+def _convo(cid, title, update_time, *texts):
+    mapping = {
+        f"{cid}-n{i}": {"message": {"author": {"role": "user"}, "content": {"parts": [text]}}}
+        for i, text in enumerate(texts)
+    }
+    return {"id": cid, "title": title, "update_time": update_time, "mapping": mapping}
+
+
+@pytest.fixture
+def index_dir(tmp_path, make_export):
+    export = make_export("week1.zip", [
+        _convo("a", "Lifting", 10, "Deadlift 5x5 today", "then some squats"),
+        _convo("b", "Running", 20, "Easy run, no deadlift"),
+        _convo("c", "Cooking", 30, "Pull-ups after dinner", {"content_type": "image"}),
+    ])
+    directory = tmp_path / "search"
+    stats = build_search_index(export, directory)
+    assert (stats.added, stats.replaced, stats.unchanged, stats.messages) == (3, 0, 0, 4)
+    return directory
+
+
+def _ids(directory, query):
+    with SearchIndex(directory) as index:
+        return [hit.id for hit in index.search(query)]
+
+
+def test_tokenize_and_parse_query():
+    assert tokenize("Deadlift 5x5, PULL-ups!") == ["deadlift", "5x5", "pull", "ups"]
+    assert parse_query('deadlift OR squat "5x5 today" pull-ups') == [
+        [("deadlift",), ("squat",)], [("5x5", "today")], [("pull", "ups")],
+    ]
+    assert parse_query("OR a AND b") == [[("a",)], [("b",)]]
+    with pytest.raises(ValueError, match="Unbalanced quote"):
+        parse_query('"deadlift')
+    with pytest.raises(ValueError, match="no searchable terms"):
+        parse_query("?! OR")
+
+
+def test_boolean_and_phrase_queries(index_dir):
+    assert _ids(index_dir, "deadlift") == ["b", "a"]  # newest first
+    assert _ids(index_dir, "deadlift 5x5") == ["a"]
+    assert _ids(index_dir, "deadlift squats") == ["a"]  # AND spans messages
+    assert _ids(index_dir, "squats OR run") == ["b", "a"]
+    assert _ids(index_dir, '"5x5 today"') == ["a"]
+    assert _ids(index_dir, '"today 5x5"') == []
+    assert _ids(index_dir, "pull-ups") == ["c"]
+    assert _ids(index_dir, "missing") == []
+
+
+def test_hits_name_the_matching_messages(index_dir):
+    with SearchIndex(index_dir) as index:
+        assert len(index) == 3
+        (hit,) = index.search("deadlift OR squats 5x5")
+    assert (hit.title, hit.update_time) == ("Lifting", 10)
+    assert hit.messages == ("a-n0", "a-n1")
+
+
+def test_newer_export_updates_incrementally(index_dir, make_export):
+    newer = make_export("week2.zip", [
+        _convo("a", "Lifting", 10, "Deadlift 5x5 today", "then some squats"),  # unchanged
+        _convo("b", "Running", 25, "Tempo run"),  # edited
+        _convo("d", "Swimming", 40, "Deadlift? no, laps"),  # new
+    ])
+    stats = build_search_index(newer, index_dir)
+    assert (stats.added, stats.replaced, stats.unchanged) == (1, 1, 1)
+
+    assert _ids(index_dir, "deadlift") == ["d", "a"]  # b's old copy is superseded
+    assert _ids(index_dir, "tempo") == ["b"]
+    with SearchIndex(index_dir) as index:
+        assert len(index) == 4
+        assert len(index.segments) == 2
+
+    again = build_search_index(newer, index_dir)
+    assert (again.added, again.replaced, again.unchanged) == (0, 0, 3)
+    with SearchIndex(index_dir) as index:
+        assert len(index.segments) == 2  # nothing new, no empty segment
+
+
+def test_large_builds_are_split_into_segments(tmp_path, monkeypatch, make_export):
+    monkeypatch.setattr(search_index, "SEGMENT_DOCS", 2)
+    export = make_export("export.zip", [
+        _convo(f"c{i}", f"T{i}", i, f"word{i} shared", "shared again") for i in range(5)
+    ])
+    build_search_index(export, tmp_path / "search")
+    with SearchIndex(tmp_path / "search") as index:
+        assert len(index.segments) == 5
+        assert [hit.id for hit in index.search("shared")] == ["c4", "c3", "c2", "c1", "c0"]
+        assert [hit.id for hit in index.search("word3")] == ["c3"]
+
+
+def test_missing_index(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No search index"):
+        SearchIndex(tmp_path / "nowhere")
+
+
+def test_rank_orders_by_bm25_and_keeps_the_top_k(tmp_path, make_export):
+    filler = " ".join(f"filler{i}" for i in range(50))
+    export = make_export("export.zip", [
+        _convo("once", "Once", 1, f"deadlift once {filler}"),
+        _convo("often", "Often", 2, "deadlift deadlift deadlift", "more deadlift here"),
+        _convo("short", "Short", 3, "deadlift day"),
+        _convo("none", "None", 4, "nothing relevant"),
+        _convo("both", "Both", 5, "squat and deadlift"),
+    ])
+    build_search_index(export, tmp_path / "search")
+    with SearchIndex(tmp_path / "search") as index:
+        ranked = index.rank("deadlift")
+        assert [hit.id for hit in ranked][:2] == ["often", "short"]
+        assert ranked[-1].id == "once"  # one hit in a long conversation
+        assert all(a.score >= b.score for a, b in zip(ranked, ranked[1:]))
+        assert [hit.id for hit in index.rank("deadlift", limit=2)] == ["often", "short"]
+
+        (hit,) = index.rank("squat deadlift")  # AND still applies
+        assert hit.id == "both"
+        assert hit.snippets == ("[squat] and [deadlift]",)
+        assert index.rank("deadlift OR squat")[0].id == "both"  # rarer term weighs more
+
+
+def test_rank_snippets_come_from_the_best_messages(tmp_path, make_export):
+    long_text = "warmup " * 40 + "then the heavy deadlift set " + "cooldown " * 40
+    export = make_export("export.zip", [
+        _convo("a", "Gym", 1, "no match here", long_text, "deadlift deadlift PR!"),
+    ])
+    build_search_index(export, tmp_path / "search")
+    with SearchIndex(tmp_path / "search") as index:
+        (hit,) = index.rank("deadlift")
+    assert hit.snippets[0] == "[deadlift] [deadlift] PR!"
+    assert hit.snippets[1].startswith("…warmup") and "[deadlift]" in hit.snippets[1]
+    assert hit.snippets[1].endswith("…")
+    assert len(hit.snippets) == 2
+
+
+def test_snippet_window():
+    text = "alpha " * 50 + "Bench press day " + "omega " * 50
+    window = snippet(text, {"bench", "press"}, width=60)
+    assert window.startswith("…alpha") and window.endswith("…")
+    assert "[Bench] [press] day" in window
+    assert snippet("short text", {"missing"}) == "short text"